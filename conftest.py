@@ -0,0 +1,2 @@
+# test_db.py is a manual script that imports the app outside the package
+collect_ignore = ['library_management/test_db.py']
@@ -0,0 +1,403 @@
+import re
+import logging
+from datetime import datetime, timedelta
+from flask import (Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify,
+                   Response, stream_with_context, abort)
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from ..database import db
+from ..models import User, Book, Reservation
+from ..pagination import paginate
+from ..fines import calculate_fine, overdue_filter
+from ..stats import get_library_stats, invalidate_library_stats
+from ..circulation import transition_reservation
+from ..holds import hand_on_copy
+from ..user_cache import user_cache
+from ..reports import REPORTS, EXPORT_FORMATS, iter_report, month_range
+from ..instrumentation import instrumentation
+from ..response_cache import bump_catalog_version
+from ..notifications import notify_book_returned
+from ..archive import reservation_history
+from ..patron_summary import adjust_patron_summary
+from ..batch_updates import batch_update_reservations, BATCH_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('admin', __name__)
+
+RESERVATION_STATUSES = ('pending', 'approved', 'cancelled', 'returned')
+
+# Sort keys accepted by the admin listing pages
+RESERVATION_SORT_FIELDS = ('date_reserved', 'due_date', 'date_returned', 'status')
+
+
+def listing_entity():
+    """Reservation, or the reservation + archive union when the request asks for ?include_archived=1."""
+    if request.args.get('include_archived', type=int):
+        return reservation_history()
+    return Reservation
+
+
+def reservation_listing_options(entity=Reservation):
+    # Listing templates read reservation.book and reservation.user on every row;
+    # load both in the same SELECT instead of two lazy loads per row.
+    return (joinedload(entity.book), joinedload(entity.user))
+
+
+def parse_date_arg(name, strict=False):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        if strict:
+            raise ValueError(f"Invalid date for {name}: {value}")
+        flash(f'Ignoring invalid date for {name}: {value}', 'warning')
+        return None
+
+
+def filter_reservations(query, entity=Reservation):
+    """Apply the user, book and date-range filters from the request args."""
+    username = request.args.get('username', '').strip()
+    if username:
+        user_id = db.session.query(User.id).filter_by(username=username).scalar()
+        query = query.filter(entity.user_id == user_id)
+
+    user_id = request.args.get('user_id', type=int)
+    if user_id:
+        query = query.filter(entity.user_id == user_id)
+
+    book_id = request.args.get('book_id', type=int)
+    if book_id:
+        query = query.filter(entity.book_id == book_id)
+
+    date_from = parse_date_arg('date_from')
+    if date_from:
+        query = query.filter(entity.date_reserved >= date_from)
+
+    date_to = parse_date_arg('date_to')
+    if date_to:
+        query = query.filter(entity.date_reserved < date_to + timedelta(days=1))
+
+    return query
+
+
+def sort_reservations(query, default, default_order='asc', entity=Reservation):
+    field = request.args.get('sort')
+    column = getattr(entity, field if field in RESERVATION_SORT_FIELDS else default)
+    order = request.args.get('order', default_order)
+    if order == 'desc':
+        return query.order_by(column.desc(), entity.id.desc())
+    return query.order_by(column.asc(), entity.id.asc())
+
+
+@bp.route('/add_book', methods=['GET', 'POST'])
+@login_required
+def add_book():
+    logger.info("Route: add_book")
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('books.home'))
+
+    if request.method == 'POST':
+        title = request.form.get('title')
+        author = request.form.get('author')
+        isbn = request.form.get('isbn')
+        quantity = request.form.get('quantity', type=int)
+
+        existing_book = Book.query.filter_by(isbn=isbn).first()
+        if existing_book:
+            flash('A book with this ISBN already exists.', 'error')
+            return redirect(url_for('admin.add_book'))
+
+        new_book = Book(title=title, author=author, isbn=isbn, quantity=quantity, available=quantity)
+
+        try:
+            db.session.add(new_book)
+            db.session.commit()
+            invalidate_library_stats()
+            bump_catalog_version()
+            flash('Book added successfully!', 'success')
+            return redirect(url_for('books.home'))
+        except Exception as e:
+            logger.error("Error adding book: %s", e)
+            flash(f'An error occurred: {str(e)}', 'error')
+            db.session.rollback()
+
+    return render_template('add_book.html')
+
+
+@bp.route('/admin_dashboard')
+@login_required
+def admin_dashboard():
+    logger.info("Route: admin_dashboard")
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        logger.warning("Non-admin user %s tried to access admin dashboard.", current_user.username)
+        return redirect(url_for('books.home'))
+
+    # Cached aggregates; see stats.py for how they are kept fresh
+    stats = get_library_stats()
+
+    return render_template('admin_dashboard.html', stats=stats, user_cache_stats=user_cache.stats(),
+                           total_books=stats['total_books'],
+                           available_books=stats['available_books'],
+                           total_reservations=stats['total_reservations'])
+
+
+@bp.route('/admin_reservations')
+@login_required
+def admin_reservations():
+    logger.info("Route: admin_reservations")
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('books.home'))
+
+    entity = listing_entity()
+    query = filter_reservations(db.session.query(entity).options(*reservation_listing_options(entity)), entity)
+    status = request.args.get('status')
+    if status in RESERVATION_STATUSES:
+        query = query.filter(entity.status == status)
+
+    page = paginate(sort_reservations(query, default='date_reserved', default_order='desc', entity=entity))
+    return render_template('admin_reservations.html', reservations=page.items, page=page,
+                           statuses=RESERVATION_STATUSES, sort_fields=RESERVATION_SORT_FIELDS,
+                           batch_statuses=BATCH_TRANSITIONS)
+
+
+@bp.route('/update_reservation/<int:reservation_id>', methods=['POST'])
+@login_required
+def update_reservation(reservation_id):
+    logger.info("Route: update_reservation for reservation_id %s", reservation_id)
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('books.home'))
+
+    Reservation.query.get_or_404(reservation_id)
+    new_status = request.form.get('status')
+    if new_status not in BATCH_TRANSITIONS:
+        flash('Invalid status.', 'warning')
+        logger.warning("Invalid status provided: %s", new_status)
+        return redirect(url_for('admin.admin_reservations'))
+
+    # The same transitions as a batch of one, so a copy is only ever freed once
+    try:
+        result = batch_update_reservations([reservation_id], new_status,
+                                           pickup_days=current_app.config['HOLD_PICKUP_DAYS'])[0]
+        db.session.commit()
+    except Exception as e:
+        logger.error("Error updating reservation: %s", e)
+        flash(f"An error occurred updating the reservation: {e}", 'error')
+        db.session.rollback()
+        return redirect(url_for('admin.admin_reservations'))
+
+    if result['ok']:
+        bump_catalog_version(availability_only=True)
+        flash('Reservation updated successfully.', 'success')
+        logger.info("Reservation %s updated to status %s.", reservation_id, new_status)
+    else:
+        flash(f"{result['error']}.", 'warning')
+        logger.warning("Reservation %s not updated to %s: %s", reservation_id, new_status, result['error'])
+
+    return redirect(url_for('admin.admin_reservations'))
+
+
+@bp.route('/admin/reservations/batch', methods=['POST'])
+@login_required
+def batch_update():
+    """Approve, return or cancel many reservations in one transaction.
+
+    Takes the form on the reservations page (ticked `reservation_ids` and/or
+    ids pasted into `ids`, e.g. a scanned returns cart) or JSON
+    {"ids": [...], "status": "returned"}. JSON callers get per-item results.
+    """
+    logger.info("Route: batch_update")
+    wants_json = request.is_json
+
+    def fail(message, status_code=400):
+        if wants_json:
+            return jsonify({"error": message}), status_code
+        flash(message, 'warning')
+        return redirect(url_for('admin.admin_reservations'))
+
+    if not current_user.is_admin:
+        if wants_json:
+            return jsonify({"error": "Admin privileges required"}), 403
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('books.home'))
+
+    if wants_json:
+        body = request.get_json(silent=True)
+        values = body.get('ids') if isinstance(body, dict) else None
+        new_status = body.get('status') if isinstance(body, dict) else None
+        if not isinstance(values, list):
+            return fail("Expected a JSON object with an 'ids' list")
+    else:
+        values = request.form.getlist('reservation_ids') + re.split(r'[\s,]+', request.form.get('ids', ''))
+        new_status = request.form.get('status')
+
+    if new_status not in BATCH_TRANSITIONS:
+        return fail(f"Status must be one of: {', '.join(BATCH_TRANSITIONS)}")
+    try:
+        reservation_ids = list(dict.fromkeys(int(str(value).strip()) for value in values if str(value).strip()))
+    except ValueError:
+        return fail("Reservation ids must be integers")
+    if not reservation_ids:
+        return fail("No reservations selected")
+    max_batch = current_app.config['BATCH_MAX_RESERVATIONS']
+    if len(reservation_ids) > max_batch:
+        return fail(f"At most {max_batch} reservations per batch")
+
+    try:
+        results = batch_update_reservations(reservation_ids, new_status,
+                                            pickup_days=current_app.config['HOLD_PICKUP_DAYS'])
+        db.session.commit()
+    except Exception as e:
+        logger.error("Error in batch update: %s", e)
+        db.session.rollback()
+        return fail(f"An error occurred updating the reservations: {e}", 500)
+
+    updated = sum(1 for result in results if result['ok'])
+    if updated:
+        bump_catalog_version(availability_only=True)
+    logger.info("Batch update to %s: %s of %s reservations updated.", new_status, updated, len(results))
+    if wants_json:
+        return jsonify({'status': new_status, 'updated': updated, 'results': results})
+
+    flash(f'{updated} of {len(results)} reservations updated to {new_status}.',
+          'success' if updated == len(results) else 'warning')
+    failed = [result for result in results if not result['ok']]
+    if failed:
+        flash('Not updated: ' + '; '.join(f"#{result['id']} ({result['error']})" for result in failed[:10])
+              + (f'; and {len(failed) - 10} more' if len(failed) > 10 else ''), 'warning')
+    return redirect(url_for('admin.admin_reservations'))
+
+
+@bp.route('/book_circulation')
+@login_required
+def book_circulation():
+    logger.info("Route: book_circulation")
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('books.home'))
+
+    query = filter_reservations(Reservation.query.options(*reservation_listing_options()))
+    issued_page = paginate(
+        sort_reservations(query.filter(Reservation.status == 'approved'), default='due_date'),
+        page_arg='issued_page')
+    # Open loans are never archived, so only the returned list can include archived rows
+    entity = listing_entity()
+    returned_query = filter_reservations(db.session.query(entity).options(*reservation_listing_options(entity)),
+                                         entity)
+    returned_page = paginate(
+        sort_reservations(returned_query.filter(entity.status == 'returned'),
+                          default='date_returned', default_order='desc', entity=entity),
+        page_arg='returned_page')
+
+    return render_template('admin_book_circulation.html',
+                           issued_books=issued_page.items,
+                           returned_books=returned_page.items,
+                           issued_page=issued_page,
+                           returned_page=returned_page,
+                           sort_fields=RESERVATION_SORT_FIELDS,
+                           datetime=datetime)
+
+
+@bp.route('/metrics')
+@login_required
+def metrics():
+    if not current_user.is_admin:
+        abort(403)
+    if not instrumentation.enabled:
+        abort(404)
+    return Response(instrumentation.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/admin/export/<report>')
+@login_required
+def export_report(report):
+    logger.info("Route: export_report for %s", report)
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('books.home'))
+
+    export_format = request.args.get('format', 'csv')
+    if report not in REPORTS or export_format not in EXPORT_FORMATS:
+        abort(404)
+    try:
+        if request.args.get('month'):
+            date_from, date_to = month_range(request.args['month'])
+        else:
+            date_from = parse_date_arg('date_from', strict=True)
+            date_to = parse_date_arg('date_to', strict=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    include_archived = bool(request.args.get('include_archived', type=int))
+    filename = f"{report}-{datetime.utcnow():%Y%m%d%H%M%S}.{export_format}"
+    return Response(stream_with_context(iter_report(report, export_format, date_from, date_to, include_archived)),
+                    mimetype=EXPORT_FORMATS[export_format],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+@bp.route('/return_book/<int:reservation_id>', methods=['POST'])
+@login_required
+def return_book(reservation_id):
+    logger.info("Route: return_book for reservation_id %s", reservation_id)
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('books.home'))
+
+    reservation = Reservation.query.get_or_404(reservation_id)
+    now = datetime.utcnow()
+    fine = calculate_fine(reservation, now)
+    if reservation.status == 'approved' and transition_reservation(
+            reservation_id, 'returned', from_statuses=('approved',),
+            date_returned=now, fine_amount=fine):
+        # The copy goes to the next patron on the waitlist, or back on the shelf
+        hand_on_copy(reservation.book_id, now, pickup_days=current_app.config['HOLD_PICKUP_DAYS'])
+        # The fine replaces whatever the fines job had recorded for this loan
+        adjust_patron_summary(reservation.user_id, open_loans=-1, fines=fine - (reservation.fine_amount or 0.0))
+        notify_book_returned(reservation, fine)
+
+        try:
+            db.session.commit()
+            bump_catalog_version(availability_only=True)
+            flash('Book returned successfully.', 'success')
+            logger.info("Book returned successfully for reservation %s.", reservation_id)
+        except Exception as e:
+            logger.error("Error returning book: %s", e)
+            flash(f"An error occurred while returning the book: {e}", 'error')
+            db.session.rollback()
+    else:
+        db.session.rollback()
+        flash('Invalid reservation status for return.', 'warning')
+        logger.warning("Attempted to return book with invalid reservation status for reservation %s.", reservation_id)
+
+    return redirect(url_for('admin.admin_reservations'))
+
+
+@bp.route('/overdue_books')
+@login_required
+def overdue_books():
+    logger.info("Route: overdue_books")
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('books.home'))
+
+    # Read-only: fines are shown as of now but only persisted by update_fines
+    now = datetime.utcnow()
+    try:
+        overdue_reservations = (Reservation.query
+                                .options(*reservation_listing_options())
+                                .filter(overdue_filter(now))
+                                .all())
+        fines = {reservation.id: calculate_fine(reservation, now) for reservation in overdue_reservations}
+        return render_template('admin_overdue_books.html', overdue_reservations=overdue_reservations,
+                               fines=fines, now=now, datetime=datetime)
+    except Exception as e:
+        logger.error("Error displaying overdue books: %s", e)
+        flash(f"An error occurred while displaying overdue books: {e}", 'error')
+        return render_template('admin_overdue_books.html', overdue_reservations=[], fines={}, now=now,
+                               datetime=datetime)
@@ -0,0 +1,117 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete, func, literal, union_all
+from sqlalchemy.orm import aliased
+from .database import db
+from .models import User, Book, Reservation, ArchivedReservation, ArchiveTotal, Hold
+from .fines import overdue_filter
+
+# Closed reservations never change again, so they can leave the hot table
+CLOSED_STATUSES = ('returned', 'cancelled')
+
+ARCHIVE_BATCH_SIZE = 500
+
+# Columns shared by reservation and reservation_archive
+HISTORY_COLUMNS = ('id', 'user_id', 'book_id', 'date_reserved', 'date_returned', 'due_date',
+                   'fine_amount', 'status')
+
+
+def archivable(cutoff):
+    """Closed reservations that were returned (or, if cancelled, reserved) before `cutoff`."""
+    return (Reservation.status.in_(CLOSED_STATUSES)
+            & (func.coalesce(Reservation.date_returned, Reservation.date_reserved) < cutoff))
+
+
+def add_archive_totals(batch_ids):
+    """Add the archived rows among `batch_ids` to reservation_archive_total."""
+    rows = db.session.execute(
+        select(ArchivedReservation.status, func.count(),
+               func.coalesce(func.sum(ArchivedReservation.fine_amount), 0.0))
+        .where(ArchivedReservation.id.in_(batch_ids))
+        .group_by(ArchivedReservation.status)).all()
+    for status, count, fines in rows:
+        result = db.session.execute(
+            update(ArchiveTotal)
+            .where(ArchiveTotal.status == status)
+            .values(reservations=ArchiveTotal.reservations + count,
+                    fines_total=ArchiveTotal.fines_total + fines)
+            .execution_options(synchronize_session=False))
+        if result.rowcount == 0:
+            db.session.execute(insert(ArchiveTotal).values(status=status, reservations=count, fines_total=fines))
+
+
+def archive_reservations(older_than_days, batch_size=ARCHIVE_BATCH_SIZE, now=None, max_batches=None):
+    """Move closed reservations older than `older_than_days` into reservation_archive.
+
+    Works in batches of `batch_size` rows, each copied and deleted in its own
+    short transaction, so the write lock is never held for long and other
+    requests get in between batches. Each batch also adds its rows to
+    reservation_archive_total. Returns the number of rows moved.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+    columns = [getattr(Reservation, name) for name in HISTORY_COLUMNS]
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.session.scalars(
+            select(Reservation.id).where(archivable(cutoff)).order_by(Reservation.id).limit(batch_size)).all()
+        if not ids:
+            break
+        # Both statements repeat the filter, so a row reopened meanwhile stays put
+        selected = select(*columns, literal(now)).where(Reservation.id.in_(ids), archivable(cutoff))
+        db.session.execute(insert(ArchivedReservation)
+                           .from_select(list(HISTORY_COLUMNS) + ['archived_at'], selected))
+        add_archive_totals(ids)
+        # 'fetch' drops the moved rows from the session, so a later history query
+        # in the same session loads them fresh from the archive
+        result = db.session.execute(
+            delete(Reservation).where(Reservation.id.in_(ids), archivable(cutoff))
+            .execution_options(synchronize_session='fetch'))
+        db.session.commit()
+        moved += result.rowcount
+        batches += 1
+    return moved
+
+
+def reservation_history():
+    """Reservation mapped over reservation UNION ALL reservation_archive.
+
+    Query it like Reservation (filters, sorting, joinedload) when a view
+    should also show archived rows. Archived rows come back as Reservation
+    objects that no longer exist in the reservation table.
+    """
+    history = union_all(
+        select(*[getattr(Reservation, name) for name in HISTORY_COLUMNS]),
+        select(*[getattr(ArchivedReservation, name) for name in HISTORY_COLUMNS]),
+    ).subquery('reservation_history')
+    return aliased(Reservation, history, adapt_on_names=True)
+
+
+# Statements the archive is meant to speed up, timed by table_report()
+HOT_QUERIES = {
+    'circulation_issued': lambda now: (select(Reservation.id).where(Reservation.status == 'approved')
+                                       .order_by(Reservation.due_date).limit(50)),
+    'circulation_returned': lambda now: (select(Reservation.id).where(Reservation.status == 'returned')
+                                         .order_by(Reservation.date_returned.desc()).limit(50)),
+    'overdue': lambda now: select(Reservation.id).where(overdue_filter(now)),
+    'user_history': lambda now: (select(Reservation.id)
+                                 .where(Reservation.user_id == select(func.min(User.id)).scalar_subquery())),
+}
+
+
+def table_report(repeat=5):
+    """Row counts of the circulation tables and the best of `repeat` timings of HOT_QUERIES, in ms."""
+    counts = {model.__tablename__: db.session.scalar(select(func.count()).select_from(model))
+              for model in (Book, User, Reservation, ArchivedReservation, Hold)}
+    now = datetime.utcnow()
+    timings = {}
+    for name, make_statement in HOT_QUERIES.items():
+        statement = make_statement(now)
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db.session.execute(statement).all()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = round(best, 3)
+    return {'rows': counts, 'query_ms': timings}
@@ -0,0 +1 @@
+from .app import create_async_app
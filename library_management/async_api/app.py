@@ -0,0 +1,202 @@
+import json
+import logging
+from contextlib import asynccontextmanager
+from functools import partial
+from urllib.parse import urlencode
+from flask import Flask
+from itsdangerous import BadSignature
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from ..config import (configure_app, async_database_url, engine_options, apply_sqlite_pragmas, sqlite_settings,
+                      INSTANCE_PATH)
+from ..search import API_BOOK_FIELDS, API_DEFAULT_FIELDS, API_DEFAULT_LIMIT, API_MAX_LIMIT
+from .queries import search_books, availability, user_reservations
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 64 * 1024
+
+
+def query_arg(request, name, default=None, type=None):
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    if type is None:
+        return value
+    try:
+        return type(value)
+    except ValueError:
+        raise HTTPException(400, f"Invalid value for {name}: {value}")
+
+
+async def json_body(request):
+    body = b''
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BODY_SIZE:
+            raise HTTPException(413, "Request body too large")
+    try:
+        return json.loads(body or b'null')
+    except ValueError:
+        raise HTTPException(400, "Request body is not valid JSON")
+
+
+def page_limit(request):
+    limit = query_arg(request, 'limit', API_DEFAULT_LIMIT, int)
+    if limit < 1:
+        raise HTTPException(400, "limit must be positive")
+    return min(limit, API_MAX_LIMIT)
+
+
+def page_response(request, rows, limit, last_id):
+    """JSON list of one keyset page, with X-Next-Cursor and a Link to the next one when it is full."""
+    headers = {}
+    if len(rows) == limit:
+        next_args = dict(request.query_params)
+        next_args['cursor'] = last_id
+        headers['X-Next-Cursor'] = str(last_id)
+        headers['Link'] = f'<{request.url.path}?{urlencode(next_args)}>; rel="next"'
+    return JSONResponse(rows, headers=headers)
+
+
+def parse_book_ids(values):
+    """Integer book ids from `values`, without duplicates, in the order given."""
+    try:
+        book_ids = [int(str(value).strip()) for value in values]
+    except ValueError:
+        raise HTTPException(400, "Book ids must be integers")
+    return list(dict.fromkeys(book_ids))
+
+
+def current_user_id(request):
+    """The patron logged in through the Flask app's signed session cookie, or None."""
+    state = request.app.state
+    cookie = request.cookies.get(state.session_cookie_name)
+    if not cookie:
+        return None
+    try:
+        session = state.session_serializer.loads(cookie, max_age=state.session_max_age)
+    except BadSignature:
+        return None
+    user_id = session.get('_user_id')
+    return int(user_id) if user_id else None
+
+
+async def search(request):
+    query = query_arg(request, 'query', '')
+    cursor = query_arg(request, 'cursor', 0, int)
+    limit = page_limit(request)
+
+    fields = query_arg(request, 'fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(API_DEFAULT_FIELDS)
+    unknown = [f for f in fields if f not in API_BOOK_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}")
+
+    async with request.app.state.sessions() as session:
+        books, last_id = await search_books(session, query, fields, cursor, limit)
+    return page_response(request, books, limit, last_id)
+
+
+async def book_availability(request):
+    book_id = request.path_params['book_id']
+    async with request.app.state.sessions() as session:
+        found = await availability(session, [book_id])
+    if book_id not in found:
+        raise HTTPException(404, f"No book with id {book_id}")
+    return JSONResponse(found[book_id])
+
+
+async def batch_availability(request):
+    """Availability for many books in one call: GET ?ids=1,2,3 or POST {"ids": [1, 2, 3]}."""
+    if request.method == 'POST':
+        body = await json_body(request)
+        values = body.get('ids') if isinstance(body, dict) else None
+        if not isinstance(values, list):
+            raise HTTPException(400, "Expected a JSON object with an 'ids' list")
+    else:
+        values = [part for value in request.query_params.getlist('ids') for part in value.split(',')
+                  if part.strip()]
+
+    book_ids = parse_book_ids(values)
+    max_batch = request.app.state.max_batch
+    if not book_ids:
+        raise HTTPException(400, "No book ids given")
+    if len(book_ids) > max_batch:
+        raise HTTPException(400, f"At most {max_batch} book ids per request")
+
+    async with request.app.state.sessions() as session:
+        found = await availability(session, book_ids)
+    return JSONResponse({
+        'books': [found[book_id] for book_id in book_ids if book_id in found],
+        'missing': [book_id for book_id in book_ids if book_id not in found],
+    })
+
+
+async def reservations(request):
+    """The logged-in patron's reservations, newest first, one keyset page at a time."""
+    user_id = current_user_id(request)
+    if user_id is None:
+        raise HTTPException(401, "Login required")
+    cursor = query_arg(request, 'cursor', None, int)
+    limit = page_limit(request)
+    async with request.app.state.sessions() as session:
+        rows, last_id = await user_reservations(session, user_id, query_arg(request, 'status'), cursor, limit)
+    return page_response(request, rows, limit, last_id)
+
+
+async def http_error(request, error):
+    return JSONResponse({'error': error.detail}, error.status_code, headers=error.headers)
+
+
+async def server_error(request, error):
+    logger.error("Async API error on %s %s: %s", request.method, request.url.path, error)
+    return JSONResponse({'error': 'Internal server error'}, 500)
+
+
+ROUTES = [
+    Route('/api/search', search),
+    Route('/api/books/{book_id:int}/availability', book_availability),
+    Route('/api/availability', batch_availability, methods=['GET', 'POST']),
+    Route('/api/reservations', reservations),
+]
+
+
+def create_async_app(config=None):
+    """Build the read-only JSON API, e.g. `uvicorn --factory library_management.async_api:create_async_app`.
+
+    It runs on an asyncio database engine: a request waiting on the database
+    only holds a coroutine, not a worker thread, so one process can keep many
+    slow or polling clients in flight. Patrons are recognised by the same
+    signed session cookie as the Flask app.
+    """
+    # A bare Flask app gives the same settings and session cookie format as the web app
+    settings = Flask(__name__)
+    configure_app(settings, INSTANCE_PATH, config)
+
+    url = async_database_url(settings.config['ASYNC_API_DATABASE_URL']
+                             or settings.config['DATABASE_READ_URL']
+                             or settings.config['SQLALCHEMY_DATABASE_URI'])
+    engine = create_async_engine(url, **engine_options(settings.config, url))
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine.sync_engine, 'connect', partial(apply_sqlite_pragmas, sqlite_settings(settings.config)))
+    logger.info("Async API using %s", engine.url.render_as_string(hide_password=True))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    app = Starlette(routes=ROUTES, lifespan=lifespan,
+                    exception_handlers={HTTPException: http_error, Exception: server_error})
+    app.state.engine = engine
+    app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+    app.state.max_batch = settings.config['ASYNC_API_MAX_BATCH']
+    app.state.session_serializer = settings.session_interface.get_signing_serializer(settings)
+    app.state.session_cookie_name = settings.config['SESSION_COOKIE_NAME']
+    app.state.session_max_age = int(settings.permanent_session_lifetime.total_seconds())
+    return app
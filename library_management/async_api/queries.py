@@ -0,0 +1,52 @@
+from sqlalchemy import select
+from ..models import Book, Reservation
+from ..search import catalog_select
+
+
+async def search_books(session, query, fields, cursor, limit):
+    """One keyset page of books matching `query` with id > cursor, as dicts of `fields`."""
+    # The keyset cursor needs the id even when the client did not ask for it
+    columns = [getattr(Book, field) for field in fields]
+    if 'id' not in fields:
+        columns.append(Book.id)
+    statement = await catalog_select(session, query, columns)
+    rows = (await session.execute(
+        statement.where(Book.id > cursor).order_by(None).order_by(Book.id).limit(limit))).all()
+    return [{field: getattr(row, field) for field in fields} for row in rows], (rows[-1].id if rows else None)
+
+
+async def availability(session, book_ids):
+    """Copies available for each of `book_ids`, in one query. Unknown ids are left out."""
+    rows = await session.execute(
+        select(Book.id, Book.available, Book.quantity).where(Book.id.in_(book_ids)))
+    return {row.id: {'id': row.id, 'available': row.available, 'quantity': row.quantity} for row in rows}
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+async def user_reservations(session, user_id, status, cursor, limit):
+    """One keyset page of a patron's reservations with id < cursor, newest first."""
+    statement = (select(Reservation.id, Reservation.book_id, Book.title, Reservation.status,
+                        Reservation.date_reserved, Reservation.due_date, Reservation.date_returned,
+                        Reservation.fine_amount)
+                 .join(Book, Book.id == Reservation.book_id)
+                 .where(Reservation.user_id == user_id)
+                 .order_by(Reservation.id.desc())
+                 .limit(limit))
+    if status:
+        statement = statement.where(Reservation.status == status)
+    if cursor is not None:
+        statement = statement.where(Reservation.id < cursor)
+    rows = (await session.execute(statement)).all()
+    return [{
+        'id': row.id,
+        'book_id': row.book_id,
+        'title': row.title,
+        'status': row.status,
+        'date_reserved': _isoformat(row.date_reserved),
+        'due_date': _isoformat(row.due_date),
+        'date_returned': _isoformat(row.date_returned),
+        'fine_amount': row.fine_amount or 0.0,
+    } for row in rows], (rows[-1].id if rows else None)
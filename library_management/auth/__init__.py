@@ -0,0 +1 @@
+from .views import bp, init_app, username_limiter, ip_limiter
@@ -0,0 +1,143 @@
+import logging
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash
+from flask_login import login_user, login_required, logout_user
+from ..database import db
+from ..models import User
+from ..passwords import password_hasher, HasherBusy
+from ..rate_limit import TokenBucketLimiter
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('auth', __name__)
+
+# Checked before any database or hash work on login and signup
+username_limiter = TokenBucketLimiter()
+ip_limiter = TokenBucketLimiter()
+
+
+def init_app(app):
+    username_limiter.configure(app.config['LOGIN_RATE_LIMIT_BURST'], app.config['LOGIN_RATE_LIMIT_PER_MINUTE'])
+    ip_limiter.configure(app.config['LOGIN_IP_RATE_LIMIT_BURST'], app.config['LOGIN_IP_RATE_LIMIT_PER_MINUTE'])
+    app.register_blueprint(bp)
+
+
+def check_login_rate(username=None):
+    """Spend a token for the client IP (and username); returns seconds to wait, or None."""
+    allowed, retry_after = ip_limiter.allow(request.remote_addr or 'unknown')
+    if allowed and username:
+        allowed, retry_after = username_limiter.allow(username.strip().lower())
+    return None if allowed else retry_after
+
+
+def too_many_attempts(template, retry_after):
+    flash('Too many attempts. Please wait a minute and try again.', 'danger')
+    response = current_app.make_response((render_template(template), 429))
+    response.headers['Retry-After'] = str(max(int(retry_after) + 1, 1))
+    return response
+
+
+def hasher_busy(template):
+    flash('The server is busy. Please try again in a moment.', 'danger')
+    response = current_app.make_response((render_template(template), 503))
+    response.headers['Retry-After'] = '5'
+    return response
+
+
+@bp.route('/signup', methods=['GET', 'POST'])
+def signup():
+    logger.info("Route: signup")
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        confirm_password = request.form.get('confirm_password')
+        email = (request.form.get('email') or '').strip() or None
+
+        retry_after = check_login_rate()
+        if retry_after is not None:
+            logger.warning("Signup rate limited for %s", request.remote_addr)
+            return too_many_attempts('signup.html', retry_after)
+
+        if password != confirm_password:
+            flash('Passwords do not match. Please try again.', 'danger')
+            return redirect(url_for('auth.signup'))
+
+        existing_user = User.query.filter_by(username=username).first()
+        if existing_user:
+            flash('Username already exists. Please choose a different one.', 'danger')
+            return redirect(url_for('auth.signup'))
+
+        try:
+            hashed_password = password_hasher.hash(password)
+        except HasherBusy:
+            logger.warning("Password hasher busy during signup")
+            return hasher_busy('signup.html')
+        new_user = User(username=username, password=hashed_password, email=email)
+
+        try:
+            db.session.add(new_user)
+            db.session.commit()
+            flash('Account created successfully! Please log in.', 'success')
+            return redirect(url_for('auth.login'))
+        except Exception as e:
+            logger.error("Error creating user: %s", e)
+            flash(f"An error occurred during signup: {str(e)}", 'error')
+            db.session.rollback()
+
+    return render_template('signup.html')
+
+
+def upgrade_password_hash(user, password):
+    # Best effort: the login goes ahead with the old hash if this fails
+    try:
+        user.password = password_hasher.hash(password)
+        db.session.commit()
+        password_hasher.rehashed += 1
+        logger.info("Upgraded password hash for user %s", user.id)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning("Could not upgrade password hash for user %s: %s", user.id, e)
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    logger.info("Route: login")
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+
+        retry_after = check_login_rate(username)
+        if retry_after is not None:
+            logger.warning("Login rate limited for username: %s", username)
+            return too_many_attempts('login.html', retry_after)
+
+        user = User.query.filter_by(username=username).first()
+
+        logger.info("Login attempt: Username: %s, User found: %s", username, user is not None)
+
+        try:
+            valid = user is not None and password_hasher.verify(user.password, password)
+        except HasherBusy:
+            logger.warning("Password hasher busy, login deferred for username: %s", username)
+            return hasher_busy('login.html')
+
+        if valid:
+            if password_hasher.needs_rehash(user.password):
+                upgrade_password_hash(user, password)
+            login_user(user)
+            logger.info("User %s logged in successfully. is_admin: %s", username, user.is_admin)
+            flash('Logged in successfully.', 'success')
+            return redirect(url_for('books.dashboard'))
+        else:
+            logger.warning("Failed login attempt for username: %s", username)
+            flash('Invalid username or password.', 'danger')
+
+    return render_template('login.html')
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logger.info("Route: logout")
+    logout_user()
+    flash('Logged out successfully.', 'info')
+    return redirect(url_for('books.home'))
@@ -0,0 +1,166 @@
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, func, event
+from sqlalchemy.orm import Session
+from .database import db
+from .models import Book, AvailabilityChange
+
+DEFAULT_MAX_STALENESS = 2.0  # seconds
+DEFAULT_FULL_REFRESH = 300.0  # seconds
+DEFAULT_CHANGE_OVERLAP = 30.0  # seconds
+
+# Set in Session.info while a transaction holds unpublished availability changes
+PENDING_CHANGES_KEY = 'availability_changes_pending'
+
+
+def record_availability_change(*book_ids):
+    """Log that these books' available counts changed, in the caller's transaction."""
+    if not book_ids:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(AvailabilityChange), [{'book_id': book_id, 'changed_at': now}
+                                                     for book_id in book_ids])
+    # This worker sees the change on its next read once it commits; see _publish_changes
+    db.session.info[PENDING_CHANGES_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_changes(session):
+    if session.info.pop(PENDING_CHANGES_KEY, False):
+        availability.expire()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(PENDING_CHANGES_KEY, None)
+
+
+def prune_availability_changes(keep_hours):
+    result = db.session.execute(
+        AvailabilityChange.__table__.delete()
+        .where(AvailabilityChange.changed_at < datetime.utcnow() - timedelta(hours=keep_hours)))
+    db.session.commit()
+    return result.rowcount
+
+
+class AvailabilitySnapshot:
+    """In-memory book_id -> (available, quantity) for the search page and availability API.
+
+    The first read loads every book in one query. After that, a read at most
+    every AVAILABILITY_MAX_STALENESS seconds re-reads the books in the
+    availability_change rows stamped since the previous poll, less
+    AVAILABILITY_CHANGE_OVERLAP seconds. Rows are stamped before their
+    transaction commits, and ids can commit out of order on PostgreSQL or
+    MySQL, so the overlap is what catches a change committed late. Any write
+    transaction that commits within the overlap is seen within the staleness
+    bound. Bulk changes that bypass the log (catalog imports, manual SQL)
+    are picked up by the full reload every AVAILABILITY_FULL_REFRESH seconds.
+
+    The version is the highest change id seen, reported to API clients.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.max_staleness = DEFAULT_MAX_STALENESS
+        self.full_refresh = DEFAULT_FULL_REFRESH
+        self.overlap = DEFAULT_CHANGE_OVERLAP
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self._counts = {}
+        self._version = 0
+        self._loaded_at = None
+        self._checked_at = None
+        self._polled_since = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('AVAILABILITY_SNAPSHOT_ENABLED', True)
+        self.max_staleness = app.config.get('AVAILABILITY_MAX_STALENESS', DEFAULT_MAX_STALENESS)
+        self.full_refresh = app.config.get('AVAILABILITY_FULL_REFRESH', DEFAULT_FULL_REFRESH)
+        self.overlap = app.config.get('AVAILABILITY_CHANGE_OVERLAP', DEFAULT_CHANGE_OVERLAP)
+        self.clear()
+
+    @property
+    def version(self):
+        return self._version
+
+    def expire(self):
+        """Check the change log on the next read, whatever the staleness bound."""
+        self._checked_at = None
+
+    def clear(self):
+        with self._lock:
+            self._counts = {}
+            self._version = 0
+            self._loaded_at = None
+            self._checked_at = None
+            self._polled_since = None
+
+    def get_many(self, book_ids):
+        """{book_id: (available, quantity)} for the ids that exist."""
+        if not self.enabled or db.session.info.get(PENDING_CHANGES_KEY):
+            # Never cache counts this transaction has changed: it may still roll back
+            return self._query(book_ids)
+        with self._lock:
+            self._refresh()
+            counts = self._counts
+            found = {book_id: counts[book_id] for book_id in book_ids if book_id in counts}
+            missing = [book_id for book_id in book_ids if book_id not in counts]
+            if missing:
+                # Books added since the last full load
+                loaded = self._query(missing)
+                counts.update(loaded)
+                found.update(loaded)
+        return found
+
+    def _query(self, book_ids):
+        if not book_ids:
+            return {}
+        rows = db.session.execute(
+            select(Book.id, Book.available, Book.quantity).where(Book.id.in_(book_ids)))
+        return {row.id: (row.available, row.quantity) for row in rows}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.full_refresh:
+            self._load_all(now)
+        elif self._checked_at is None or now - self._checked_at >= self.max_staleness:
+            self._apply_changes(now)
+
+    def _load_all(self, now):
+        # Take the poll start first: a change committed meanwhile is re-read next time
+        polled_since = datetime.utcnow()
+        version = db.session.scalar(select(func.max(AvailabilityChange.id))) or 0
+        rows = db.session.execute(select(Book.id, Book.available, Book.quantity))
+        self._counts = {row.id: (row.available, row.quantity) for row in rows}
+        self._version = version
+        self._polled_since = polled_since
+        self._loaded_at = self._checked_at = now
+        self.full_loads += 1
+
+    def _apply_changes(self, now):
+        polled_since = datetime.utcnow()
+        rows = db.session.execute(
+            select(func.max(AvailabilityChange.id).label('version'), Book.id, Book.available, Book.quantity)
+            .join(Book, Book.id == AvailabilityChange.book_id)
+            .where(AvailabilityChange.changed_at >= self._polled_since - timedelta(seconds=self.overlap))
+            .group_by(Book.id, Book.available, Book.quantity)).all()
+        for row in rows:
+            self._counts[row.id] = (row.available, row.quantity)
+        if rows:
+            self._version = max(self._version, max(row.version for row in rows))
+        self._polled_since = polled_since
+        self._checked_at = now
+        self.incremental_loads += 1
+
+    def stats(self):
+        return {
+            'books': len(self._counts),
+            'version': self._version,
+            'full_loads': self.full_loads,
+            'incremental_loads': self.incremental_loads,
+        }
+
+
+availability = AvailabilitySnapshot()
@@ -0,0 +1,102 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import update, case
+from .database import db
+from .models import Reservation
+from .fines import calculate_fine
+from .circulation import transition_reservation
+from .holds import hand_on_copies, HOLD_PICKUP_DAYS
+from .notifications import notify_book_returned
+from .patron_summary import adjust_patron_summaries, OPEN_LOAN_STATUSES
+
+# Target status -> statuses a reservation may be moved from by a batch.
+# Pending and approved reservations both hold a copy, so returning or
+# cancelling either one frees it.
+BATCH_TRANSITIONS = {
+    'approved': ('pending',),
+    'returned': ('approved',),
+    'cancelled': ('pending', 'approved'),
+}
+
+
+def transition_reservations(reservation_ids, to_status, from_statuses, fines=None, **values):
+    """transition_reservation for many reservations; returns the ids this call changed.
+
+    `fines` maps reservation id to the fine_amount to record. Uses one
+    UPDATE ... RETURNING where the database supports it, one conditional
+    UPDATE per reservation otherwise.
+    """
+    if not reservation_ids:
+        return set()
+    if db.session.get_bind().dialect.update_returning:
+        if fines:
+            values['fine_amount'] = case(fines, value=Reservation.id, else_=Reservation.fine_amount)
+        result = db.session.execute(
+            update(Reservation)
+            .where(Reservation.id.in_(reservation_ids), Reservation.status.in_(from_statuses))
+            .values(status=to_status, **values)
+            .returning(Reservation.id)
+            .execution_options(synchronize_session=False))
+        return set(result.scalars())
+    changed = set()
+    for reservation_id in reservation_ids:
+        extra = {'fine_amount': fines[reservation_id]} if fines else {}
+        if transition_reservation(reservation_id, to_status, from_statuses=from_statuses, **values, **extra):
+            changed.add(reservation_id)
+    return changed
+
+
+def batch_update_reservations(reservation_ids, to_status, now=None, pickup_days=HOLD_PICKUP_DAYS):
+    """Approve, return or cancel many reservations in the caller's transaction.
+
+    Loads them in one query and changes them in one conditional UPDATE.
+    Freed copies are handed on with grouped updates, and patron totals are
+    adjusted in one statement. Returns one result dict per requested id, in
+    request order; the caller commits.
+    """
+    from_statuses = BATCH_TRANSITIONS[to_status]
+    now = now or datetime.utcnow()
+    reservation_ids = list(dict.fromkeys(reservation_ids))
+    loaded = {reservation.id: reservation
+              for reservation in Reservation.query.filter(Reservation.id.in_(reservation_ids))}
+    candidates = [reservation_id for reservation_id in reservation_ids
+                  if reservation_id in loaded and loaded[reservation_id].status in from_statuses]
+
+    fines = {}
+    values = {}
+    if to_status == 'returned':
+        fines = {reservation_id: calculate_fine(loaded[reservation_id], now) for reservation_id in candidates}
+        values['date_returned'] = now
+    changed = transition_reservations(candidates, to_status, from_statuses, fines, **values)
+
+    if to_status not in OPEN_LOAN_STATUSES:
+        hand_on_copies(Counter(loaded[reservation_id].book_id for reservation_id in changed), now, pickup_days)
+
+    patrons = {}
+    for reservation_id in changed:
+        reservation = loaded[reservation_id]
+        change = patrons.setdefault(reservation.user_id, {'open_loans': 0, 'fines': 0.0})
+        change['open_loans'] += (to_status in OPEN_LOAN_STATUSES) - (reservation.status in OPEN_LOAN_STATUSES)
+        if reservation_id in fines:
+            # The fine replaces whatever the fines job had recorded for this loan
+            change['fines'] += fines[reservation_id] - (reservation.fine_amount or 0.0)
+            notify_book_returned(reservation, fines[reservation_id])
+    adjust_patron_summaries(patrons)
+
+    results = []
+    for reservation_id in reservation_ids:
+        reservation = loaded.get(reservation_id)
+        if reservation is None:
+            results.append({'id': reservation_id, 'ok': False, 'error': 'Reservation not found'})
+            continue
+        result = {'id': reservation_id, 'ok': reservation_id in changed, 'from': reservation.status}
+        if reservation_id in changed:
+            result['status'] = to_status
+            if reservation_id in fines:
+                result['fine'] = fines[reservation_id]
+        elif reservation.status in from_statuses:
+            result['error'] = 'Changed by another request'
+        else:
+            result['error'] = f"A {reservation.status} reservation cannot be {to_status}"
+        results.append(result)
+    return results
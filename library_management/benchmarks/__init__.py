@@ -0,0 +1 @@
+# Benchmark and load-test suite; run with `python -m library_management.benchmarks --help`
@@ -0,0 +1,57 @@
+import os
+import sys
+import logging
+import argparse
+import tempfile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m library_management.benchmarks',
+        description='Benchmark core library workflows against a throwaway database.')
+    parser.add_argument('--scales', default='1000,10000',
+                        help="comma-separated data scales; 'N' or 'books:users:reservations'")
+    parser.add_argument('--iterations', type=int, default=100, help='measured operations per scenario')
+    parser.add_argument('--warmup', type=int, default=3, help='unmeasured operations per scenario')
+    parser.add_argument('--scenario', action='append', dest='scenarios',
+                        help='run only this scenario (repeatable)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='database to use instead of a temporary SQLite file; it is wiped')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against results from an earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 latency growth over the baseline, as a fraction')
+    args = parser.parse_args(argv)
+
+    # The app reads its database at import time, so configure it first
+    os.environ['DATABASE_URL'] = args.database_url or (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='library-bench-'), 'bench.db')}")
+    logging.disable(logging.INFO)
+
+    from ..app import app
+    from .runner import run_benchmarks, compare, load_results, save_results
+    from .scenarios import SCENARIOS
+
+    unknown = set(args.scenarios or ()) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}; choose from {', '.join(SCENARIOS)}")
+
+    results = run_benchmarks(app, args.scales.split(','), args.iterations, args.warmup,
+                             args.scenarios, args.seed)
+    if args.output:
+        save_results(results, args.output)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print('Regressions against baseline:')
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print('No regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
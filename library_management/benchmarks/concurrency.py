@@ -0,0 +1,286 @@
+"""Concurrency benchmark: the sync Flask routes against the async API tier.
+
+Both tiers are driven in-process by N closed-loop clients, each sending its
+next request as soon as the last one is answered. The sync app gets a fixed
+pool of worker threads, like a threaded gunicorn worker, so clients beyond
+that wait for a thread. The async app serves every client from one event
+loop. The response cache is turned off so both tiers hit the database,
+except that the sync /api/availability answers from the in-memory
+availability snapshot, as it does in production.
+
+Run as `python -m library_management.benchmarks.concurrency`.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import logging
+import platform
+import tempfile
+import threading
+from datetime import datetime
+from ..database import db
+from .data import clear_data, generate
+from .runner import parse_scale, percentile, load_results, save_results
+
+DEFAULT_LEVELS = '1,8,32,128'
+
+
+def _sync_login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+class Scenario:
+    """A read both tiers can answer."""
+
+    name = None
+    needs_login = False
+
+    def sync(self, client, data, rng):
+        raise NotImplementedError
+
+    def async_request(self, data, rng):
+        """(method, path, query string) for the async API."""
+        raise NotImplementedError
+
+
+class Search(Scenario):
+    name = 'search'
+
+    def sync(self, client, data, rng):
+        return client.get('/api/search', query_string={'query': rng.choice(data['search_terms']),
+                                                        'limit': 50}).status_code
+
+    def async_request(self, data, rng):
+        return 'GET', '/api/search', f"query={rng.choice(data['search_terms'])}&limit=50"
+
+
+class Reservations(Scenario):
+    """A patron's loans: the My Reservations page against the JSON list."""
+
+    name = 'reservations'
+    needs_login = True
+
+    def sync(self, client, data, rng):
+        return client.get('/my_reservations').status_code
+
+    def async_request(self, data, rng):
+        return 'GET', '/api/reservations', ''
+
+
+class BatchAvailability(Scenario):
+    """Availability of 50 books in one call: the sync snapshot against the async API's query."""
+
+    name = 'batch_availability'
+
+    def book_ids(self, data, rng):
+        return ','.join(map(str, rng.sample(data['book_ids'], min(50, len(data['book_ids'])))))
+
+    def sync(self, client, data, rng):
+        return client.get('/api/availability', query_string={'ids': self.book_ids(data, rng)}).status_code
+
+    def async_request(self, data, rng):
+        return 'GET', '/api/availability', 'ids=' + self.book_ids(data, rng)
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (Search(), Reservations(), BatchAvailability())}
+
+
+def summarize(latencies, errors, elapsed):
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        'ops': len(latencies),
+        'errors': errors,
+        'throughput_ops': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p95_ms': round(percentile(latencies_ms, 95), 3),
+    }
+
+
+def split(total, clients):
+    return [total // clients + (1 if i < total % clients else 0) for i in range(clients)]
+
+
+def run_sync(app, scenario, data, clients, requests, threads, seed):
+    workers = threading.Semaphore(threads)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client_loop(count, rng):
+        client = app.test_client()
+        if scenario.needs_login:
+            _sync_login(client, rng.choice(data['patron_ids']))
+        for _ in range(count):
+            started = time.perf_counter()
+            with workers:
+                status = scenario.sync(client, data, rng)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    errors.append(status)
+
+    loops = [threading.Thread(target=client_loop, args=(count, random.Random(seed + i)))
+             for i, count in enumerate(split(requests, clients))]
+    started = time.perf_counter()
+    for loop in loops:
+        loop.start()
+    for loop in loops:
+        loop.join()
+    return summarize(latencies, len(errors), time.perf_counter() - started)
+
+
+async def asgi_status(api, method, path, query_string, cookie=None):
+    """Send one request straight to the ASGI app and return the status code."""
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query_string.encode(),
+             'headers': [(b'cookie', f'session={cookie}'.encode())] if cookie else []}
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await api(scope, receive, send)
+    return status[0]
+
+
+async def run_async(api, scenario, data, clients, requests, seed, cookies):
+    latencies, errors = [], []
+
+    async def client_loop(count, rng):
+        cookie = cookies[rng.choice(data['patron_ids'])] if scenario.needs_login else None
+        for _ in range(count):
+            started = time.perf_counter()
+            status = await asgi_status(api, *scenario.async_request(data, rng), cookie=cookie)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(count, random.Random(seed + i))
+                           for i, count in enumerate(split(requests, clients))))
+    return summarize(latencies, len(errors), time.perf_counter() - started)
+
+
+def session_cookies(app, user_ids):
+    """A signed Flask session cookie for each patron, as the async API reads them."""
+    cookies = {}
+    for user_id in user_ids:
+        client = app.test_client()
+        _sync_login(client, user_id)
+        cookies[user_id] = client.get_cookie('session').value
+    return cookies
+
+
+def run_concurrency_benchmark(app, api, scale, levels, requests=400, threads=8, scenarios=None, seed=42,
+                              log=print):
+    """Measure every scenario on both tiers at each concurrency level."""
+    counts = parse_scale(scale)
+    with app.app_context():
+        db.create_all()
+        clear_data()
+        data = generate(seed=seed, **counts)
+    log(f"scale {scale}: {counts}")
+    cookies = session_cookies(app, data['patron_ids'])
+
+    results = {}
+    loop = asyncio.new_event_loop()
+    try:
+        for name in scenarios or list(SCENARIOS):
+            scenario = SCENARIOS[name]
+            tiers = results[name] = {'sync': {}, 'async': {}}
+            for clients in levels:
+                tiers['sync'][str(clients)] = run_sync(app, scenario, data, clients, requests, threads, seed)
+                tiers['async'][str(clients)] = loop.run_until_complete(
+                    run_async(api, scenario, data, clients, requests, seed, cookies))
+                log(f"  {name:<20} {clients:>4} clients  " + '  '.join(
+                    f"{tier} {format_result(tiers[tier][str(clients)])}" for tier in ('sync', 'async')))
+    finally:
+        # aiosqlite connections run on their own threads, which would keep the process alive
+        loop.run_until_complete(api.state.engine.dispose())
+        loop.close()
+        with app.app_context():
+            clear_data()
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'scale': scale,
+            'requests': requests,
+            'sync_threads': threads,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def format_result(result):
+    return f"{result['throughput_ops']:>8.1f} ops/s p95 {result['p95_ms']:>8.2f} ms ({result['errors']} errors)"
+
+
+def compare(current, baseline, tolerance=0.25):
+    """List tier/level combinations whose p95 grew by more than `tolerance` over the baseline."""
+    regressions = []
+    for name, tiers in current['results'].items():
+        for tier, levels in tiers.items():
+            for clients, result in levels.items():
+                reference = baseline.get('results', {}).get(name, {}).get(tier, {}).get(clients)
+                if reference and result['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+                    regressions.append(f"{name}/{tier}/{clients} clients: "
+                                       f"p95 {reference['p95_ms']} -> {result['p95_ms']} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m library_management.benchmarks.concurrency',
+        description='Compare how the sync routes and the async API scale with concurrent clients.')
+    parser.add_argument('--scale', default='10000', help="data scale; 'N' or 'books:users:reservations'")
+    parser.add_argument('--concurrency', default=DEFAULT_LEVELS, help='comma-separated client counts')
+    parser.add_argument('--requests', type=int, default=400, help='requests per scenario, tier and level')
+    parser.add_argument('--threads', type=int, default=8, help='worker threads given to the sync app')
+    parser.add_argument('--scenario', action='append', dest='scenarios', choices=sorted(SCENARIOS),
+                        help='run only this scenario (repeatable)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='database to use instead of a temporary SQLite file; it is wiped')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against results from an earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 latency growth over the baseline, as a fraction')
+    args = parser.parse_args(argv)
+
+    os.environ['DATABASE_URL'] = args.database_url or (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='library-bench-'), 'bench.db')}")
+    os.environ['RESPONSE_CACHE_ENABLED'] = '0'
+    logging.disable(logging.INFO)
+
+    from ..app import app
+    from ..async_api import create_async_app
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    results = run_concurrency_benchmark(app, create_async_app(), args.scale, levels, args.requests,
+                                        args.threads, args.scenarios, args.seed)
+    if args.output:
+        save_results(results, args.output)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print('Regressions against baseline:')
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print('No regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
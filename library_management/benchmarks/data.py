@@ -0,0 +1,81 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from ..database import db
+from ..models import User, Book, Reservation
+from ..availability import availability
+
+WORDS = (
+    'river', 'shadow', 'garden', 'winter', 'empire', 'silent', 'golden', 'storm', 'house', 'night',
+    'ocean', 'mountain', 'letters', 'glass', 'fire', 'city', 'forest', 'memory', 'stone', 'light',
+    'secret', 'journey', 'kingdom', 'island', 'history', 'science', 'music', 'machine', 'dream', 'war',
+)
+SURNAMES = ('Austen', 'Orwell', 'Lee', 'Coelho', 'Tolstoy', 'Morrison', 'Achebe', 'Murakami', 'Woolf', 'Borges')
+
+INSERT_BATCH = 5000
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), INSERT_BATCH):
+        db.session.execute(insert(model), rows[start:start + INSERT_BATCH])
+
+
+def clear_data():
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(table.delete())
+    db.session.commit()
+    # Ids are reused after the wipe
+    availability.clear()
+
+
+def generate(books, users, reservations, seed=42):
+    """Fill the database with a synthetic catalog, patrons and loan history.
+
+    Returns a dict of ids the scenarios need (admin, patrons, books, open loans).
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    # One hash for every account: hashing is deliberately slow
+    password = generate_password_hash('benchmark')
+
+    _insert(User, [{'username': 'bench-admin', 'password': password, 'is_admin': True}]
+            + [{'username': f'patron{i}', 'password': password, 'is_admin': False} for i in range(users)])
+    _insert(Book, [{
+        'title': ' '.join(rng.sample(WORDS, 3)).title(),
+        'author': f"{rng.choice('ABCDEFGHJKLMNPRSTW')}. {rng.choice(SURNAMES)}",
+        'isbn': f"978{i:010d}",
+        'quantity': 5,
+        'available': 5,
+    } for i in range(books)])
+    db.session.commit()
+
+    admin_id = db.session.query(User.id).filter_by(username='bench-admin').scalar()
+    patron_ids = [row.id for row in db.session.query(User.id).filter(User.is_admin.is_(False))]
+    book_ids = [row.id for row in db.session.query(Book.id)]
+
+    rows = []
+    for _ in range(reservations):
+        reserved = now - timedelta(days=rng.randint(0, 365))
+        status = rng.choices(('returned', 'approved', 'pending', 'cancelled'), weights=(70, 20, 5, 5))[0]
+        due_date = reserved + timedelta(days=14)
+        rows.append({
+            'user_id': rng.choice(patron_ids),
+            'book_id': rng.choice(book_ids),
+            'date_reserved': reserved,
+            'due_date': due_date,
+            'date_returned': due_date - timedelta(days=rng.randint(-10, 10)) if status == 'returned' else None,
+            'fine_amount': 0.0,
+            'status': status,
+        })
+    _insert(Reservation, rows)
+    db.session.commit()
+
+    open_loans = [row.id for row in db.session.query(Reservation.id).filter_by(status='approved')]
+    return {
+        'admin_id': admin_id,
+        'patron_ids': patron_ids,
+        'book_ids': book_ids,
+        'open_loan_ids': open_loans,
+        'search_terms': list(WORDS) + [s[:3].lower() for s in SURNAMES],
+    }
@@ -0,0 +1,136 @@
+"""Logging benchmark: request throughput with synchronous and queued log writes.
+
+Each mode reconfigures the root logging (see log_pipeline.py) and drives
+/api/search with N closed-loop clients, all logging to the same file:
+
+  sync      handlers write on the request thread, as logging.basicConfig did
+  queued    records go on a queue and a listener thread formats and writes them
+  sampled   queued, with only a fraction of api_search requests keeping INFO logs
+
+Run as `python -m library_management.benchmarks.logging_overhead`.
+"""
+import os
+import sys
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from ..database import db
+from ..log_pipeline import log_pipeline
+from .data import clear_data, generate
+from .runner import parse_scale, load_results, save_results
+from .concurrency import SCENARIOS, run_sync, format_result
+
+MODES = {
+    'sync': {'LOG_ASYNC': False},
+    'queued': {'LOG_ASYNC': True},
+    'sampled': {'LOG_ASYNC': True, 'LOG_SAMPLE_RATES': 'books.api_search=0.1'},
+}
+
+
+def run_logging_benchmark(app, scale, levels, requests=400, threads=8, modes=None, log_format='text',
+                          log_dir=None, seed=42, log=print):
+    """Measure /api/search throughput under each logging mode at each concurrency level."""
+    counts = parse_scale(scale)
+    with app.app_context():
+        db.create_all()
+        clear_data()
+        data = generate(seed=seed, **counts)
+    log(f"scale {scale}: {counts}")
+
+    log_dir = log_dir or tempfile.mkdtemp(prefix='library-bench-logs-')
+    scenario = SCENARIOS['search']
+    results = {}
+    try:
+        for mode in modes or list(MODES):
+            log_file = os.path.join(log_dir, f"{mode}.log")
+            config = dict(app.config, LOG_STDERR=False, LOG_FILE=log_file, LOG_FORMAT=log_format,
+                          LOG_LEVEL='INFO', LOG_SAMPLE_RATES='')
+            config.update(MODES[mode])
+            log_pipeline.configure(config)
+            results[mode] = {}
+            for clients in levels:
+                result = run_sync(app, scenario, data, clients, requests, threads, seed)
+                log_pipeline.flush()
+                result['log_bytes'] = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+                result['dropped'] = log_pipeline.stats()['dropped']
+                results[mode][str(clients)] = result
+                log(f"  {mode:<8} {clients:>4} clients  {format_result(result)}")
+    finally:
+        # Back to the app's own logging setup
+        log_pipeline.configure(app.config)
+        with app.app_context():
+            clear_data()
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'scale': scale,
+            'requests': requests,
+            'threads': threads,
+            'log_format': log_format,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=0.25):
+    """List mode/level combinations whose throughput fell by more than `tolerance`."""
+    regressions = []
+    for mode, levels in current['results'].items():
+        for clients, result in levels.items():
+            reference = baseline.get('results', {}).get(mode, {}).get(clients)
+            if reference and result['throughput_ops'] < reference['throughput_ops'] * (1 - tolerance):
+                regressions.append(f"{mode}/{clients} clients: "
+                                   f"{reference['throughput_ops']} -> {result['throughput_ops']} ops/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m library_management.benchmarks.logging_overhead',
+        description='Compare request throughput with synchronous and queued logging.')
+    parser.add_argument('--scale', default='1000', help="data scale; 'N' or 'books:users:reservations'")
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated client counts')
+    parser.add_argument('--requests', type=int, default=400, help='requests per mode and level')
+    parser.add_argument('--threads', type=int, default=8, help='worker threads given to the app')
+    parser.add_argument('--mode', action='append', dest='modes', choices=list(MODES),
+                        help='run only this logging mode (repeatable)')
+    parser.add_argument('--format', default='text', choices=('text', 'json'), dest='log_format')
+    parser.add_argument('--log-dir', help='where the log files go; defaults to a temporary directory')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='database to use instead of a temporary SQLite file; it is wiped')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against results from an earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed throughput drop against the baseline, as a fraction')
+    args = parser.parse_args(argv)
+
+    os.environ['DATABASE_URL'] = args.database_url or (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='library-bench-'), 'bench.db')}")
+    os.environ['RESPONSE_CACHE_ENABLED'] = '0'
+
+    from ..app import app
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    results = run_logging_benchmark(app, args.scale, levels, args.requests, args.threads, args.modes,
+                                    args.log_format, args.log_dir, args.seed)
+    if args.output:
+        save_results(results, args.output)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print('Regressions against baseline:')
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print('No regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import json
+import time
+import random
+import platform
+from datetime import datetime
+from sqlalchemy import event
+from ..database import db
+from ..stats import stats_cache
+from ..user_cache import user_cache
+from .data import clear_data, generate
+from .scenarios import SCENARIOS
+
+# Metrics compared against the baseline, with the direction that is worse
+COMPARED_METRICS = ('p95_ms', 'queries_per_op')
+
+
+def parse_scale(value):
+    """'N' means N books, N/10 patrons and 2N loans; 'B:U:R' sets each count."""
+    parts = [int(part) for part in str(value).split(':')]
+    if len(parts) == 1:
+        books = parts[0]
+        return {'books': books, 'users': max(books // 10, 10), 'reservations': books * 2}
+    books, users, reservations = parts
+    return {'books': books, 'users': users, 'reservations': reservations}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def measure(scenario, client, iterations, warmup, counter):
+    for _ in range(warmup):
+        scenario.run(client)
+
+    latencies = []
+    errors = 0
+    queries_before = counter.count
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_started = time.perf_counter()
+        status = scenario.run(client)
+        if status is None:
+            break
+        latencies.append(time.perf_counter() - op_started)
+        if status >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    ops = len(latencies)
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        'ops': ops,
+        'errors': errors,
+        'seconds': round(elapsed, 4),
+        'throughput_ops': round(ops / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p95_ms': round(percentile(latencies_ms, 95), 3),
+        'p99_ms': round(percentile(latencies_ms, 99), 3),
+        'max_ms': round(latencies_ms[-1], 3) if latencies_ms else 0.0,
+        'queries_per_op': round((counter.count - queries_before) / ops, 2) if ops else 0.0,
+    }
+
+
+def run_benchmarks(app, scales, iterations=100, warmup=3, scenarios=None, seed=42, log=print):
+    """Run every scenario at every data scale and return the results as a dict.
+
+    Requests are sent outside any app context, as in production: an outer
+    context would share `g` (and Flask-Login's cached user) between requests.
+    """
+    names = scenarios or list(SCENARIOS)
+    results = {}
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+
+    for scale in scales:
+        counts = parse_scale(scale)
+        with app.app_context():
+            clear_data()
+            user_cache.clear()
+            stats_cache.invalidate()
+            started = time.perf_counter()
+            data = generate(seed=seed, **counts)
+        log(f"scale {scale}: generated {counts} in {time.perf_counter() - started:.1f}s")
+
+        scale_results = results[str(scale)] = {}
+        counter = StatementCounter()
+        event.listen(engine, 'before_cursor_execute', counter)
+        try:
+            for name in names:
+                client = app.test_client()
+                scenario = SCENARIOS[name]()
+                scenario.setup(client, data, random.Random(seed))
+                scale_results[name] = measure(scenario, client, iterations, warmup, counter)
+                log(f"  {name:<20} {format_result(scale_results[name])}")
+        finally:
+            event.remove(engine, 'before_cursor_execute', counter)
+
+    with app.app_context():
+        clear_data()
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+            'iterations': iterations,
+            'warmup': warmup,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def format_result(result):
+    return (f"{result['throughput_ops']:>9.1f} ops/s  p50 {result['p50_ms']:>8.2f} ms  "
+            f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+            f"{result['queries_per_op']:>6.2f} queries/op  {result['errors']} errors")
+
+
+def compare(current, baseline, tolerance=0.25):
+    """List regressions of `current` against `baseline`.
+
+    Latency may grow by `tolerance` (a fraction) before it counts; any
+    increase in queries per operation is a regression.
+    """
+    regressions = []
+    for scale, scenarios in current['results'].items():
+        for name, result in scenarios.items():
+            reference = baseline.get('results', {}).get(scale, {}).get(name)
+            if not reference:
+                continue
+            if result['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{scale}/{name}: p95 {reference['p95_ms']} -> {result['p95_ms']} ms")
+            if result['queries_per_op'] > reference['queries_per_op']:
+                regressions.append(f"{scale}/{name}: queries/op "
+                                   f"{reference['queries_per_op']} -> {result['queries_per_op']}")
+    return regressions
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(results, stream, indent=2, sort_keys=True)
@@ -0,0 +1,121 @@
+from ..fines import recalculate_fines
+
+
+def _login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+class Scenario:
+    """One benchmarked operation; `run` performs it once and returns a status."""
+
+    name = None
+    as_admin = False
+
+    def setup(self, client, data, rng):
+        self.data = data
+        self.rng = rng
+        user_id = data['admin_id'] if self.as_admin else rng.choice(data['patron_ids'])
+        _login(client, user_id)
+
+    def run(self, client):
+        raise NotImplementedError
+
+
+class Search(Scenario):
+    name = 'search'
+
+    def run(self, client):
+        return client.get('/search', query_string={'query': self.rng.choice(self.data['search_terms'])}).status_code
+
+
+class ApiSearch(Scenario):
+    name = 'api_search'
+
+    def run(self, client):
+        term = self.rng.choice(self.data['search_terms'])
+        return client.get('/api/search', query_string={'query': term, 'limit': 50}).status_code
+
+
+class ReserveBook(Scenario):
+    name = 'reserve_book'
+
+    def run(self, client):
+        return client.post(f"/reserve/{self.rng.choice(self.data['book_ids'])}").status_code
+
+
+class ReturnBook(Scenario):
+    name = 'return_book'
+    as_admin = True
+
+    def setup(self, client, data, rng):
+        super().setup(client, data, rng)
+        self.loans = list(data['open_loan_ids'])
+        rng.shuffle(self.loans)
+
+    def run(self, client):
+        if not self.loans:
+            return None  # every open loan has been returned
+        return client.post(f"/return_book/{self.loans.pop()}").status_code
+
+
+class BatchReturn(ReturnBook):
+    """A returns cart of up to `batch_size` loans in one request.
+
+    Takes loans from the front of the same shuffled list return_book pops
+    from the back of, so at larger scales the two never return the same loan.
+    """
+
+    name = 'batch_return'
+    batch_size = 10
+
+    def setup(self, client, data, rng):
+        super().setup(client, data, rng)
+        # Small datasets get smaller carts, so warm-up does not use every loan
+        self.batch_size = max(1, min(self.batch_size, len(self.loans) // 10))
+
+    def run(self, client):
+        if not self.loans:
+            return None
+        cart, self.loans = self.loans[:self.batch_size], self.loans[self.batch_size:]
+        return client.post('/admin/reservations/batch', json={'ids': cart, 'status': 'returned'}).status_code
+
+
+class AccountSummary(Scenario):
+    name = 'account_summary'
+
+    def run(self, client):
+        return client.get('/api/account/summary').status_code
+
+
+class AdminReservations(Scenario):
+    name = 'admin_reservations'
+    as_admin = True
+
+    def run(self, client):
+        return client.get('/admin_reservations').status_code
+
+
+class OverdueBooks(Scenario):
+    name = 'overdue_books'
+    as_admin = True
+
+    def run(self, client):
+        return client.get('/overdue_books').status_code
+
+
+class UpdateFines(Scenario):
+    """The nightly job, called directly rather than through a route."""
+
+    name = 'update_fines'
+
+    def run(self, client):
+        with client.application.app_context():
+            recalculate_fines()
+        return 200
+
+
+SCENARIOS = {cls.name: cls for cls in (
+    Search, ApiSearch, ReserveBook, ReturnBook, BatchReturn, AccountSummary, AdminReservations, OverdueBooks, UpdateFines,
+)}
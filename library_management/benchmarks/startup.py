@@ -0,0 +1,143 @@
+"""Cold-start benchmark: how long a fresh process takes to import and boot the app.
+
+Each run is a new interpreter; only compiled bytecode and the OS file cache
+carry over between runs. Run as `python -m library_management.benchmarks.startup`.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from .runner import percentile, load_results, save_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs in the child; phases are timed from inside the process
+CHILD_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from library_management.factory import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'first_request': served - created}))
+"""
+
+PHASES = ('boot', 'import', 'create_app', 'first_request')
+
+
+def child_env(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    return env
+
+
+def run_once(env):
+    """One cold start. 'boot' is the whole process, interpreter start-up included."""
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings['boot'] = time.perf_counter() - started
+    return timings
+
+
+def slowest_imports(env, limit=10):
+    """Modules with the most self time under `python -X importtime`."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import library_management.app'],
+                            env=env, cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({'module': name.strip(), 'self_ms': round(int(self_us) / 1000, 1),
+                        'cumulative_ms': round(int(cumulative_us) / 1000, 1)})
+    return sorted(modules, key=lambda module: module['self_ms'], reverse=True)[:limit]
+
+
+def run_startup_benchmark(runs=10, database_url=None, log=print):
+    database_url = database_url or (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='library-startup-'), 'startup.db')}")
+    env = child_env(database_url)
+    run_once(env)  # warm the bytecode cache, as a deployed worker would have it
+
+    samples = {phase: [] for phase in PHASES}
+    for _ in range(runs):
+        for phase, seconds in run_once(env).items():
+            samples[phase].append(seconds * 1000)
+
+    results = {}
+    for phase in PHASES:
+        values = sorted(samples[phase])
+        results[phase] = {
+            'runs': len(values),
+            'p50_ms': round(percentile(values, 50), 1),
+            'p95_ms': round(percentile(values, 95), 1),
+            'max_ms': round(values[-1], 1),
+        }
+        log(f"  {phase:<14} p50 {results[phase]['p50_ms']:>8.1f} ms  p95 {results[phase]['p95_ms']:>8.1f} ms")
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'runs': runs,
+        },
+        'results': results,
+        'slowest_imports': slowest_imports(env),
+    }
+
+
+def compare(current, baseline, tolerance=0.25):
+    """List phases whose p95 grew by more than `tolerance` over the baseline."""
+    regressions = []
+    for phase, result in current['results'].items():
+        reference = baseline.get('results', {}).get(phase)
+        if reference and result['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{phase}: p95 {reference['p95_ms']} -> {result['p95_ms']} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m library_management.benchmarks.startup',
+        description='Measure cold import and boot time of the web app in fresh processes.')
+    parser.add_argument('--runs', type=int, default=10, help='cold starts to measure')
+    parser.add_argument('--database-url', help='database the app is configured with; it is not touched')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against results from an earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 growth over the baseline, as a fraction')
+    args = parser.parse_args(argv)
+
+    print(f"{args.runs} cold starts:")
+    results = run_startup_benchmark(args.runs, args.database_url)
+    print('Slowest imports (self time):')
+    for module in results['slowest_imports']:
+        print(f"  {module['self_ms']:>7.1f} ms  {module['module']}")
+
+    if args.output:
+        save_results(results, args.output)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print('Regressions against baseline:')
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print('No regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,356 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from flask import (Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify,
+                   make_response, Response, stream_with_context)
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from ..database import db, use_read_engine
+from ..models import Book, Reservation, Hold
+from ..search import (catalog_query, search_cache_key, API_BOOK_FIELDS, API_DEFAULT_FIELDS, API_DEFAULT_LIMIT,
+                      API_MAX_LIMIT)
+from ..circulation import claim_copy
+from ..holds import place_hold, queue_position, queue_positions, claim_hold, cancel_hold, ACTIVE_HOLD_STATUSES
+from ..response_cache import (response_cache, bump_catalog_version, cached_response, conditional_response,
+                              normalize_query)
+from ..availability import availability
+from ..notifications import notify_reservation_created
+from ..archive import reservation_history
+from ..patron_summary import adjust_patron_summary
+from ..patrons import patron_summary
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('books', __name__)
+
+# Rows per keyset batch of a streamed /api/search export
+API_STREAM_BATCH_SIZE = 1000
+
+
+@bp.route('/')
+def home():
+    logger.info("Route: home")
+    return render_template('home.html')
+
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    logger.info("Route: dashboard")
+    if current_user.is_admin:
+        logger.info("Admin %s accessed admin dashboard.", current_user.username)
+    else:
+        logger.info("User %s accessed user dashboard.", current_user.username)
+    return render_template('home.html')
+
+
+def search_listing(query):
+    # Only what does not change on a loan or return; counts come from the availability snapshot
+    rows = catalog_query(query).with_entities(Book.id, Book.title, Book.author).all()
+    return [{'id': row.id, 'title': row.title, 'author': row.author} for row in rows]
+
+
+def login_variant():
+    # The search page only differs by login state (the navigation links)
+    if current_user.is_authenticated:
+        return 'admin' if current_user.is_admin else 'user'
+    return 'anonymous'
+
+
+@bp.route('/search')
+@use_read_engine
+def search():
+    logger.info("Route: search")
+    query = normalize_query(request.args.get('query'))
+    logger.info("Search query: %s", query)
+    try:
+        listing = response_cache.cached_listing('search', {'query': search_cache_key(query)},
+                                                lambda: search_listing(query))
+        counts = availability.get_many([book['id'] for book in listing])
+        # Books deleted since the listing was cached have no count and drop out
+        books = [dict(book, available=counts[book['id']][0]) for book in listing if book['id'] in counts]
+        logger.info("Number of books found: %s", len(books))
+
+        if not response_cache.enabled:
+            response = make_response(render_template('search.html', books=books, query=query))
+            response.add_etag()
+            return conditional_response(response, vary_cookie=True)
+
+        # The rendered page is reused until one of *these* books changes, not on
+        # every loan in the library
+        params = {'query': query, 'variant': login_variant(),
+                  'counts': hash(tuple(book['available'] for book in books))}
+        key = response_cache.make_key(request.endpoint, params, version=response_cache.listing_version())
+        entry = response_cache.get(key)
+        if entry is None:
+            entry = response_cache.store(key, make_response(render_template('search.html', books=books,
+                                                                            query=query)))
+    except Exception as e:
+        logger.error("Error in search: %s", e)
+        flash(f"An error occurred while searching: {str(e)}", 'error')
+        return render_template('search.html', books=[], query=query)
+
+    response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+    response.set_etag(entry['etag'])
+    return conditional_response(response, vary_cookie=True)
+
+
+def iter_book_rows(base_query, columns, cursor, batch_size, max_rows=None):
+    """Yield projected book rows with id > cursor in id order, one keyset batch at a time."""
+    sent = 0
+    while max_rows is None or sent < max_rows:
+        size = batch_size if max_rows is None else min(batch_size, max_rows - sent)
+        rows = (base_query
+                .with_entities(*columns)
+                .filter(Book.id > cursor)
+                .order_by(None)
+                .order_by(Book.id)
+                .limit(size)
+                .all())
+        for row in rows:
+            yield row
+        sent += len(rows)
+        if len(rows) < size:
+            return
+        cursor = rows[-1].id
+
+
+def api_search_cache_params():
+    # Streamed formats go straight to the database
+    if request.args.get('format', 'json') != 'json':
+        return None
+    return {
+        'query': search_cache_key(normalize_query(request.args.get('query'))),
+        'cursor': request.args.get('cursor', 0, type=int),
+        'limit': min(request.args.get('limit', API_DEFAULT_LIMIT, type=int), API_MAX_LIMIT),
+        'fields': request.args.get('fields') or ','.join(API_DEFAULT_FIELDS),
+    }
+
+
+@bp.route('/api/search')
+@cached_response(api_search_cache_params)
+@use_read_engine
+def api_search():
+    logger.info("Route: api_search")
+    query = request.args.get('query', '')
+    response_format = request.args.get('format', 'json')
+    cursor = request.args.get('cursor', 0, type=int)
+    limit = request.args.get('limit', API_DEFAULT_LIMIT, type=int)
+
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(API_DEFAULT_FIELDS)
+    unknown = [f for f in fields if f not in API_BOOK_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+    if response_format not in ('json', 'ndjson', 'stream'):
+        return jsonify({"error": f"Unknown format: {response_format}"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+
+    # The keyset cursor needs the id even when the client did not ask for it
+    columns = [getattr(Book, f) for f in fields]
+    if 'id' not in fields:
+        columns.append(Book.id)
+
+    def project(row):
+        return {f: getattr(row, f) for f in fields}
+
+    try:
+        base_query = catalog_query(query)
+
+        if response_format != 'json':
+            # Streamed export: every matching row after `cursor`, fetched in keyset
+            # batches so the full result never sits in memory.
+            max_rows = request.args.get('limit', type=int)
+            rows = iter_book_rows(base_query, columns, cursor, API_STREAM_BATCH_SIZE, max_rows)
+
+            if response_format == 'ndjson':
+                def generate():
+                    for row in rows:
+                        yield json.dumps(project(row)) + '\n'
+                return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+            def generate():
+                yield '['
+                for i, row in enumerate(rows):
+                    yield (',' if i else '') + json.dumps(project(row))
+                yield ']'
+            return Response(stream_with_context(generate()), mimetype='application/json')
+
+        limit = min(limit, API_MAX_LIMIT)
+        rows = list(iter_book_rows(base_query, columns, cursor, limit, limit))
+        response = jsonify([project(row) for row in rows])
+
+        if len(rows) == limit:
+            next_cursor = rows[-1].id
+            next_args = request.args.to_dict()
+            next_args['cursor'] = next_cursor
+            response.headers['X-Next-Cursor'] = str(next_cursor)
+            response.headers['Link'] = f'<{url_for("books.api_search", **next_args)}>; rel="next"'
+        return response
+    except Exception as e:
+        logger.error("API Search Error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route('/api/availability', methods=['GET', 'POST'])
+def api_availability():
+    """Availability for many books in one call: GET ?ids=1,2,3 or POST {"ids": [1, 2, 3]}.
+
+    Answered from the availability snapshot, so counts may be up to
+    AVAILABILITY_MAX_STALENESS seconds behind other workers' writes.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        values = body.get('ids') if isinstance(body, dict) else None
+        if not isinstance(values, list):
+            return jsonify({"error": "Expected a JSON object with an 'ids' list"}), 400
+    else:
+        values = [part for part in request.args.get('ids', '').split(',') if part.strip()]
+
+    try:
+        book_ids = list(dict.fromkeys(int(str(value).strip()) for value in values))
+    except ValueError:
+        return jsonify({"error": "Book ids must be integers"}), 400
+    if not book_ids:
+        return jsonify({"error": "No book ids given"}), 400
+    max_batch = current_app.config['AVAILABILITY_MAX_BATCH']
+    if len(book_ids) > max_batch:
+        return jsonify({"error": f"At most {max_batch} book ids per request"}), 400
+
+    counts = availability.get_many(book_ids)
+    response = jsonify({
+        'books': [{'id': book_id, 'available': counts[book_id][0], 'quantity': counts[book_id][1]}
+                  for book_id in book_ids if book_id in counts],
+        'missing': [book_id for book_id in book_ids if book_id not in counts],
+    })
+    response.headers['X-Availability-Version'] = str(availability.version)
+    return response
+
+
+@bp.route('/reserve/<int:book_id>', methods=['POST'])
+@login_required
+def reserve_book(book_id):
+    logger.info("Route: reserve_book for book_id %s", book_id)
+    book = Book.query.get_or_404(book_id)
+    try:
+        # Decrement only if a copy is still available; the row count says whether we got it
+        if claim_copy(book_id):
+            reservation = Reservation(user_id=current_user.id, book_id=book_id)
+            reservation.due_date = datetime.utcnow() + timedelta(days=14)
+            db.session.add(reservation)
+            adjust_patron_summary(current_user.id, open_loans=1, total_loans=1)
+            notify_reservation_created(reservation)
+            db.session.commit()
+            bump_catalog_version(availability_only=True)
+            flash('Book reserved successfully!', 'success')
+            logger.info("User %s reserved book %s.", current_user.username, book.title)
+        else:
+            # No copy left: join the waitlist instead of polling the search page
+            hold, created = place_hold(current_user.id, book_id)
+            position = queue_position(hold) if hold.status == 'waiting' else None
+            db.session.commit()
+            if hold.status == 'ready':
+                flash('A copy of this book is already set aside for you. Check it out from My Reservations.', 'info')
+            elif created:
+                flash(f'No copies are available. You have been added to the waitlist at position {position}.', 'info')
+            else:
+                flash(f'You are already on the waitlist for this book, at position {position}.', 'info')
+            logger.info("Book %s unavailable; user %s holds place %s.", book.title, current_user.username, position)
+    except Exception as e:
+        logger.error("Error reserving book: %s", e)
+        flash(f"An error occurred during reservation: {e}", 'error')
+        db.session.rollback()
+
+    # Search pages are cached and shared, so the outcome is flashed where the
+    # patron's loans and queue positions are listed
+    return redirect(url_for('books.my_reservations'))
+
+
+@bp.route('/my_reservations')
+@login_required
+def my_reservations():
+    logger.info("Route: my_reservations")
+    # Old returned and cancelled loans live in the archive; shown only on request
+    include_archived = bool(request.args.get('include_archived', type=int))
+    entity = reservation_history() if include_archived else Reservation
+    reservations = (db.session.query(entity)
+                    .options(joinedload(entity.book))
+                    .filter(entity.user_id == current_user.id)
+                    .all())
+    holds = (Hold.query
+             .options(joinedload(Hold.book))
+             .filter(Hold.user_id == current_user.id, Hold.status.in_(ACTIVE_HOLD_STATUSES))
+             .order_by(Hold.date_placed)
+             .all())
+    positions = queue_positions(holds)
+    return render_template('my_reservations.html', reservations=reservations, holds=holds,
+                           positions=positions, include_archived=include_archived)
+
+
+@bp.route('/account')
+@login_required
+def account_summary():
+    logger.info("Route: account_summary")
+    due_soon_days = current_app.config['PATRON_DUE_SOON_DAYS']
+    summary = patron_summary(current_user.id, due_soon_days=due_soon_days)
+    return render_template('account_summary.html', summary=summary, due_soon_days=due_soon_days)
+
+
+def isoformat_dates(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: isoformat_dates(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [isoformat_dates(item) for item in value]
+    return value
+
+
+@bp.route('/api/account/summary')
+def api_account_summary():
+    """The patron summary as JSON for the mobile client, with ISO 8601 dates."""
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Login required"}), 401
+    summary = patron_summary(current_user.id, due_soon_days=current_app.config['PATRON_DUE_SOON_DAYS'])
+    return jsonify(isoformat_dates(summary))
+
+
+@bp.route('/holds/<int:hold_id>/checkout', methods=['POST'])
+@login_required
+def checkout_hold(hold_id):
+    logger.info("Route: checkout_hold for hold_id %s", hold_id)
+    try:
+        reservation = claim_hold(hold_id, current_user.id)
+        if reservation is not None:
+            notify_reservation_created(reservation)
+            db.session.commit()
+            flash('Book reserved successfully!', 'success')
+            logger.info("User %s checked out hold %s.", current_user.username, hold_id)
+        else:
+            db.session.rollback()
+            flash('This hold is no longer ready for pickup.', 'warning')
+    except Exception as e:
+        logger.error("Error checking out hold: %s", e)
+        flash(f"An error occurred during reservation: {e}", 'error')
+        db.session.rollback()
+    return redirect(url_for('books.my_reservations'))
+
+
+@bp.route('/holds/<int:hold_id>/cancel', methods=['POST'])
+@login_required
+def cancel_hold_route(hold_id):
+    logger.info("Route: cancel_hold for hold_id %s", hold_id)
+    try:
+        if cancel_hold(hold_id, current_user.id, pickup_days=current_app.config['HOLD_PICKUP_DAYS']):
+            db.session.commit()
+            bump_catalog_version(availability_only=True)
+            flash('Hold cancelled.', 'success')
+        else:
+            db.session.rollback()
+            flash('This hold can no longer be cancelled.', 'warning')
+    except Exception as e:
+        logger.error("Error cancelling hold: %s", e)
+        flash(f"An error occurred cancelling the hold: {e}", 'error')
+        db.session.rollback()
+    return redirect(url_for('books.my_reservations'))
@@ -0,0 +1,148 @@
+import csv
+import json
+import time
+import logging
+from sqlalchemy import func
+from sqlalchemy.dialects import sqlite, postgresql
+from .database import db
+from .models import Book
+from .search import normalize_isbn
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def isbn_checksum_ok(isbn):
+    if len(isbn) == 10:
+        total = sum((10 - i) * (10 if ch == 'X' else int(ch)) for i, ch in enumerate(isbn))
+        return total % 11 == 0
+    if 'X' in isbn:
+        return False
+    total = sum((1 if i % 2 == 0 else 3) * int(ch) for i, ch in enumerate(isbn))
+    return total % 10 == 0
+
+
+def clean_row(row):
+    """Validate one input record and return the values to upsert."""
+    if not isinstance(row, dict):
+        raise ImportRowError("not a JSON object")
+    isbn = normalize_isbn(str(row.get('isbn') or ''))
+    if not isbn or not isbn_checksum_ok(isbn):
+        raise ImportRowError(f"invalid ISBN {row.get('isbn')!r}")
+    title = (row.get('title') or '').strip()
+    author = (row.get('author') or '').strip()
+    if not title or not author:
+        raise ImportRowError("title and author are required")
+    quantity = row.get('quantity')
+    try:
+        quantity = 1 if quantity in (None, '') else int(quantity)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"invalid quantity {row.get('quantity')!r}")
+    if quantity < 0:
+        raise ImportRowError(f"invalid quantity {quantity}")
+    return {'isbn': isbn, 'title': title[:200], 'author': author[:100], 'quantity': quantity, 'available': quantity}
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None  # rejected by clean_row() like any other bad record
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+def upsert_statement(dialect_name):
+    """INSERT ... ON CONFLICT (isbn) DO UPDATE for the current backend.
+
+    Existing titles keep the copies already on loan: available moves by the
+    change in quantity, never below zero.
+    """
+    if dialect_name == 'sqlite':
+        insert, greatest = sqlite.insert, func.max
+    elif dialect_name == 'postgresql':
+        insert, greatest = postgresql.insert, func.greatest
+    else:
+        raise RuntimeError(f"Bulk import does not support the {dialect_name} backend.")
+
+    statement = insert(Book)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[Book.isbn],
+        set_={
+            'title': excluded.title,
+            'author': excluded.author,
+            'quantity': excluded.quantity,
+            'available': greatest(Book.available + excluded.quantity - Book.quantity, 0),
+        })
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.batches = 0
+        self.elapsed = 0.0
+        self.errors = []
+
+    @property
+    def rows_per_second(self):
+        return self.rows_written / self.elapsed if self.elapsed else 0.0
+
+
+def import_books(stream, file_format='csv', batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Stream records from `stream` and upsert them on isbn in batches.
+
+    Only one batch is held in memory at a time. `progress` is called after each
+    batch with (batch number, rows in batch, seconds, ImportResult).
+    """
+    statement = upsert_statement(db.session.get_bind().dialect.name)
+    result = ImportResult()
+    started = time.perf_counter()
+    batch = {}
+
+    def flush():
+        batch_started = time.perf_counter()
+        db.session.execute(statement, list(batch.values()))
+        db.session.commit()
+        result.batches += 1
+        result.rows_written += len(batch)
+        if progress:
+            progress(result.batches, len(batch), time.perf_counter() - batch_started, result)
+        batch.clear()
+
+    for line_number, row in enumerate(READERS[file_format](stream), start=1):
+        result.rows_read += 1
+        try:
+            values = clean_row(row)
+        except ImportRowError as e:
+            result.rows_rejected += 1
+            if len(result.errors) < MAX_REPORTED_ERRORS:
+                result.errors.append(f"record {line_number}: {e}")
+            continue
+        # Later records for the same ISBN win; one statement can't update a row twice
+        batch[values['isbn']] = values
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    result.elapsed = time.perf_counter() - started
+    logger.info("Imported %s books in %s batches (%s rejected, %.2fs)",
+                result.rows_written, result.batches, result.rows_rejected, result.elapsed)
+    return result
@@ -0,0 +1,65 @@
+from sqlalchemy import update, case
+from .database import db
+from .models import Book, Reservation
+from .availability import record_availability_change
+
+# Copy counts and reservation status changes are done as conditional UPDATEs
+# so the check and the write happen in one statement. Two workers racing for
+# the last copy cannot both win: the loser's UPDATE matches no row.
+
+
+def claim_copy(book_id):
+    """Take one available copy of a book. Returns False if none were left."""
+    result = db.session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.available > 0)
+        .values(available=Book.available - 1)
+        .execution_options(synchronize_session=False))
+    if result.rowcount != 1:
+        return False
+    record_availability_change(book_id)
+    return True
+
+
+def release_copy(book_id):
+    """Put one copy of a book back, never above its quantity."""
+    result = db.session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.available < Book.quantity)
+        .values(available=Book.available + 1)
+        .execution_options(synchronize_session=False))
+    if result.rowcount != 1:
+        return False
+    record_availability_change(book_id)
+    return True
+
+
+def release_copies(copies):
+    """release_copy for many books in one UPDATE; `copies` maps book_id to the number returned."""
+    if not copies:
+        return
+    available = Book.available + case(copies, value=Book.id, else_=0)
+    db.session.execute(
+        update(Book)
+        .where(Book.id.in_(list(copies)))
+        .values(available=case((available > Book.quantity, Book.quantity), else_=available))
+        .execution_options(synchronize_session=False))
+    record_availability_change(*copies)
+
+
+def transition_reservation(reservation_id, to_status, from_statuses=None, exclude_statuses=None, **values):
+    """Move a reservation to `to_status` only if it is still in an allowed state.
+
+    Returns True if this call made the change, False if another request got
+    there first or the reservation was not in an allowed state.
+    """
+    statement = update(Reservation).where(Reservation.id == reservation_id)
+    if from_statuses is not None:
+        statement = statement.where(Reservation.status.in_(from_statuses))
+    if exclude_statuses is not None:
+        statement = statement.where(Reservation.status.notin_(exclude_statuses))
+    result = db.session.execute(
+        statement
+        .values(status=to_status, **values)
+        .execution_options(synchronize_session=False))
+    return result.rowcount == 1
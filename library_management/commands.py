@@ -0,0 +1,222 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.security import generate_password_hash
+from .database import db
+from .models import User, Book
+from .stats import invalidate_library_stats
+from .catalog_import import import_books, DEFAULT_BATCH_SIZE as DEFAULT_IMPORT_BATCH_SIZE
+from .reports import REPORTS, EXPORT_FORMATS, iter_report, month_range
+from .jobs import job_registry
+from .passwords import password_hasher
+from .response_cache import bump_catalog_version
+from .notifications import dispatcher as notification_dispatcher
+from .archive import archive_reservations, table_report, ARCHIVE_BATCH_SIZE
+from .patron_summary import rebuild_patron_summaries
+from .search import rebuild_search_index
+
+SAMPLE_BOOKS = (
+    ("To Kill a Mockingbird", "Harper Lee", "9780061120084", 5),
+    ("1984", "George Orwell", "9780451524935", 3),
+    ("Pride and Prejudice", "Jane Austen", "9780141439518", 4),
+)
+
+
+@click.command('create-db')
+@with_appcontext
+def create_db_command():
+    """Create any missing tables. Databases managed by migrations use `flask db upgrade` instead."""
+    db.create_all()
+    click.echo(f"Tables ready in {db.engine.url.render_as_string(hide_password=True)}")
+
+
+@click.command('seed')
+@click.option('--admin-password', default='admin_password', show_default=True,
+              help='Password for the admin account, if it has to be created.')
+@click.option('--sample-books', is_flag=True, help='Also add a few sample books.')
+@with_appcontext
+def seed_command(admin_password, sample_books):
+    """Create the admin account (and optionally sample books) if missing."""
+    if User.query.filter_by(username='admin').first():
+        click.echo("Admin user already exists.")
+    else:
+        db.session.add(User(username='admin', is_admin=True,
+                            password=generate_password_hash(admin_password, password_hasher.method)))
+        db.session.commit()
+        click.echo("Admin user created.")
+
+    if sample_books:
+        existing = {isbn for (isbn,) in db.session.query(Book.isbn)}
+        books = [Book(title=title, author=author, isbn=isbn, quantity=quantity, available=quantity)
+                 for title, author, isbn, quantity in SAMPLE_BOOKS if isbn not in existing]
+        db.session.add_all(books)
+        db.session.commit()
+        invalidate_library_stats()
+        bump_catalog_version()
+        click.echo(f"Added {len(books)} sample books.")
+
+
+@click.command('run-jobs')
+@with_appcontext
+def run_jobs_command():
+    """Run the job scheduler in the foreground. Start one or more of these beside the web workers."""
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    scheduler = BlockingScheduler(timezone='UTC')
+    job_registry.schedule(scheduler)
+    click.echo(f"Scheduling {', '.join(job.id for job in scheduler.get_jobs())}")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
+@click.command('run-job')
+@click.argument('name')
+@with_appcontext
+def run_job_command(name):
+    """Run one scheduled job now, under the same lease as the scheduler."""
+    if name not in job_registry.jobs:
+        raise click.BadParameter(f"choose from {', '.join(sorted(job_registry.jobs))}", param_hint='NAME')
+    run = job_registry.run(name)
+    if run is None:
+        click.echo(f"{name} is running elsewhere or ran less than a minute ago; skipped")
+    else:
+        click.echo(f"{name}: {run.status} in {run.duration:.2f}s, {run.rows_processed} rows"
+                   + (f" ({run.error})" if run.error else ""))
+
+
+@click.command('job-history')
+@click.option('--job', 'name', default=None, help='Only show runs of this job.')
+@click.option('--limit', default=20, show_default=True)
+@with_appcontext
+def job_history_command(name, limit):
+    """Show recent job runs with their duration and rows processed."""
+    for run in job_registry.recent_runs(name, limit):
+        duration = f"{run.duration:.2f}s" if run.duration is not None else '-'
+        click.echo(f"{run.started_at:%Y-%m-%d %H:%M:%S}  {run.job_name:<24} {run.status:<8} "
+                   f"{duration:>9}  {run.rows_processed if run.rows_processed is not None else '-':>8} rows  "
+                   f"{run.owner}")
+
+
+@click.command('send-notifications')
+@with_appcontext
+def send_notifications_command():
+    """Send every due message in the notification outbox now."""
+    result = notification_dispatcher.dispatch_all()
+    click.echo(f"{result.sent} sent, {result.retried} to retry, {result.failed} failed")
+
+
+@click.command('import-books')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Input format; guessed from the file extension by default.')
+@click.option('--batch-size', default=DEFAULT_IMPORT_BATCH_SIZE, show_default=True,
+              help='Rows per INSERT ... ON CONFLICT batch.')
+@with_appcontext
+def import_books_command(path, file_format, batch_size):
+    """Upsert books from a CSV or JSONL file with isbn, title, author and quantity."""
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+    def report(batch_number, rows, seconds, result):
+        rate = rows / seconds if seconds else 0
+        click.echo(f"batch {batch_number}: {rows} rows in {seconds:.2f}s ({rate:.0f} rows/s), "
+                   f"{result.rows_written} written, {result.rows_rejected} rejected so far")
+
+    with open(path, newline='', encoding='utf-8') as stream:
+        result = import_books(stream, file_format, batch_size, progress=report)
+    invalidate_library_stats()
+    bump_catalog_version()
+
+    for error in result.errors:
+        click.echo(f"rejected {error}", err=True)
+    click.echo(f"Imported {result.rows_written} of {result.rows_read} records in {result.elapsed:.2f}s "
+               f"({result.rows_per_second:.0f} rows/s, {result.rows_rejected} rejected).")
+
+
+def parse_month(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return month_range(value)
+    except ValueError:
+        raise click.BadParameter(f"expected YYYY-MM, got {value!r}")
+
+
+@click.command('export-report')
+@click.argument('report', type=click.Choice(sorted(REPORTS)))
+@click.option('--format', 'export_format', type=click.Choice(sorted(EXPORT_FORMATS)), default='csv',
+              show_default=True)
+@click.option('--output', '-o', type=click.Path(dir_okay=False, writable=True), default='-',
+              help='File to write; standard output by default.')
+@click.option('--month', callback=parse_month, help='Limit to one month, as YYYY-MM.')
+@click.option('--date-from', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--date-to', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--include-archived', is_flag=True, help='Also include reservations moved to the archive.')
+@with_appcontext
+def export_report_command(report, export_format, output, month, date_from, date_to, include_archived):
+    """Stream a circulation, fines or catalog report to a file."""
+    if month:
+        date_from, date_to = month
+    with click.open_file(output, 'w', encoding='utf-8') as stream:
+        for chunk in iter_report(report, export_format, date_from, date_to, include_archived):
+            stream.write(chunk)
+
+
+def echo_table_report(title, report):
+    click.echo(title)
+    for table, rows in report['rows'].items():
+        click.echo(f"  {table:<22} {rows:>10} rows")
+    for name, ms in report['query_ms'].items():
+        click.echo(f"  {name:<22} {ms:>10.3f} ms")
+
+
+@click.command('archive-reservations')
+@click.option('--older-than-days', type=int, default=None,
+              help='Archive closed reservations older than this; ARCHIVE_AFTER_DAYS by default.')
+@click.option('--batch-size', type=int, default=None,
+              help=f'Rows moved per transaction; ARCHIVE_BATCH_SIZE ({ARCHIVE_BATCH_SIZE}) by default.')
+@click.option('--report/--no-report', default=True, show_default=True,
+              help='Print table sizes and hot query timings before and after.')
+@with_appcontext
+def archive_reservations_command(older_than_days, batch_size, report):
+    """Move old returned and cancelled reservations into reservation_archive."""
+    config = current_app.config
+    if report:
+        echo_table_report('Before:', table_report())
+    moved = archive_reservations(older_than_days if older_than_days is not None else config['ARCHIVE_AFTER_DAYS'],
+                                 batch_size or config['ARCHIVE_BATCH_SIZE'])
+    invalidate_library_stats()
+    click.echo(f"Archived {moved} reservations.")
+    if report:
+        echo_table_report('After:', table_report())
+
+
+@click.command('rebuild-patron-summaries')
+@with_appcontext
+def rebuild_patron_summaries_command():
+    """Recompute every patron's loan and fine totals, e.g. after editing reservations by hand."""
+    rows = rebuild_patron_summaries()
+    db.session.commit()
+    click.echo(f"Rebuilt {rows} patron summaries.")
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Repopulate the full-text catalog index from the book table, e.g. after editing books by hand."""
+    if db.session.get_bind().dialect.name != 'sqlite':
+        click.echo("Only SQLite has a full-text index; other databases search the book table directly.")
+        return
+    rebuild_search_index()
+    bump_catalog_version()
+    click.echo("Search index rebuilt.")
+
+
+COMMANDS = (create_db_command, seed_command, run_jobs_command, run_job_command, job_history_command,
+            send_notifications_command, import_books_command, export_report_command,
+            archive_reservations_command, rebuild_patron_summaries_command, rebuild_search_index_command)
+
+
+def register_commands(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
@@ -0,0 +1,288 @@
+import os
+from functools import partial
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from .database import db, READ_BIND_KEY
+
+# Holds instance/config.py and the default SQLite database
+INSTANCE_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance')
+
+# Async drivers used by the async API tier, by backend
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql',
+}
+
+
+class Config:
+    SECRET_KEY = 'your_secret_key_here'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    STATS_CACHE_TTL = 30
+
+    # load_user() cache; set USER_CACHE_URL (redis://...) to share it between workers
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 300  # seconds
+    USER_CACHE_URL = None
+
+    # Cache for rendered search pages and API results; RESPONSE_CACHE_URL shares it
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_SIZE = 512
+    RESPONSE_CACHE_TTL = 60  # seconds
+    RESPONSE_CACHE_URL = None
+
+    # Returned and cancelled reservations older than this move to reservation_archive
+    ARCHIVE_AFTER_DAYS = 365
+    ARCHIVE_BATCH_SIZE = 500  # rows per archive transaction
+
+    # Days of job_run history kept by the prune_job_history job
+    JOB_HISTORY_DAYS = 30
+
+    # Logging. With LOG_ASYNC, records are queued and written by a background
+    # thread; see log_pipeline.py.
+    LOG_LEVEL = 'INFO'
+    LOG_FORMAT = 'text'  # or 'json'
+    LOG_ASYNC = True
+    LOG_QUEUE_SIZE = 10000  # records; more are dropped and counted
+    LOG_STDERR = True
+    LOG_FILE = None
+    LOG_ROTATION = 'size'  # or 'time'
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_ROTATE_WHEN = 'midnight'
+    LOG_BACKUP_COUNT = 5
+    LOG_REQUESTS = True  # one access record per request, with its latency
+    LOG_SAMPLE_RATES = ''  # e.g. 'books.search=0.1' keeps INFO logs for 10% of searches
+
+    # In-memory availability counts for the search page and /api/availability;
+    # see availability.py
+    AVAILABILITY_SNAPSHOT_ENABLED = True
+    AVAILABILITY_MAX_STALENESS = 2.0  # seconds another worker's change can go unseen
+    AVAILABILITY_FULL_REFRESH = 300.0  # seconds between full reloads
+    AVAILABILITY_CHANGE_OVERLAP = 30.0  # seconds of the change log re-read on every poll
+    AVAILABILITY_CHANGE_LOG_HOURS = 24  # change log rows kept by prune_availability_changes
+    AVAILABILITY_MAX_BATCH = 500  # book ids per /api/availability call
+
+    # Request timing, SQL counts, Server-Timing headers and /metrics
+    INSTRUMENTATION_ENABLED = False
+    SLOW_QUERY_THRESHOLD_MS = 200
+    SERVER_TIMING_HEADER = True
+
+    # Days a patron has to pick up a copy set aside for their hold
+    HOLD_PICKUP_DAYS = 3
+
+    # Loans due within this many days are listed as due soon on the patron summary
+    PATRON_DUE_SOON_DAYS = 3
+
+    # Reservations one admin batch update may change
+    BATCH_MAX_RESERVATIONS = 500
+
+    # Email notifications, queued in the outbox table and sent by a scheduled dispatcher
+    NOTIFICATIONS_ENABLED = False
+    NOTIFICATION_POLL_SECONDS = 30
+    NOTIFICATION_BATCH_SIZE = 100
+    NOTIFICATION_MAX_ATTEMPTS = 5
+    NOTIFICATION_RETRY_BACKOFF = 60  # seconds, doubled after each failure
+    NOTIFICATION_SMTP_IDLE_TIMEOUT = 60  # seconds an idle SMTP connection is kept
+    NOTIFICATION_DUE_SOON_DAYS = 2
+    NOTIFICATION_DIGEST_HOUR = 7  # UTC
+    MAIL_SERVER = 'localhost'
+    MAIL_PORT = 25
+    MAIL_USE_TLS = False
+    MAIL_USE_SSL = False
+    MAIL_USERNAME = None
+    MAIL_PASSWORD = None
+    MAIL_DEFAULT_SENDER = 'library@localhost'
+
+    # Password hashing runs on a bounded thread pool; see passwords.py
+    PASSWORD_HASH_METHOD = 'scrypt'  # existing hashes are upgraded at login
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_QUEUE_LIMIT = 16
+    PASSWORD_HASH_TIMEOUT = 10.0  # seconds
+
+    # Login/signup attempts allowed per username and per client IP
+    LOGIN_RATE_LIMIT_BURST = 5
+    LOGIN_RATE_LIMIT_PER_MINUTE = 5
+    LOGIN_IP_RATE_LIMIT_BURST = 30
+    LOGIN_IP_RATE_LIMIT_PER_MINUTE = 30
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted; 0
+    # when clients connect directly. The per-IP limit needs the real client.
+    PROXY_FIX_X_FOR = 0
+
+    # Primary (read/write) database; defaults to instance/library.db
+    DATABASE_URL = None
+    # Optional replica used by read-heavy routes such as search
+    DATABASE_READ_URL = None
+
+    # Read-only JSON API served by an ASGI server (see async_api/). Its database
+    # defaults to DATABASE_READ_URL, then DATABASE_URL, with an async driver.
+    ASYNC_API_DATABASE_URL = None
+    ASYNC_API_MAX_BATCH = 500  # book ids per availability lookup
+
+    # Pool settings for server databases (PostgreSQL, MySQL, ...)
+    DATABASE_POOL_SIZE = 10
+    DATABASE_MAX_OVERFLOW = 20
+    DATABASE_POOL_RECYCLE = 1800  # seconds
+    DATABASE_POOL_PRE_PING = True
+
+    # PRAGMAs applied to every new SQLite connection
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT = 5000  # milliseconds
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # bytes
+
+
+def _parse_bool(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Settings that may be overridden from the environment, with their types
+ENV_SETTINGS = {
+    'SECRET_KEY': str,
+    'STATS_CACHE_TTL': int,
+    'USER_CACHE_SIZE': int,
+    'USER_CACHE_TTL': int,
+    'USER_CACHE_URL': str,
+    'RESPONSE_CACHE_ENABLED': _parse_bool,
+    'RESPONSE_CACHE_SIZE': int,
+    'RESPONSE_CACHE_TTL': int,
+    'RESPONSE_CACHE_URL': str,
+    'ARCHIVE_AFTER_DAYS': int,
+    'ARCHIVE_BATCH_SIZE': int,
+    'JOB_HISTORY_DAYS': int,
+    'LOG_LEVEL': str,
+    'LOG_FORMAT': str,
+    'LOG_ASYNC': _parse_bool,
+    'LOG_QUEUE_SIZE': int,
+    'LOG_STDERR': _parse_bool,
+    'LOG_FILE': str,
+    'LOG_ROTATION': str,
+    'LOG_MAX_BYTES': int,
+    'LOG_ROTATE_WHEN': str,
+    'LOG_BACKUP_COUNT': int,
+    'LOG_REQUESTS': _parse_bool,
+    'LOG_SAMPLE_RATES': str,
+    'AVAILABILITY_SNAPSHOT_ENABLED': _parse_bool,
+    'AVAILABILITY_MAX_STALENESS': float,
+    'AVAILABILITY_FULL_REFRESH': float,
+    'AVAILABILITY_CHANGE_OVERLAP': float,
+    'AVAILABILITY_CHANGE_LOG_HOURS': int,
+    'AVAILABILITY_MAX_BATCH': int,
+    'INSTRUMENTATION_ENABLED': _parse_bool,
+    'SLOW_QUERY_THRESHOLD_MS': float,
+    'SERVER_TIMING_HEADER': _parse_bool,
+    'HOLD_PICKUP_DAYS': int,
+    'PATRON_DUE_SOON_DAYS': int,
+    'BATCH_MAX_RESERVATIONS': int,
+    'NOTIFICATIONS_ENABLED': _parse_bool,
+    'NOTIFICATION_POLL_SECONDS': int,
+    'NOTIFICATION_BATCH_SIZE': int,
+    'NOTIFICATION_MAX_ATTEMPTS': int,
+    'NOTIFICATION_RETRY_BACKOFF': int,
+    'NOTIFICATION_SMTP_IDLE_TIMEOUT': int,
+    'NOTIFICATION_DUE_SOON_DAYS': int,
+    'NOTIFICATION_DIGEST_HOUR': int,
+    'MAIL_SERVER': str,
+    'MAIL_PORT': int,
+    'MAIL_USE_TLS': _parse_bool,
+    'MAIL_USE_SSL': _parse_bool,
+    'MAIL_USERNAME': str,
+    'MAIL_PASSWORD': str,
+    'MAIL_DEFAULT_SENDER': str,
+    'PASSWORD_HASH_METHOD': str,
+    'PASSWORD_HASH_WORKERS': int,
+    'PASSWORD_HASH_QUEUE_LIMIT': int,
+    'PASSWORD_HASH_TIMEOUT': float,
+    'LOGIN_RATE_LIMIT_BURST': int,
+    'LOGIN_RATE_LIMIT_PER_MINUTE': float,
+    'LOGIN_IP_RATE_LIMIT_BURST': int,
+    'LOGIN_IP_RATE_LIMIT_PER_MINUTE': float,
+    'PROXY_FIX_X_FOR': int,
+    'DATABASE_URL': str,
+    'DATABASE_READ_URL': str,
+    'ASYNC_API_DATABASE_URL': str,
+    'ASYNC_API_MAX_BATCH': int,
+    'DATABASE_POOL_SIZE': int,
+    'DATABASE_MAX_OVERFLOW': int,
+    'DATABASE_POOL_RECYCLE': int,
+    'DATABASE_POOL_PRE_PING': _parse_bool,
+    'SQLITE_JOURNAL_MODE': str,
+    'SQLITE_SYNCHRONOUS': str,
+    'SQLITE_BUSY_TIMEOUT': int,
+    'SQLITE_MMAP_SIZE': int,
+}
+
+
+def normalize_database_url(url):
+    # Heroku-style URLs use the scheme SQLAlchemy 1.4+ no longer accepts
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def async_database_url(url):
+    """Swap the driver in `url` for its asyncio counterpart (sqlite -> sqlite+aiosqlite)."""
+    url = make_url(normalize_database_url(url))
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.get_driver_name() == driver:
+        return url.render_as_string(hide_password=False)
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+def engine_options(config, url):
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': config['DATABASE_POOL_SIZE'],
+        'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+        'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+        'pool_pre_ping': config['DATABASE_POOL_PRE_PING'],
+    }
+
+
+def configure_app(app, instance_path, overrides=None):
+    """Load settings from defaults, then instance/config.py, then the environment.
+
+    `overrides` (a dict, as passed to create_app) is applied last.
+    """
+    app.config.from_object(Config)
+    app.config.from_pyfile(os.path.join(instance_path, 'config.py'), silent=True)
+    for name, parse in ENV_SETTINGS.items():
+        if name in os.environ:
+            app.config[name] = parse(os.environ[name])
+    if overrides:
+        app.config.update(overrides)
+
+    url = app.config['DATABASE_URL'] or f"sqlite:///{os.path.join(instance_path, 'library.db')}"
+    url = normalize_database_url(url)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config, url)
+
+    read_url = app.config['DATABASE_READ_URL']
+    if read_url:
+        read_url = normalize_database_url(read_url)
+        app.config['SQLALCHEMY_BINDS'] = {
+            READ_BIND_KEY: {'url': read_url, **engine_options(app.config, read_url)},
+        }
+
+
+def sqlite_settings(config):
+    return {name: config[name] for name in ENV_SETTINGS if name.startswith('SQLITE_')}
+
+
+def apply_sqlite_pragmas(config, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+    cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+    cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+    cursor.execute(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+    cursor.close()
+
+
+def register_engine_events(app):
+    """Hook connection setup into the engines created by db.init_app()."""
+    settings = sqlite_settings(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', partial(apply_sqlite_pragmas, settings))
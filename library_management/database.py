@@ -1,3 +1,36 @@
+from functools import wraps
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
 
-db = SQLAlchemy()
+# Bind key of the optional read replica (see DATABASE_READ_URL in config.py)
+READ_BIND_KEY = 'read'
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the read engine inside `use_read_engine` views.
+
+    Everything else, including flushes and reads in other views, goes to the
+    primary engine.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and has_app_context() and g.get('use_read_engine')):
+            read_engine = self._db.engines.get(READ_BIND_KEY)
+            if read_engine is not None:
+                return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_read_engine(view):
+    """Mark a read-only view as safe to serve from the read replica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_read_engine = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
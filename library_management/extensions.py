@@ -0,0 +1,52 @@
+import os
+import click
+from flask_login import LoginManager
+from .database import db
+from .user_cache import user_cache
+
+MIGRATIONS_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'migrations')
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return user_cache.load(int(user_id))
+
+
+class LazyMigrateGroup(click.Group):
+    """The `flask db` command group, with Flask-Migrate set up on first use.
+
+    Alembic is only needed to run migrations, so web workers never import it.
+    """
+
+    def __init__(self, app):
+        super().__init__('db', help='Perform database migrations.')
+        self.app = app
+        self._group = None
+
+    def _load(self):
+        if self._group is None:
+            from flask_migrate import Migrate
+            # Migrate registers its own `db` group, which replaces this one
+            Migrate(self.app, db, directory=MIGRATIONS_DIR)
+            self._group = self.app.cli.commands['db']
+            # Take over its options and callback, which set up the alembic config
+            self.params = self._group.params
+            self.callback = self._group.callback
+        return self._group
+
+    def parse_args(self, ctx, args):
+        self._load()
+        return super().parse_args(ctx, args)
+
+    def list_commands(self, ctx):
+        return self._load().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._load().get_command(ctx, name)
+
+
+def init_migrate(app):
+    app.cli.add_command(LazyMigrateGroup(app))
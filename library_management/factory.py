@@ -0,0 +1,169 @@
+import os
+import logging
+from flask import Flask, render_template, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from .database import db
+from .config import configure_app, register_engine_events, INSTANCE_PATH
+from .extensions import login_manager, init_migrate
+from .instrumentation import instrumentation
+from .log_pipeline import log_pipeline
+from .user_cache import user_cache
+from .response_cache import response_cache
+from .availability import availability
+from .passwords import password_hasher, HASH_LATENCY_BUCKETS
+from .notifications import dispatcher as notification_dispatcher
+from .jobs import job_registry
+from .tasks import register_jobs
+from .commands import register_commands
+from . import auth, admin, books
+
+logger = logging.getLogger(__name__)
+
+
+def create_app(config=None):
+    """Build the application. Nothing here touches the database.
+
+    Tables are created by `flask create-db` (or `flask db upgrade`) and the
+    admin account by `flask seed`.
+    """
+    app = Flask(__name__)
+
+    # Settings come from config.py defaults, instance/config.py, the environment and `config`
+    configure_app(app, INSTANCE_PATH, config)
+    trust_proxies(app)
+    log_pipeline.init_app(app)
+    if not app.config['DATABASE_URL']:
+        # The default SQLite database lives in the instance folder
+        os.makedirs(INSTANCE_PATH, exist_ok=True)
+
+    db.init_app(app)
+    register_engine_events(app)
+    instrumentation.init_app(app)
+    init_migrate(app)
+    login_manager.init_app(app)
+    user_cache.init_app(app)
+    response_cache.init_app(app)
+    availability.init_app(app)
+    password_hasher.init_app(app)
+    notification_dispatcher.init_app(app)
+
+    auth.init_app(app)
+    app.register_blueprint(books.bp)
+    app.register_blueprint(admin.bp)
+    register_error_handlers(app)
+    register_metrics()
+
+    register_jobs(app)
+    register_commands(app)
+    return app
+
+
+def trust_proxies(app):
+    """Take request.remote_addr from X-Forwarded-For when PROXY_FIX_X_FOR proxies are in front."""
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+
+def register_error_handlers(app):
+    @app.errorhandler(404)
+    def page_not_found(error):
+        logger.warning("Page not found: %s", request.url)
+        return render_template('404.html'), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        logger.error("Server Error: %s", error)
+        return render_template('500.html'), 500
+
+
+def user_cache_metrics():
+    stats = user_cache.stats()
+    return [
+        '# HELP library_user_cache_lookups_total load_user() cache lookups by result.',
+        '# TYPE library_user_cache_lookups_total counter',
+        f'library_user_cache_lookups_total{{result="hit"}} {stats["hits"]}',
+        f'library_user_cache_lookups_total{{result="miss"}} {stats["misses"]}',
+    ]
+
+
+def response_cache_metrics():
+    stats = response_cache.stats()
+    return [
+        '# HELP library_response_cache_requests_total Cacheable catalog requests by result.',
+        '# TYPE library_response_cache_requests_total counter',
+        f'library_response_cache_requests_total{{result="hit"}} {stats["hits"]}',
+        f'library_response_cache_requests_total{{result="miss"}} {stats["misses"]}',
+        f'library_response_cache_requests_total{{result="not_modified"}} {stats["not_modified"]}',
+        '# HELP library_catalog_version Times the catalog changed since the counter was created.',
+        '# TYPE library_catalog_version gauge',
+        f'library_catalog_version {stats["version"]}',
+    ]
+
+
+def password_hash_metrics():
+    stats = password_hasher.stats()
+    lines = [
+        '# HELP library_password_hash_duration_seconds Time spent hashing or checking passwords.',
+        '# TYPE library_password_hash_duration_seconds histogram',
+    ]
+    cumulative = 0
+    for bound, count in zip(HASH_LATENCY_BUCKETS, stats['buckets']):
+        cumulative += count
+        lines.append(f'library_password_hash_duration_seconds_bucket{{le="{bound}"}} {cumulative}')
+    lines += [
+        f'library_password_hash_duration_seconds_bucket{{le="+Inf"}} {stats["count"]}',
+        f'library_password_hash_duration_seconds_sum {stats["total"]}',
+        f'library_password_hash_duration_seconds_count {stats["count"]}',
+        '# HELP library_password_hash_queue_depth Password hash jobs waiting for a worker.',
+        '# TYPE library_password_hash_queue_depth gauge',
+        f'library_password_hash_queue_depth {stats["queued"]}',
+        '# HELP library_password_hash_rejected_total Password hash jobs refused because the queue was full.',
+        '# TYPE library_password_hash_rejected_total counter',
+        f'library_password_hash_rejected_total {stats["rejected"]}',
+        '# HELP library_password_rehashed_total Stored hashes upgraded to the current parameters at login.',
+        '# TYPE library_password_rehashed_total counter',
+        f'library_password_rehashed_total {stats["rehashed"]}',
+        '# HELP library_login_rate_limited_total Login and signup attempts rejected by the rate limiter.',
+        '# TYPE library_login_rate_limited_total counter',
+        f'library_login_rate_limited_total{{key="username"}} {auth.username_limiter.limited}',
+        f'library_login_rate_limited_total{{key="ip"}} {auth.ip_limiter.limited}',
+    ]
+    return lines
+
+
+def availability_metrics():
+    stats = availability.stats()
+    return [
+        '# HELP library_availability_snapshot_books Books held in the in-memory availability snapshot.',
+        '# TYPE library_availability_snapshot_books gauge',
+        f'library_availability_snapshot_books {stats["books"]}',
+        '# HELP library_availability_snapshot_version Last availability_change id applied to the snapshot.',
+        '# TYPE library_availability_snapshot_version gauge',
+        f'library_availability_snapshot_version {stats["version"]}',
+        '# HELP library_availability_snapshot_loads_total Snapshot refreshes by kind.',
+        '# TYPE library_availability_snapshot_loads_total counter',
+        f'library_availability_snapshot_loads_total{{kind="full"}} {stats["full_loads"]}',
+        f'library_availability_snapshot_loads_total{{kind="incremental"}} {stats["incremental_loads"]}',
+    ]
+
+
+def log_metrics():
+    stats = log_pipeline.stats()
+    return [
+        '# HELP library_log_queue_depth Log records waiting for the writer thread.',
+        '# TYPE library_log_queue_depth gauge',
+        f'library_log_queue_depth {stats["queued"]}',
+        '# HELP library_log_records_dropped_total Log records dropped because the queue was full.',
+        '# TYPE library_log_records_dropped_total counter',
+        f'library_log_records_dropped_total {stats["dropped"]}',
+    ]
+
+
+def job_metrics():
+    return job_registry.metrics()
+
+
+def register_metrics():
+    for source in (user_cache_metrics, response_cache_metrics, availability_metrics, password_hash_metrics,
+                   log_metrics, job_metrics):
+        instrumentation.add_metrics_source(source)
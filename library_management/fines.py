@@ -0,0 +1,105 @@
+import time
+import logging
+from datetime import datetime
+from sqlalchemy import select, func, literal, cast, update, Integer
+from .database import db
+from .models import Reservation
+from .patron_summary import refresh_patron_fines
+
+logger = logging.getLogger(__name__)
+
+FINE_PER_DAY = 1.0  # $1 per day
+SECONDS_PER_DAY = 86400
+
+# Rows updated per statement; each batch commits on its own so the SQLite
+# write lock is only held for one batch at a time.
+FINE_BATCH_SIZE = 5000
+
+
+def calculate_fine(reservation, now=None):
+    now = now or datetime.utcnow()
+    if reservation.status == 'approved' and reservation.due_date and now > reservation.due_date:
+        overdue_days = (now - reservation.due_date).days
+        return overdue_days * FINE_PER_DAY
+    return 0.0
+
+
+def overdue_filter(now):
+    return (Reservation.status == 'approved') & (Reservation.due_date < now)
+
+
+def fine_expression(now, dialect_name):
+    """SQL expression for the fine owed at `now`, matching calculate_fine().
+
+    Whole days are counted from epoch seconds so the database floors the same
+    way timedelta.days does. Returns None if the dialect is not supported.
+    """
+    now = literal(now, db.DateTime)
+    if dialect_name == 'sqlite':
+        seconds = (cast(func.strftime('%s', now), Integer)
+                   - cast(func.strftime('%s', Reservation.due_date), Integer))
+        return (seconds // SECONDS_PER_DAY) * FINE_PER_DAY
+    if dialect_name == 'postgresql':
+        seconds = func.extract('epoch', now - Reservation.due_date)
+        return func.floor(seconds / SECONDS_PER_DAY) * FINE_PER_DAY
+    return None
+
+
+class FineUpdateResult:
+    def __init__(self, rows, batches, elapsed, now):
+        self.rows = rows
+        self.batches = batches
+        self.elapsed = elapsed
+        self.now = now
+
+    def __repr__(self):
+        return (f"<FineUpdateResult rows={self.rows} batches={self.batches} "
+                f"elapsed={self.elapsed:.3f}s>")
+
+
+def recalculate_fines(now=None, batch_size=FINE_BATCH_SIZE):
+    """Recompute fine_amount for every overdue loan inside the database.
+
+    All batches are evaluated against the same `now` snapshot. Batches are
+    keyset pages of `batch_size` overdue loans in id order, each one a single
+    UPDATE over its id range, so gaps in the ids never cost an empty batch.
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    expression = fine_expression(now, db.session.get_bind().dialect.name)
+
+    rows = batches = 0
+    last_id = 0
+    while True:
+        ids = db.session.scalars(
+            select(Reservation.id)
+            .where(overdue_filter(now), Reservation.id > last_id)
+            .order_by(Reservation.id)
+            .limit(batch_size)).all()
+        if not ids:
+            break
+        batch = overdue_filter(now) & (Reservation.id > last_id) & (Reservation.id <= ids[-1])
+        last_id = ids[-1]
+        if expression is not None:
+            result = db.session.execute(
+                update(Reservation)
+                .where(batch)
+                .values(fine_amount=expression)
+                .execution_options(synchronize_session=False))
+            rows += result.rowcount
+        else:
+            # No SQL date arithmetic for this backend: compute in Python
+            # but still write the batch with one executemany.
+            loans = db.session.query(Reservation.id, Reservation.status, Reservation.due_date).filter(batch).all()
+            if loans:
+                db.session.execute(update(Reservation), [
+                    {'id': loan.id, 'fine_amount': calculate_fine(loan, now)} for loan in loans
+                ])
+            rows += len(loans)
+        refresh_patron_fines(select(Reservation.user_id).where(batch))
+        db.session.commit()
+        batches += 1
+
+    result = FineUpdateResult(rows, batches, time.perf_counter() - started, now)
+    logger.info("Fines updated: %s rows in %s batches, %.3fs", result.rows, result.batches, result.elapsed)
+    return result
@@ -0,0 +1,202 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, and_, or_
+from sqlalchemy.exc import IntegrityError
+from .database import db
+from .models import Hold, Reservation
+from .circulation import release_copy, release_copies
+from .patron_summary import adjust_patron_summary
+from .notifications import notify_hold_ready
+
+logger = logging.getLogger(__name__)
+
+HOLD_PICKUP_DAYS = 3
+HOLD_EXPIRY_BATCH_SIZE = 500
+LOAN_DAYS = 14
+
+ACTIVE_HOLD_STATUSES = ('waiting', 'ready')
+
+# Attempts at promoting a waiting hold before the copy goes back on the shelf.
+# Only lost races use up an attempt.
+MAX_PROMOTION_ATTEMPTS = 5
+
+
+def transition_hold(hold_id, to_status, from_statuses, criteria=(), **values):
+    """Conditional status change, as circulation.transition_reservation.
+
+    `criteria` are extra WHERE clauses the hold must still match.
+    """
+    result = db.session.execute(
+        update(Hold)
+        .where(Hold.id == hold_id, Hold.status.in_(from_statuses), *criteria)
+        .values(status=to_status, **values)
+        .execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+
+def active_hold(user_id, book_id):
+    return (Hold.query
+            .filter(Hold.user_id == user_id, Hold.book_id == book_id,
+                    Hold.status.in_(ACTIVE_HOLD_STATUSES))
+            .first())
+
+
+def place_hold(user_id, book_id, priority=0):
+    """Queue a patron for a book. Returns (hold, created)."""
+    hold = active_hold(user_id, book_id)
+    if hold is not None:
+        return hold, False
+    hold = Hold(user_id=user_id, book_id=book_id, priority=priority)
+    try:
+        with db.session.begin_nested():
+            db.session.add(hold)
+    except IntegrityError:
+        # uq_hold_user_id_book_id_active: a concurrent request queued this patron first
+        return active_hold(user_id, book_id), False
+    return hold, True
+
+
+def queue_position(hold):
+    """1-based place of a waiting hold in its book's queue, from the index."""
+    ahead = db.session.scalar(
+        select(func.count(Hold.id))
+        .where(Hold.book_id == hold.book_id, Hold.status == 'waiting',
+               or_(Hold.priority < hold.priority,
+                   and_(Hold.priority == hold.priority, Hold.id < hold.id))))
+    return ahead + 1
+
+
+def queue_positions(holds):
+    """queue_position of every waiting hold in `holds`, in one query; returns {hold_id: position}."""
+    waiting = [hold for hold in holds if hold.status == 'waiting']
+    if not waiting:
+        return {}
+    ranked = (select(Hold.id, func.row_number()
+                     .over(partition_by=Hold.book_id, order_by=(Hold.priority, Hold.id)).label('position'))
+              .where(Hold.book_id.in_({hold.book_id for hold in waiting}), Hold.status == 'waiting')
+              .subquery())
+    rows = db.session.execute(
+        select(ranked.c.id, ranked.c.position).where(ranked.c.id.in_([hold.id for hold in waiting])))
+    return {row.id: row.position for row in rows}
+
+
+def next_waiting_hold_id(book_id):
+    # Served straight from ix_hold_book_id_status_priority: one index seek, no sort
+    return db.session.scalar(
+        select(Hold.id)
+        .where(Hold.book_id == book_id, Hold.status == 'waiting')
+        .order_by(Hold.priority, Hold.id)
+        .limit(1))
+
+
+def promote_next_hold(book_id, now=None, pickup_days=HOLD_PICKUP_DAYS):
+    """Set a freed copy aside for the next patron in the queue.
+
+    Returns the promoted hold id, or None if nobody is waiting.
+    """
+    now = now or datetime.utcnow()
+    for _ in range(MAX_PROMOTION_ATTEMPTS):
+        hold_id = next_waiting_hold_id(book_id)
+        if hold_id is None:
+            return None
+        if transition_hold(hold_id, 'ready', ('waiting',),
+                           date_ready=now, expires_at=now + timedelta(days=pickup_days)):
+            return hold_id
+    return None
+
+
+def hand_on_copy(book_id, now=None, pickup_days=HOLD_PICKUP_DAYS):
+    """A copy of `book_id` came back: give it to the queue or to the shelf.
+
+    Returns the promoted hold id, or None if the copy went back on the shelf.
+    """
+    hold_id = promote_next_hold(book_id, now, pickup_days)
+    if hold_id is not None:
+        logger.info("Copy of book %s set aside for hold %s.", book_id, hold_id)
+        notify_hold_ready(hold_id)
+        return hold_id
+    if not release_copy(book_id):
+        logger.warning("No copy to release for book %s.", book_id)
+    return None
+
+
+def hand_on_copies(copies, now=None, pickup_days=HOLD_PICKUP_DAYS):
+    """hand_on_copy for many returned copies; `copies` maps book_id to a count.
+
+    Books with a queue promote their holds one at a time; every copy nobody
+    is waiting for goes back on the shelf in one grouped UPDATE. Returns the
+    promoted hold ids.
+    """
+    if not copies:
+        return []
+    queued = set(db.session.scalars(
+        select(Hold.book_id).where(Hold.book_id.in_(list(copies)), Hold.status == 'waiting').distinct()))
+    promoted = []
+    shelved = {}
+    for book_id, count in copies.items():
+        while book_id in queued and count:
+            hold_id = promote_next_hold(book_id, now, pickup_days)
+            if hold_id is None:
+                break
+            notify_hold_ready(hold_id)
+            promoted.append(hold_id)
+            count -= 1
+        if count:
+            shelved[book_id] = count
+    release_copies(shelved)
+    return promoted
+
+
+def claim_hold(hold_id, user_id, now=None):
+    """Turn a ready hold into a reservation for the copy set aside.
+
+    Returns the new Reservation, or None if the hold is not ready or expired.
+    """
+    now = now or datetime.utcnow()
+    if not transition_hold(hold_id, 'fulfilled', ('ready',),
+                           criteria=(Hold.user_id == user_id, Hold.expires_at >= now)):
+        return None
+    book_id = db.session.scalar(select(Hold.book_id).where(Hold.id == hold_id))
+    reservation = Reservation(user_id=user_id, book_id=book_id, date_reserved=now,
+                              due_date=now + timedelta(days=LOAN_DAYS))
+    db.session.add(reservation)
+    adjust_patron_summary(user_id, open_loans=1, total_loans=1)
+    return reservation
+
+
+def cancel_hold(hold_id, user_id=None, now=None, pickup_days=HOLD_PICKUP_DAYS):
+    """Withdraw a hold. A copy set aside for it moves on to the next patron."""
+    criteria = () if user_id is None else (Hold.user_id == user_id,)
+    if transition_hold(hold_id, 'cancelled', ('ready',), criteria):
+        book_id = db.session.scalar(select(Hold.book_id).where(Hold.id == hold_id))
+        hand_on_copy(book_id, now, pickup_days)
+        return True
+    return transition_hold(hold_id, 'cancelled', ('waiting',), criteria)
+
+
+def expire_holds(now=None, pickup_days=HOLD_PICKUP_DAYS, batch_size=HOLD_EXPIRY_BATCH_SIZE):
+    """Expire ready holds that were not picked up and pass their copies on.
+
+    Works through ix_hold_status_expires_at in batches, committing after each
+    one. Returns the number of holds expired.
+    """
+    now = now or datetime.utcnow()
+    expired = 0
+    while True:
+        rows = db.session.execute(
+            select(Hold.id, Hold.book_id)
+            .where(Hold.status == 'ready', Hold.expires_at < now)
+            .order_by(Hold.expires_at)
+            .limit(batch_size)).all()
+        if not rows:
+            break
+        for hold_id, book_id in rows:
+            if transition_hold(hold_id, 'expired', ('ready',), criteria=(Hold.expires_at < now,)):
+                expired += 1
+                hand_on_copy(book_id, now, pickup_days)
+        db.session.commit()
+        if len(rows) < batch_size:
+            break
+    if expired:
+        logger.info("Expired %s holds that were not picked up.", expired)
+    return expired
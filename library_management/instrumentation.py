@@ -0,0 +1,153 @@
+import time
+import logging
+import threading
+from collections import defaultdict
+from flask import g, request, has_app_context
+from sqlalchemy import event
+from .database import db
+
+slow_query_logger = logging.getLogger('library_management.slow_query')
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RouteMetrics:
+    __slots__ = ('bucket_counts', 'count', 'total', 'sql_count', 'sql_time')
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+
+    def observe(self, seconds, sql_count, sql_time):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.sql_count += sql_count
+        self.sql_time += sql_time
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+class Instrumentation:
+    """Per-request timing, SQL counts, slow-query log and Prometheus metrics.
+
+    Nothing is registered unless INSTRUMENTATION_ENABLED is set, so a disabled
+    app pays nothing beyond the import.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_threshold = None
+        self.server_timing = False
+        self.extra_metrics = []
+        self._routes = defaultdict(RouteMetrics)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('INSTRUMENTATION_ENABLED', False)
+        if not self.enabled:
+            return
+        threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+        self.slow_query_threshold = threshold / 1000.0 if threshold is not None else None
+        self.server_timing = app.config.get('SERVER_TIMING_HEADER', True)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def add_metrics_source(self, source):
+        """Register a callable returning extra lines for the /metrics output."""
+        if source not in self.extra_metrics:
+            self.extra_metrics.append(source)
+
+    def _before_request(self):
+        g.perf_started = time.perf_counter()
+        g.perf_sql_count = 0
+        g.perf_sql_time = 0.0
+
+    def _after_request(self, response):
+        started = g.pop('perf_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        sql_count = g.get('perf_sql_count', 0)
+        sql_time = g.get('perf_sql_time', 0.0)
+
+        route = request.endpoint or 'unmatched'
+        with self._lock:
+            self._routes[(route, request.method)].observe(elapsed, sql_count, sql_time)
+
+        if self.server_timing:
+            response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+            response.headers.add('Server-Timing', f'db;dur={sql_time * 1000:.1f};desc="{sql_count} queries"')
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('perf_query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('perf_query_started')
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+        if has_app_context() and 'perf_started' in g:
+            g.perf_sql_count += 1
+            g.perf_sql_time += elapsed
+        if self.slow_query_threshold is not None and elapsed >= self.slow_query_threshold:
+            slow_query_logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+    def render_prometheus(self):
+        with self._lock:
+            routes = {key: (list(m.bucket_counts), m.count, m.total, m.sql_count, m.sql_time)
+                      for key, m in self._routes.items()}
+
+        lines = [
+            '# HELP library_request_duration_seconds Request latency by route.',
+            '# TYPE library_request_duration_seconds histogram',
+        ]
+        for (route, method), (buckets, count, total, _, _) in sorted(routes.items()):
+            labels = f'route="{_label(route)}",method="{method}"'
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += bucket_count
+                lines.append(f'library_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'library_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'library_request_duration_seconds_sum{{{labels}}} {total}')
+            lines.append(f'library_request_duration_seconds_count{{{labels}}} {count}')
+
+        lines += [
+            '# HELP library_sql_queries_total SQL statements issued, by route.',
+            '# TYPE library_sql_queries_total counter',
+        ]
+        for (route, method), (_, _, _, sql_count, _) in sorted(routes.items()):
+            lines.append(f'library_sql_queries_total{{route="{_label(route)}",method="{method}"}} {sql_count}')
+
+        lines += [
+            '# HELP library_sql_duration_seconds_total Time spent in SQL statements, by route.',
+            '# TYPE library_sql_duration_seconds_total counter',
+        ]
+        for (route, method), (_, _, _, _, sql_time) in sorted(routes.items()):
+            lines.append(f'library_sql_duration_seconds_total{{route="{_label(route)}",method="{method}"}} {sql_time}')
+
+        for source in self.extra_metrics:
+            lines.extend(source())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,169 @@
+import os
+import time
+import socket
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+from .database import db
+from .models import JobLease, JobRun
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 3600
+DEFAULT_MIN_GAP_SECONDS = 60
+
+
+class Job:
+    def __init__(self, name, func, trigger, trigger_args, enabled=True,
+                 lease_seconds=DEFAULT_LEASE_SECONDS, min_gap=DEFAULT_MIN_GAP_SECONDS):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.trigger_args = trigger_args
+        self.enabled = enabled
+        self.lease_seconds = lease_seconds
+        self.min_gap = min_gap
+
+
+class JobRegistry:
+    """Scheduled jobs, run under a database lease so each firing runs once.
+
+    Any number of job runners may schedule the same jobs. Before a job starts,
+    its runner takes the job_lease row for it. The lease is held for the run
+    and then for at least `min_gap` seconds after it started, so the other
+    runners' copies of the same firing find it taken and skip. A runner that
+    dies mid-job loses the lease after `lease_seconds`. Every run is recorded
+    in job_run with its duration and the number of rows the job processed.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.app = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    def init_app(self, app):
+        self.app = app
+
+    def job(self, name, trigger, enabled=True, lease_seconds=DEFAULT_LEASE_SECONDS,
+            min_gap=DEFAULT_MIN_GAP_SECONDS, **trigger_args):
+        """Register a function as a job. It should return the number of rows it processed."""
+        def decorator(func):
+            self.jobs[name] = Job(name, func, trigger, trigger_args, enabled, lease_seconds, min_gap)
+            return func
+        return decorator
+
+    def acquire_lease(self, job, now):
+        expires_at = now + timedelta(seconds=job.lease_seconds)
+        result = db.session.execute(
+            update(JobLease)
+            .where(JobLease.name == job.name, JobLease.expires_at <= now)
+            .values(owner=self.owner, acquired_at=now, expires_at=expires_at)
+            .execution_options(synchronize_session=False))
+        if result.rowcount == 1:
+            db.session.commit()
+            return True
+        try:
+            db.session.add(JobLease(name=job.name, owner=self.owner, acquired_at=now, expires_at=expires_at))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Somebody else holds it
+            db.session.rollback()
+            return False
+
+    def release_lease(self, job, started_at):
+        # Keep it until min_gap has passed so late runners skip this firing
+        expires_at = max(datetime.utcnow(), started_at + timedelta(seconds=job.min_gap))
+        db.session.execute(
+            update(JobLease)
+            .where(JobLease.name == job.name, JobLease.owner == self.owner)
+            .values(expires_at=expires_at)
+            .execution_options(synchronize_session=False))
+        db.session.commit()
+
+    def run(self, name):
+        """Run a job now if its lease is free. Returns the JobRun, or None if skipped."""
+        job = self.jobs[name]
+        with self.app.app_context():
+            started_at = datetime.utcnow()
+            if not self.acquire_lease(job, started_at):
+                logger.info("Job %s is running or ran elsewhere; skipping", name)
+                return None
+
+            run = JobRun(job_name=name, owner=self.owner, started_at=started_at)
+            db.session.add(run)
+            db.session.commit()
+            run_id = run.id
+
+            logger.info("Running scheduled task: %s", name)
+            started = time.perf_counter()
+            status, rows, error = 'success', None, None
+            try:
+                rows = job.func()
+            except Exception as e:
+                db.session.rollback()
+                status, error = 'failed', str(e)
+                logger.error("Job %s failed: %s", name, e)
+            duration = time.perf_counter() - started
+
+            db.session.execute(
+                update(JobRun)
+                .where(JobRun.id == run_id)
+                .values(status=status, finished_at=datetime.utcnow(), duration=duration,
+                        rows_processed=rows if isinstance(rows, int) else None, error=error)
+                .execution_options(synchronize_session=False))
+            db.session.commit()
+            self.release_lease(job, started_at)
+            logger.info("Job %s %s in %.2fs (%s rows)", name, status, duration, rows)
+            return db.session.get(JobRun, run_id)
+
+    def schedule(self, scheduler):
+        """Add every enabled job to an APScheduler scheduler."""
+        for job in self.jobs.values():
+            if job.enabled:
+                scheduler.add_job(id=job.name, name=job.name, func=self.run, args=[job.name], trigger=job.trigger,
+                                  **job.trigger_args)
+
+    def recent_runs(self, name=None, limit=20):
+        query = JobRun.query.order_by(JobRun.id.desc())
+        if name:
+            query = query.filter(JobRun.job_name == name)
+        return query.limit(limit).all()
+
+    def metrics(self):
+        """Prometheus lines for the latest run of each job, read from job_run."""
+        latest = (select(func.max(JobRun.id))
+                  .where(JobRun.status != 'running')
+                  .group_by(JobRun.job_name))
+        runs = db.session.execute(
+            select(JobRun.job_name, JobRun.status, JobRun.started_at, JobRun.duration, JobRun.rows_processed)
+            .where(JobRun.id.in_(latest))
+            .order_by(JobRun.job_name)).all()
+        lines = [
+            '# HELP library_job_last_duration_seconds Duration of the latest run of each job.',
+            '# TYPE library_job_last_duration_seconds gauge',
+        ]
+        lines += [f'library_job_last_duration_seconds{{job="{run.job_name}"}} {run.duration}' for run in runs]
+        lines += [
+            '# HELP library_job_last_rows_processed Rows processed by the latest run of each job.',
+            '# TYPE library_job_last_rows_processed gauge',
+        ]
+        lines += [f'library_job_last_rows_processed{{job="{run.job_name}"}} {run.rows_processed or 0}'
+                  for run in runs]
+        lines += [
+            '# HELP library_job_last_success Whether the latest run of each job succeeded.',
+            '# TYPE library_job_last_success gauge',
+        ]
+        lines += [f'library_job_last_success{{job="{run.job_name}"}} {int(run.status == "success")}'
+                  for run in runs]
+        return lines
+
+    def prune_history(self, keep_days):
+        result = db.session.execute(
+            JobRun.__table__.delete().where(JobRun.started_at < datetime.utcnow() - timedelta(days=keep_days)))
+        db.session.commit()
+        return result.rowcount
+
+
+job_registry = JobRegistry()
@@ -0,0 +1,219 @@
+import json
+import time
+import uuid
+import queue
+import random
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from flask import g, request, has_request_context
+
+access_logger = logging.getLogger('library_management.access')
+
+MAX_REQUEST_ID_LENGTH = 64
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'endpoint'}
+
+
+def parse_sample_rates(value):
+    """'books.search=0.1,books.api_search=0.05' -> {'books.search': 0.1, ...}"""
+    if isinstance(value, dict):
+        return dict(value)
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            endpoint, rate = item.split('=', 1)
+            rates[endpoint.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request id and endpoint, and drops unsampled ones.
+
+    Runs on the thread that logged, while the request context is still there.
+    Requests on an endpoint listed in LOG_SAMPLE_RATES keep their INFO and
+    DEBUG records only if the request was picked in before_request; warnings
+    and errors are always kept.
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id', '-')
+            record.endpoint = request.endpoint or '-'
+            if record.levelno < logging.WARNING and not g.get('log_sampled', True):
+                return False
+        else:
+            record.request_id = getattr(record, 'request_id', '-')
+            record.endpoint = getattr(record, 'endpoint', '-')
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra=` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'endpoint': getattr(record, 'endpoint', '-'),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() renders the message on the calling thread; here the
+    record goes on the queue with its msg and args untouched. Callers should
+    pass plain values (strings, numbers, exceptions) as arguments, since they
+    are read later on another thread. When the queue is full the record is
+    dropped and counted rather than blocking the request.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Root logging for the app: queued writes, request ids, sampling and rotation.
+
+    With LOG_ASYNC (the default) the root logger only gets a LazyQueueHandler;
+    a QueueListener thread formats the records and writes them to stderr and,
+    if LOG_FILE is set, to a rotating file.
+    """
+
+    def __init__(self):
+        self.sample_rates = {}
+        self.log_requests = True
+        self.handler = None
+        self.listener = None
+        self._front = []
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        self.configure(app.config)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def configure(self, config):
+        """(Re)build the root handlers from `config`; replaces any earlier setup."""
+        with self._lock:
+            self._stop()
+            self.sample_rates = parse_sample_rates(config.get('LOG_SAMPLE_RATES'))
+            self.log_requests = config.get('LOG_REQUESTS', True)
+
+            formatter = (JsonFormatter() if config.get('LOG_FORMAT') == 'json'
+                         else logging.Formatter(TEXT_FORMAT))
+            outputs = [logging.StreamHandler()] if config.get('LOG_STDERR', True) else []
+            if config.get('LOG_FILE'):
+                outputs.append(self._file_handler(config))
+            for output in outputs:
+                output.setFormatter(formatter)
+
+            if config.get('LOG_ASYNC', True):
+                log_queue = queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000))
+                self.handler = LazyQueueHandler(log_queue)
+                self.listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+                self.listener.start()
+                front = [self.handler]
+                if not self._atexit_registered:
+                    atexit.register(self.stop)
+                    self._atexit_registered = True
+            else:
+                self.handler = None
+                front = outputs
+            self._front = front
+
+            root = logging.getLogger()
+            root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+            for handler in front:
+                handler.addFilter(RequestContextFilter())
+                root.addHandler(handler)
+
+    def _file_handler(self, config):
+        if config.get('LOG_ROTATION', 'size') == 'time':
+            return logging.handlers.TimedRotatingFileHandler(
+                config['LOG_FILE'], when=config.get('LOG_ROTATE_WHEN', 'midnight'),
+                backupCount=config.get('LOG_BACKUP_COUNT', 5), delay=True, utc=True)
+        return logging.handlers.RotatingFileHandler(
+            config['LOG_FILE'], maxBytes=config.get('LOG_MAX_BYTES', 0),
+            backupCount=config.get('LOG_BACKUP_COUNT', 5), delay=True)
+
+    def flush(self):
+        """Block until every queued record has been written."""
+        if self.listener is not None:
+            self.listener.queue.join()
+        for handler in self._front:
+            handler.flush()
+
+    def stop(self):
+        with self._lock:
+            self._stop()
+
+    def _stop(self):
+        root = logging.getLogger()
+        for handler in self._front:
+            root.removeHandler(handler)
+        if self.listener is not None:
+            # Writes out whatever is still queued before the thread exits
+            self.listener.stop()
+            for output in self.listener.handlers:
+                output.close()
+        else:
+            for handler in self._front:
+                handler.close()
+        self.listener = None
+        self.handler = None
+        self._front = []
+
+    def stats(self):
+        return {
+            'queued': self.listener.queue.qsize() if self.listener is not None else 0,
+            'dropped': self.handler.dropped if self.handler is not None else 0,
+        }
+
+    def _before_request(self):
+        # A caller-supplied id (from a proxy or another service) is kept, within reason
+        g.request_id = request.headers.get('X-Request-ID', '')[:MAX_REQUEST_ID_LENGTH] or uuid.uuid4().hex
+        g.log_started = time.perf_counter()
+        rate = self.sample_rates.get(request.endpoint)
+        g.log_sampled = rate is None or random.random() < rate
+
+    def _after_request(self, response):
+        response.headers.setdefault('X-Request-ID', g.get('request_id', ''))
+        started = g.get('log_started')
+        if self.log_requests and started is not None:
+            latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            access_logger.info("%s %s %s %.1fms", request.method, request.path, response.status_code, latency_ms,
+                               extra={'method': request.method, 'path': request.path,
+                                      'status': response.status_code, 'latency_ms': latency_ms})
+        return response
+
+
+log_pipeline = LogPipeline()
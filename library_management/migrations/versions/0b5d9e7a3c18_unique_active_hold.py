@@ -0,0 +1,33 @@
+"""Allow one active hold per patron and book
+
+Revision ID: 0b5d9e7a3c18
+Revises: f4b8c2d61a97
+Create Date: 2026-10-19 09:05:41.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b5d9e7a3c18'
+down_revision = 'f4b8c2d61a97'
+branch_labels = None
+depends_on = None
+
+ACTIVE = "status IN ('waiting', 'ready')"
+
+
+def upgrade():
+    # Keep the earliest of any duplicates placed before the index existed
+    op.execute(f"""UPDATE hold SET status = 'cancelled'
+        WHERE {ACTIVE} AND id NOT IN (
+            SELECT MIN(id) FROM hold WHERE {ACTIVE} GROUP BY user_id, book_id)""")
+    with op.batch_alter_table('hold', schema=None) as batch_op:
+        batch_op.create_index('uq_hold_user_id_book_id_active', ['user_id', 'book_id'], unique=True,
+                              sqlite_where=sa.text(ACTIVE), postgresql_where=sa.text(ACTIVE))
+
+
+def downgrade():
+    with op.batch_alter_table('hold', schema=None) as batch_op:
+        batch_op.drop_index('uq_hold_user_id_book_id_active')
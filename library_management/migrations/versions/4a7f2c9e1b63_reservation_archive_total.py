@@ -0,0 +1,34 @@
+"""Keep running totals of archived reservations
+
+Revision ID: 4a7f2c9e1b63
+Revises: 9e3c7a1f5d26
+Create Date: 2026-10-19 11:02:48.271604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a7f2c9e1b63'
+down_revision = '9e3c7a1f5d26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservation_archive_total',
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('reservations', sa.Integer(), nullable=False),
+    sa.Column('fines_total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('status')
+    )
+    # Rows archived so far; archive_reservations adds every later batch
+    op.execute("""INSERT INTO reservation_archive_total (status, reservations, fines_total)
+        SELECT status, COUNT(*), COALESCE(SUM(fine_amount), 0.0)
+        FROM reservation_archive
+        GROUP BY status""")
+
+
+def downgrade():
+    op.drop_table('reservation_archive_total')
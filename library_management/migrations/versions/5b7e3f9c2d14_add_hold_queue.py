@@ -0,0 +1,45 @@
+"""Add the hold table for book waitlists
+
+Revision ID: 5b7e3f9c2d14
+Revises: c41e9d0a2f63
+Create Date: 2026-10-18 14:21:37.512904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e3f9c2d14'
+down_revision = 'c41e9d0a2f63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('hold',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('date_placed', sa.DateTime(), nullable=True),
+    sa.Column('date_ready', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['book_id'], ['book.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('hold', schema=None) as batch_op:
+        batch_op.create_index('ix_hold_book_id_status_priority', ['book_id', 'status', 'priority', 'id'], unique=False)
+        batch_op.create_index('ix_hold_status_expires_at', ['status', 'expires_at'], unique=False)
+        batch_op.create_index('ix_hold_user_id_status', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('hold', schema=None) as batch_op:
+        batch_op.drop_index('ix_hold_user_id_status')
+        batch_op.drop_index('ix_hold_status_expires_at')
+        batch_op.drop_index('ix_hold_book_id_status_priority')
+
+    op.drop_table('hold')
@@ -0,0 +1,48 @@
+"""Add job leases and job run history
+
+Revision ID: 7c0d5e8a3f21
+Revises: e2a94c7d1b35
+Create Date: 2026-10-18 15:47:26.994120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c0d5e8a3f21'
+down_revision = 'e2a94c7d1b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_lease',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('owner', sa.String(length=80), nullable=False),
+    sa.Column('acquired_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('job_run',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_name', sa.String(length=50), nullable=False),
+    sa.Column('owner', sa.String(length=80), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('duration', sa.Float(), nullable=True),
+    sa.Column('rows_processed', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_run', schema=None) as batch_op:
+        batch_op.create_index('ix_job_run_job_name_started_at', ['job_name', 'started_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_run', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_run_job_name_started_at')
+
+    op.drop_table('job_run')
+    op.drop_table('job_lease')
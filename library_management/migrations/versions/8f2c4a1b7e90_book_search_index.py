@@ -0,0 +1,55 @@
+"""Add FTS5 search index over book title, author and isbn
+
+Revision ID: 8f2c4a1b7e90
+Revises: 3d1ad50b482c
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2c4a1b7e90'
+down_revision = '3d1ad50b482c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(
+        title, author, isbn,
+        content='book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN
+        INSERT INTO book_fts(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF title, author, isbn ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+        INSERT INTO book_fts(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END""")
+
+    # Backfill the index from the existing catalog
+    op.execute("INSERT INTO book_fts(book_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS book_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ai")
+    op.execute("DROP TABLE IF EXISTS book_fts")
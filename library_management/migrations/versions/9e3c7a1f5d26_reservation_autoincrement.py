@@ -0,0 +1,36 @@
+"""Never reuse reservation ids
+
+Revision ID: 9e3c7a1f5d26
+Revises: 0b5d9e7a3c18
+Create Date: 2026-10-19 10:12:27.504913
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3c7a1f5d26'
+down_revision = '0b5d9e7a3c18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Other databases' sequences never go backwards; SQLite reuses the highest
+    # rowid once it is deleted, which clashes with the archived copy's id
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('reservation', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'reservation'")
+    op.execute("""INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'reservation', COALESCE(MAX(id), 0) FROM (
+            SELECT id FROM reservation UNION ALL SELECT id FROM reservation_archive)""")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('reservation', schema=None, recreate='always') as batch_op:
+        pass
@@ -0,0 +1,35 @@
+"""Add the availability change log
+
+Revision ID: a6d31f8e52c0
+Revises: 7c0d5e8a3f21
+Create Date: 2026-10-18 18:40:12.531907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d31f8e52c0'
+down_revision = '7c0d5e8a3f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('availability_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['book.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('availability_change', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_availability_change_changed_at'), ['changed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('availability_change', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_availability_change_changed_at'))
+
+    op.drop_table('availability_change')
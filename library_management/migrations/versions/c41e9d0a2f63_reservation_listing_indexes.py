@@ -0,0 +1,30 @@
+"""Add composite indexes for reservation listing filters
+
+Revision ID: c41e9d0a2f63
+Revises: 8f2c4a1b7e90
+Create Date: 2026-10-18 10:04:52.817340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e9d0a2f63'
+down_revision = '8f2c4a1b7e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.create_index('ix_reservation_status_due_date', ['status', 'due_date'], unique=False)
+        batch_op.create_index('ix_reservation_user_id_status', ['user_id', 'status'], unique=False)
+        batch_op.create_index('ix_reservation_book_id_status', ['book_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservation_book_id_status')
+        batch_op.drop_index('ix_reservation_user_id_status')
+        batch_op.drop_index('ix_reservation_status_due_date')
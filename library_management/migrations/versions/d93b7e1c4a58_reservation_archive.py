@@ -0,0 +1,44 @@
+"""Add the reservation archive table
+
+Revision ID: d93b7e1c4a58
+Revises: a6d31f8e52c0
+Create Date: 2026-10-18 19:12:48.204615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd93b7e1c4a58'
+down_revision = 'a6d31f8e52c0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservation_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('date_reserved', sa.DateTime(), nullable=True),
+    sa.Column('date_returned', sa.DateTime(), nullable=True),
+    sa.Column('due_date', sa.DateTime(), nullable=True),
+    sa.Column('fine_amount', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['book.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reservation_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reservation_archive_book_id'), ['book_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_reservation_archive_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservation_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reservation_archive_user_id'))
+        batch_op.drop_index(batch_op.f('ix_reservation_archive_book_id'))
+
+    op.drop_table('reservation_archive')
@@ -0,0 +1,44 @@
+"""Add per-patron loan and fine totals
+
+Revision ID: f4b8c2d61a97
+Revises: d93b7e1c4a58
+Create Date: 2026-10-18 21:40:15.532907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8c2d61a97'
+down_revision = 'd93b7e1c4a58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('patron_summary',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('open_loans', sa.Integer(), nullable=False),
+    sa.Column('total_loans', sa.Integer(), nullable=False),
+    sa.Column('fines_total', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Existing patrons start from their full history, live and archived
+    op.execute("""INSERT INTO patron_summary (user_id, open_loans, total_loans, fines_total, updated_at)
+        SELECT u.id,
+               COALESCE(SUM(CASE WHEN h.status IN ('pending', 'approved') THEN 1 ELSE 0 END), 0),
+               COUNT(h.user_id),
+               COALESCE(SUM(h.fine_amount), 0.0),
+               CURRENT_TIMESTAMP
+        FROM "user" u
+        LEFT JOIN (SELECT user_id, status, fine_amount FROM reservation
+                   UNION ALL
+                   SELECT user_id, status, fine_amount FROM reservation_archive) h ON h.user_id = u.id
+        GROUP BY u.id""")
+
+
+def downgrade():
+    op.drop_table('patron_summary')
@@ -7,6 +7,7 @@ class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(120), nullable=False)
+    email = db.Column(db.String(254), nullable=True)
     is_admin = db.Column(db.Boolean, default=False)
 
 class Book(db.Model):
@@ -18,6 +19,14 @@ class Book(db.Model):
     available = db.Column(db.Integer, default=1)
 
 class Reservation(db.Model):
+    __table_args__ = (
+        db.Index('ix_reservation_status_due_date', 'status', 'due_date'),
+        db.Index('ix_reservation_user_id_status', 'user_id', 'status'),
+        db.Index('ix_reservation_book_id_status', 'book_id', 'status'),
+        # Archived rows keep their id, so SQLite must never hand it out again
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False)
@@ -29,3 +38,141 @@ class Reservation(db.Model):
 
     user = db.relationship('User', backref=db.backref('reservations', lazy=True))
     book = db.relationship('Book', backref=db.backref('reservations', lazy=True))
+
+class ArchivedReservation(db.Model):
+    """A returned or cancelled reservation moved out of `reservation` by the archive job.
+
+    Keeps the original id and columns, so history views can union both tables.
+    """
+    __tablename__ = 'reservation_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False, index=True)
+    date_reserved = db.Column(db.DateTime)
+    date_returned = db.Column(db.DateTime, nullable=True)
+    due_date = db.Column(db.DateTime, nullable=True)
+    fine_amount = db.Column(db.Float, default=0.0)
+    status = db.Column(db.String(20), nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class ArchiveTotal(db.Model):
+    """Count and fines of the archived reservations in one status.
+
+    Archived rows never change, so archive_reservations adds each batch here
+    and the dashboard reads these rows instead of scanning the archive.
+    """
+    __tablename__ = 'reservation_archive_total'
+
+    status = db.Column(db.String(20), primary_key=True)
+    reservations = db.Column(db.Integer, nullable=False, default=0)
+    fines_total = db.Column(db.Float, nullable=False, default=0.0)
+
+class PatronSummary(db.Model):
+    """Per-patron loan and fine totals, kept up to date by the code that changes them.
+
+    Covers both reservation and reservation_archive, so a patron's summary
+    never has to scan their loan history.
+    """
+    __tablename__ = 'patron_summary'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    open_loans = db.Column(db.Integer, nullable=False, default=0)  # pending or approved
+    total_loans = db.Column(db.Integer, nullable=False, default=0)
+    fines_total = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Hold(db.Model):
+    """A patron's place in the queue for a book with no copies left.
+
+    Holds are served by ascending priority (0 is normal, lower jumps the
+    queue), then in the order they were placed. A 'ready' hold has a copy set
+    aside until expires_at.
+    """
+    __table_args__ = (
+        db.Index('ix_hold_book_id_status_priority', 'book_id', 'status', 'priority', 'id'),
+        db.Index('ix_hold_status_expires_at', 'status', 'expires_at'),
+        db.Index('ix_hold_user_id_status', 'user_id', 'status'),
+        # A patron has at most one active hold per book, however many requests race to place it
+        db.Index('uq_hold_user_id_book_id_active', 'user_id', 'book_id', unique=True,
+                 sqlite_where=db.text("status IN ('waiting', 'ready')"),
+                 postgresql_where=db.text("status IN ('waiting', 'ready')")),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False)
+    priority = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default='waiting')
+    date_placed = db.Column(db.DateTime, default=datetime.utcnow)
+    date_ready = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship('User', backref=db.backref('holds', lazy=True))
+    book = db.relationship('Book', backref=db.backref('holds', lazy=True))
+
+class OutboxMessage(db.Model):
+    """An email waiting to be sent by the notification dispatcher.
+
+    Rows are added in the same transaction as the change they announce, so a
+    rolled-back reservation never sends mail and a committed one always does.
+    """
+    __tablename__ = 'outbox_message'
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    kind = db.Column(db.String(30), nullable=False)
+    recipient = db.Column(db.String(254), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    # Set for messages that must go out at most once, e.g. one digest per user per day
+    dedupe_key = db.Column(db.String(100), unique=True, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(40), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+class JobLease(db.Model):
+    """Who may run a scheduled job right now; one row per job name."""
+    __tablename__ = 'job_lease'
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(80), nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class JobRun(db.Model):
+    __tablename__ = 'job_run'
+    __table_args__ = (
+        db.Index('ix_job_run_job_name_started_at', 'job_name', 'started_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(50), nullable=False)
+    owner = db.Column(db.String(80), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='running')
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration = db.Column(db.Float, nullable=True)  # seconds
+    rows_processed = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+class AvailabilityChange(db.Model):
+    """One row per change to a book's available count.
+
+    Written in the same transaction as the change; each worker's in-memory
+    availability snapshot re-reads the rows stamped since its last poll, less
+    an overlap for transactions that commit late.
+    """
+    __tablename__ = 'availability_change'
+
+    id = db.Column(db.Integer, primary_key=True)
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,4 @@
+from .outbox import (enqueue, notify_user, notify_hold_ready, notify_reservation_created,
+                     notify_book_returned, notifications_enabled)
+from .dispatcher import Dispatcher, DispatchResult, dispatcher, mail
+from .digests import queue_digests
@@ -0,0 +1,85 @@
+import logging
+from datetime import datetime, timedelta
+from itertools import groupby
+from sqlalchemy import select, insert, case
+from ..database import db
+from ..models import User, Book, Reservation, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+DUE_SOON_DAYS = 2
+
+DIGEST_SUBJECTS = {
+    'due_soon': "Books due soon",
+    'overdue': "Overdue books",
+}
+
+DIGEST_INTROS = {
+    'due_soon': "These books are due back within the next {days} days:",
+    'overdue': "These books are overdue. Fines grow every day until they are returned:",
+}
+
+
+def digest_rows(now, due_soon_days=DUE_SOON_DAYS):
+    """Every open loan that is overdue or due soon, for patrons with an email.
+
+    One query for the whole library, ordered so rows group by user and kind.
+    """
+    kind = case((Reservation.due_date < now, 'overdue'), else_='due_soon').label('kind')
+    return db.session.execute(
+        select(User.id.label('user_id'), User.username, User.email, kind,
+               Book.title, Reservation.due_date)
+        .join(Reservation, Reservation.user_id == User.id)
+        .join(Book, Book.id == Reservation.book_id)
+        .where(Reservation.status == 'approved',
+               Reservation.due_date < now + timedelta(days=due_soon_days),
+               User.email.isnot(None), User.email != '')
+        .order_by(User.id, kind, Reservation.due_date)).all()
+
+
+def format_digest(kind, username, rows, due_soon_days=DUE_SOON_DAYS):
+    lines = [f"Hi {username},", "", DIGEST_INTROS[kind].format(days=due_soon_days), ""]
+    lines += [f"  - {row.title} (due {row.due_date:%Y-%m-%d})" for row in rows]
+    return '\n'.join(lines) + '\n'
+
+
+def queue_digests(now=None, due_soon_days=DUE_SOON_DAYS):
+    """Queue one due-soon and one overdue digest per patron for today.
+
+    One SELECT for the loans, one for digests already queued today and one
+    multi-row INSERT into the outbox. Safe to run twice on the same day.
+    Returns the number of digests queued.
+    """
+    now = now or datetime.utcnow()
+    day = f"{now:%Y-%m-%d}"
+    rows = digest_rows(now, due_soon_days)
+    # Keys start with the day, so today's are one range scan of the dedupe_key index
+    # (';' sorts right after ':')
+    already_queued = set(db.session.scalars(
+        select(OutboxMessage.dedupe_key)
+        .where(OutboxMessage.dedupe_key >= f'{day}:', OutboxMessage.dedupe_key < f'{day};')))
+
+    messages = []
+    for (user_id, kind), group in groupby(rows, key=lambda row: (row.user_id, row.kind)):
+        group = list(group)
+        dedupe_key = f"{day}:{kind}:{user_id}"
+        if dedupe_key in already_queued:
+            continue
+        messages.append({
+            'user_id': user_id,
+            'kind': kind,
+            'recipient': group[0].email,
+            'subject': DIGEST_SUBJECTS[kind],
+            'body': format_digest(kind, group[0].username, group, due_soon_days),
+            'dedupe_key': dedupe_key,
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now,
+        })
+
+    if messages:
+        db.session.execute(insert(OutboxMessage), messages)
+    db.session.commit()
+    logger.info("Queued %s due-date digests from %s loans", len(messages), len(rows))
+    return len(messages)
@@ -0,0 +1,155 @@
+import time
+import uuid
+import smtplib
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask_mail import Mail, Message
+from sqlalchemy import select, update
+from ..database import db
+from ..models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+mail = Mail()
+
+
+class DispatchResult:
+    def __init__(self):
+        self.claimed = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+
+class Dispatcher:
+    """Sends outbox messages in batches over one long-lived SMTP connection.
+
+    Each run leases a batch of due messages, so several workers can dispatch
+    without sending anything twice. A failed message is retried with
+    exponential backoff until NOTIFICATION_MAX_ATTEMPTS, then marked failed.
+    """
+
+    def __init__(self):
+        self.batch_size = 100
+        self.max_attempts = 5
+        self.retry_backoff = 60
+        self.lease_seconds = 300
+        self.idle_timeout = 60
+        self.sender = None
+        self.connections_opened = 0
+        self.worker_id = uuid.uuid4().hex
+        self._connection = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        mail.init_app(app)
+        self.batch_size = app.config.get('NOTIFICATION_BATCH_SIZE', 100)
+        self.max_attempts = app.config.get('NOTIFICATION_MAX_ATTEMPTS', 5)
+        self.retry_backoff = app.config.get('NOTIFICATION_RETRY_BACKOFF', 60)
+        self.idle_timeout = app.config.get('NOTIFICATION_SMTP_IDLE_TIMEOUT', 60)
+        self.sender = app.config.get('MAIL_DEFAULT_SENDER')
+        self.close()
+
+    def _get_connection(self):
+        if self._connection is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._connection is None:
+            # Entered by hand so the connection outlives a single batch
+            self._connection = mail.connect().__enter__()
+            self.connections_opened += 1
+        return self._connection
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+
+    def claim_batch(self, now):
+        """Lease up to batch_size due messages to this worker and return them."""
+        due = (select(OutboxMessage.id)
+               .where(OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now)
+               .where((OutboxMessage.locked_until.is_(None)) | (OutboxMessage.locked_until < now))
+               .order_by(OutboxMessage.next_attempt_at)
+               .limit(self.batch_size))
+        db.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due.scalar_subquery()))
+            .where((OutboxMessage.locked_until.is_(None)) | (OutboxMessage.locked_until < now))
+            .values(locked_by=self.worker_id, locked_until=now + timedelta(seconds=self.lease_seconds))
+            .execution_options(synchronize_session=False))
+        db.session.commit()
+        return (OutboxMessage.query
+                .filter(OutboxMessage.locked_by == self.worker_id, OutboxMessage.status == 'pending',
+                        OutboxMessage.locked_until > now)
+                .order_by(OutboxMessage.id)
+                .all())
+
+    def _send(self, message):
+        email = Message(subject=message.subject, recipients=[message.recipient],
+                        body=message.body, sender=self.sender)
+        try:
+            self._get_connection().send(email)
+        except (smtplib.SMTPServerDisconnected, ConnectionResetError, BrokenPipeError):
+            # The pooled connection went stale; reconnect once before counting a failure
+            self.close()
+            self._get_connection().send(email)
+        self._last_used = time.monotonic()
+
+    def dispatch(self, now=None):
+        """Send one batch of due messages. Returns a DispatchResult."""
+        with self._lock:
+            now = now or datetime.utcnow()
+            result = DispatchResult()
+            messages = self.claim_batch(now)
+            result.claimed = len(messages)
+            sent_ids = []
+            for message in messages:
+                try:
+                    self._send(message)
+                    sent_ids.append(message.id)
+                except Exception as e:
+                    self.close()
+                    message.attempts += 1
+                    message.last_error = str(e)[:1000]
+                    message.locked_by = message.locked_until = None
+                    if message.attempts >= self.max_attempts:
+                        message.status = 'failed'
+                        result.failed += 1
+                        logger.error("Giving up on notification %s to %s: %s", message.id, message.recipient, e)
+                    else:
+                        delay = self.retry_backoff * 2 ** (message.attempts - 1)
+                        message.next_attempt_at = now + timedelta(seconds=delay)
+                        result.retried += 1
+                        logger.warning("Notification %s failed, retrying in %ss: %s", message.id, delay, e)
+
+            if sent_ids:
+                db.session.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id.in_(sent_ids))
+                    .values(status='sent', sent_at=datetime.utcnow(), locked_by=None, locked_until=None,
+                            attempts=OutboxMessage.attempts + 1)
+                    .execution_options(synchronize_session=False))
+                result.sent = len(sent_ids)
+            db.session.commit()
+            if result.claimed:
+                logger.info("Dispatched notifications: %s sent, %s to retry, %s failed",
+                            result.sent, result.retried, result.failed)
+            return result
+
+    def dispatch_all(self, now=None):
+        """Drain every due message, batch by batch."""
+        total = DispatchResult()
+        while True:
+            result = self.dispatch(now)
+            for field in ('claimed', 'sent', 'retried', 'failed'):
+                setattr(total, field, getattr(total, field) + getattr(result, field))
+            if result.claimed < self.batch_size:
+                return total
+
+
+dispatcher = Dispatcher()
@@ -0,0 +1,73 @@
+from flask import current_app
+from sqlalchemy import select
+from ..database import db
+from ..models import User, Book, Hold, OutboxMessage
+
+# kind -> (subject, body); formatted with the keyword arguments given to notify_user()
+MESSAGES = {
+    'reservation_created': (
+        "Reserved: {title}",
+        "Hi {username},\n\nYou have reserved \"{title}\". Please return it by {due_date:%Y-%m-%d}.\n"),
+    'hold_ready': (
+        "Ready for pickup: {title}",
+        "Hi {username},\n\nA copy of \"{title}\" is being held for you until {expires_at:%Y-%m-%d %H:%M} UTC.\n"
+        "Check it out from My Reservations before then.\n"),
+    'book_returned': (
+        "Returned: {title}",
+        "Hi {username},\n\nThanks for returning \"{title}\".{fine_note}\n"),
+}
+
+
+def notifications_enabled():
+    return current_app.config.get('NOTIFICATIONS_ENABLED', False)
+
+
+def enqueue(recipient, kind, subject, body, user_id=None, dedupe_key=None):
+    """Add a message to the outbox in the current transaction (no commit)."""
+    message = OutboxMessage(recipient=recipient, kind=kind, subject=subject, body=body,
+                            user_id=user_id, dedupe_key=dedupe_key)
+    db.session.add(message)
+    return message
+
+
+def notify_user(user_id, kind, **context):
+    """Queue one of MESSAGES for a user, if notifications are on and they have an email."""
+    if not notifications_enabled():
+        return None
+    row = db.session.execute(select(User.username, User.email).where(User.id == user_id)).first()
+    if row is None or not row.email:
+        return None
+    subject, body = MESSAGES[kind]
+    context = {'username': row.username, **context}
+    return enqueue(row.email, kind, subject.format(**context), body.format(**context), user_id=user_id)
+
+
+def notify_hold_ready(hold_id):
+    if not notifications_enabled():
+        return None
+    row = db.session.execute(
+        select(Hold.user_id, Hold.expires_at, Book.title)
+        .join(Book, Book.id == Hold.book_id)
+        .where(Hold.id == hold_id)).first()
+    if row is None:
+        return None
+    return notify_user(row.user_id, 'hold_ready', title=row.title, expires_at=row.expires_at)
+
+
+def _book_title(book_id):
+    return db.session.scalar(select(Book.title).where(Book.id == book_id))
+
+
+def notify_reservation_created(reservation):
+    if not notifications_enabled():
+        return None
+    return notify_user(reservation.user_id, 'reservation_created',
+                       title=_book_title(reservation.book_id), due_date=reservation.due_date)
+
+
+def notify_book_returned(reservation, fine=0.0):
+    if not notifications_enabled():
+        return None
+    fine_note = f" A fine of ${fine:.2f} was charged for the late return." if fine else ""
+    return notify_user(reservation.user_id, 'book_returned',
+                       title=_book_title(reservation.book_id), fine_note=fine_note)
@@ -0,0 +1,44 @@
+from flask import request
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+class Page:
+    """One page of a query, fetched with LIMIT/OFFSET and no COUNT(*).
+
+    One extra row is read to know whether a next page exists, so the cost
+    depends on the page size, not on how large the table has grown.
+    """
+
+    def __init__(self, items, page, per_page, has_next, page_arg='page'):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = page > 1
+        self.page_arg = page_arg
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def url_args(self, page):
+        """Current request args with this page's argument set to `page`."""
+        args = request.args.to_dict()
+        args[self.page_arg] = page
+        return args
+
+
+def paginate(query, page_arg='page', per_page=None):
+    page = max(request.args.get(page_arg, 1, type=int), 1)
+    if per_page is None:
+        per_page = request.args.get('per_page', DEFAULT_PER_PAGE, type=int)
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    return Page(rows[:per_page], page, per_page, len(rows) > per_page, page_arg)
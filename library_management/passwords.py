@@ -0,0 +1,123 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Upper bounds of the hash latency histogram, in seconds
+HASH_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class HasherBusy(RuntimeError):
+    """Raised instead of queueing hash work beyond PASSWORD_HASH_QUEUE_LIMIT."""
+
+
+class PasswordHasher:
+    """Runs password hashing on a small, bounded thread pool.
+
+    The calling request thread still blocks until its hash is done (or
+    PASSWORD_HASH_TIMEOUT passes). The pool caps how many hashes run at once:
+    at most `workers + queue_limit` jobs are accepted, and anything beyond
+    that fails fast with HasherBusy so the app can shed load with a 503.
+    """
+
+    def __init__(self):
+        self.method = 'scrypt'
+        self.workers = 2
+        self.queue_limit = 16
+        self.timeout = 10.0
+        self.rejected = 0
+        self.rehashed = 0
+        self._in_flight = 0
+        self._bucket_counts = [0] * len(HASH_LATENCY_BUCKETS)
+        self._count = 0
+        self._total = 0.0
+        self._prefix = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.queue_limit = app.config.get('PASSWORD_HASH_QUEUE_LIMIT', 16)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10.0)
+        self._prefix = None
+
+    def _get_executor(self):
+        # Created on first use so that forked server workers each get their own threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-hash')
+            return self._executor
+
+    def _run(self, func, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HasherBusy("Too many password checks are already queued.")
+            self._in_flight += 1
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self._finish(time.perf_counter() - started)
+
+        try:
+            future = self._get_executor().submit(job)
+        except Exception:
+            self._release()
+            raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy("Timed out waiting for a password check.")
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _finish(self, seconds):
+        with self._lock:
+            self._in_flight -= 1
+            for i, bound in enumerate(HASH_LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self._bucket_counts[i] += 1
+                    break
+            self._count += 1
+            self._total += seconds
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if `pwhash` was made with other parameters than PASSWORD_HASH_METHOD."""
+        if self._prefix is None:
+            # Werkzeug fills in the default cost parameters; read them off one hash
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._prefix
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'queued': max(self._in_flight - self.workers, 0),
+                'rejected': self.rejected,
+                'rehashed': self.rehashed,
+                'count': self._count,
+                'total': self._total,
+                'buckets': list(self._bucket_counts),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,120 @@
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete, func, case, union_all
+from .database import db
+from .models import User, Reservation, ArchivedReservation, PatronSummary
+
+# Statuses counted as a patron's open loans
+OPEN_LOAN_STATUSES = ('pending', 'approved')
+
+
+def _history(user_ids=None):
+    """user_id, status and fine of every reservation, live or archived."""
+    parts = []
+    for model in (Reservation, ArchivedReservation):
+        part = select(model.user_id, model.status, model.fine_amount)
+        if user_ids is not None:
+            part = part.where(model.user_id.in_(user_ids))
+        parts.append(part)
+    return union_all(*parts).subquery('history')
+
+
+def rebuild_patron_summaries(user_ids=None):
+    """Recompute patron_summary rows from the reservation tables.
+
+    For every user, or only `user_ids`. Counts everything already flushed in
+    the current transaction. Returns the number of rows written.
+    """
+    db.session.flush()
+    history = _history(user_ids)
+    totals = {row.user_id: row for row in db.session.execute(
+        select(history.c.user_id,
+               func.sum(case((history.c.status.in_(OPEN_LOAN_STATUSES), 1), else_=0)).label('open_loans'),
+               func.count().label('total_loans'),
+               func.coalesce(func.sum(history.c.fine_amount), 0.0).label('fines_total'))
+        .group_by(history.c.user_id))}
+    users = select(User.id)
+    if user_ids is not None:
+        users = users.where(User.id.in_(user_ids))
+    now = datetime.utcnow()
+    rows = []
+    for user_id in db.session.scalars(users):
+        row = totals.get(user_id)
+        rows.append({'user_id': user_id, 'updated_at': now,
+                     'open_loans': row.open_loans if row else 0,
+                     'total_loans': row.total_loans if row else 0,
+                     'fines_total': row.fines_total if row else 0.0})
+
+    stale = delete(PatronSummary)
+    if user_ids is not None:
+        stale = stale.where(PatronSummary.user_id.in_(user_ids))
+    db.session.execute(stale.execution_options(synchronize_session=False))
+    if rows:
+        db.session.execute(insert(PatronSummary), rows)
+    return len(rows)
+
+
+def adjust_patron_summary(user_id, open_loans=0, total_loans=0, fines=0.0):
+    """Apply a change the caller has just made to one patron's loans.
+
+    Call it after the change, in the same transaction. A patron with no
+    summary row yet gets one built from the tables, which already include
+    the change.
+    """
+    if not (open_loans or total_loans or fines):
+        return
+    result = db.session.execute(
+        update(PatronSummary)
+        .where(PatronSummary.user_id == user_id)
+        .values(open_loans=PatronSummary.open_loans + open_loans,
+                total_loans=PatronSummary.total_loans + total_loans,
+                fines_total=PatronSummary.fines_total + fines,
+                updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False))
+    if result.rowcount == 0:
+        rebuild_patron_summaries([user_id])
+
+
+def adjust_patron_summaries(changes):
+    """adjust_patron_summary for many patrons in one UPDATE.
+
+    `changes` maps user_id to a dict of adjust_patron_summary keyword
+    arguments.
+    """
+    changes = {user_id: change for user_id, change in changes.items() if any(change.values())}
+    if not changes:
+        return
+
+    def delta(name, default):
+        return case({user_id: change.get(name, default) for user_id, change in changes.items()},
+                    value=PatronSummary.user_id, else_=default)
+
+    result = db.session.execute(
+        update(PatronSummary)
+        .where(PatronSummary.user_id.in_(list(changes)))
+        .values(open_loans=PatronSummary.open_loans + delta('open_loans', 0),
+                total_loans=PatronSummary.total_loans + delta('total_loans', 0),
+                fines_total=PatronSummary.fines_total + delta('fines', 0.0),
+                updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False))
+    if result.rowcount < len(changes):
+        present = set(db.session.scalars(
+            select(PatronSummary.user_id).where(PatronSummary.user_id.in_(list(changes)))))
+        rebuild_patron_summaries([user_id for user_id in changes if user_id not in present])
+
+
+def refresh_patron_fines(user_ids):
+    """Recompute fines_total for `user_ids` (a list or a select of ids) after a bulk fine update.
+
+    One UPDATE over the given patrons; patrons without a summary row are
+    left to be built on first read.
+    """
+    live, archived = (select(func.coalesce(func.sum(model.fine_amount), 0.0))
+                      .where(model.user_id == PatronSummary.user_id)
+                      .scalar_subquery()
+                      for model in (Reservation, ArchivedReservation))
+    result = db.session.execute(
+        update(PatronSummary)
+        .where(PatronSummary.user_id.in_(user_ids))
+        .values(fines_total=live + archived, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False))
+    return result.rowcount
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from .database import db
+from .models import Book, Reservation, Hold, PatronSummary
+from .fines import calculate_fine
+from .holds import queue_positions, ACTIVE_HOLD_STATUSES
+from .patron_summary import rebuild_patron_summaries, OPEN_LOAN_STATUSES
+
+DUE_SOON_DAYS = 3
+
+
+def patron_summary(user_id, now=None, due_soon_days=DUE_SOON_DAYS):
+    """Open loans, due-soon and overdue loans, holds and fines owed for one patron.
+
+    Reads the patron_summary row plus the patron's open loans and active
+    holds, all through (user_id, status) indexes, so the cost does not grow
+    with the patron's loan history. Outstanding fines are those on open loans
+    as of `now`, as on the admin dashboard; lifetime fines add every fine
+    recorded on closed loans.
+    """
+    now = now or datetime.utcnow()
+    totals = db.session.execute(
+        select(PatronSummary.open_loans, PatronSummary.total_loans, PatronSummary.fines_total)
+        .where(PatronSummary.user_id == user_id)).first()
+    if totals is None:
+        rebuild_patron_summaries([user_id])
+        db.session.commit()
+        totals = db.session.execute(
+            select(PatronSummary.open_loans, PatronSummary.total_loans, PatronSummary.fines_total)
+            .where(PatronSummary.user_id == user_id)).one()
+
+    loans = db.session.execute(
+        select(Reservation.id, Reservation.book_id, Book.title, Book.author, Reservation.status,
+               Reservation.date_reserved, Reservation.due_date, Reservation.fine_amount)
+        .join(Book, Book.id == Reservation.book_id)
+        .where(Reservation.user_id == user_id, Reservation.status.in_(OPEN_LOAN_STATUSES))
+        .order_by(Reservation.due_date, Reservation.id)).all()
+    holds = db.session.execute(
+        select(Hold.id, Hold.book_id, Hold.priority, Book.title, Book.author, Hold.status,
+               Hold.date_placed, Hold.expires_at)
+        .join(Book, Book.id == Hold.book_id)
+        .where(Hold.user_id == user_id, Hold.status.in_(ACTIVE_HOLD_STATUSES))
+        .order_by(Hold.date_placed, Hold.id)).all()
+
+    positions = queue_positions(holds)
+    due_soon_until = now + timedelta(days=due_soon_days)
+    active_loans = []
+    outstanding = 0.0
+    # Fines recorded for open loans are replaced by what they owe as of now
+    lifetime = totals.fines_total
+    for loan in loans:
+        fine = calculate_fine(loan, now)
+        outstanding += fine
+        lifetime += fine - (loan.fine_amount or 0.0)
+        active_loans.append({
+            'id': loan.id,
+            'book_id': loan.book_id,
+            'title': loan.title,
+            'author': loan.author,
+            'status': loan.status,
+            'date_reserved': loan.date_reserved,
+            'due_date': loan.due_date,
+            'overdue': loan.status == 'approved' and loan.due_date is not None and loan.due_date < now,
+            'due_soon': (loan.status == 'approved' and loan.due_date is not None
+                         and now <= loan.due_date <= due_soon_until),
+            'fine': fine,
+        })
+
+    return {
+        'user_id': user_id,
+        'open_loans': totals.open_loans,
+        'total_loans': totals.total_loans,
+        'outstanding_fines': round(outstanding, 2),
+        'lifetime_fines': round(lifetime, 2),
+        'active_loans': active_loans,
+        'due_soon': [loan for loan in active_loans if loan['due_soon']],
+        'overdue': [loan for loan in active_loans if loan['overdue']],
+        'holds': [{
+            'id': hold.id,
+            'book_id': hold.book_id,
+            'title': hold.title,
+            'author': hold.author,
+            'status': hold.status,
+            'date_placed': hold.date_placed,
+            'expires_at': hold.expires_at,
+            'position': positions.get(hold.id),
+        } for hold in holds],
+    }
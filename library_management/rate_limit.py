@@ -0,0 +1,46 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """In-process token buckets, one per key, refilled continuously.
+
+    Each key may spend `burst` attempts at once and regains `per_minute`
+    attempts a minute. Only the `maxsize` most recently used keys are kept.
+    """
+
+    def __init__(self, burst=5, per_minute=5, maxsize=10000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.limited = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(burst, per_minute)
+
+    def configure(self, burst, per_minute):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+
+    def allow(self, key):
+        """Take one token for `key`; returns (allowed, seconds until the next token)."""
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                allowed, retry_after = True, 0.0
+                tokens -= 1
+            else:
+                allowed = False
+                retry_after = (1 - tokens) / self.rate if self.rate else float('inf')
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return allowed, retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
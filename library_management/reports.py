@@ -0,0 +1,127 @@
+import io
+import csv
+import json
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from .database import db
+from .models import User, Book, Reservation
+from .archive import reservation_history
+
+# Rows fetched from the server-side cursor per round-trip
+EXPORT_YIELD_PER = 1000
+# Rows buffered into one chunk of the response or file
+EXPORT_CHUNK_ROWS = 500
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+# Reservation reports take the entity to read from: Reservation, or
+# reservation_history() to include archived rows.
+
+def _circulation_query(r):
+    return (select(r.id.label('reservation_id'), r.status,
+                   r.date_reserved, r.due_date, r.date_returned,
+                   r.fine_amount, r.user_id, User.username,
+                   r.book_id, Book.isbn, Book.title)
+            .join(User, User.id == r.user_id)
+            .join(Book, Book.id == r.book_id)
+            .order_by(r.id))
+
+
+def _fines_query(r):
+    return (select(r.id.label('reservation_id'), User.username, Book.isbn, Book.title,
+                   r.status, r.due_date, r.date_returned,
+                   r.fine_amount)
+            .join(User, User.id == r.user_id)
+            .join(Book, Book.id == r.book_id)
+            .where(r.fine_amount > 0)
+            .order_by(r.id))
+
+
+def _catalog_query(r):
+    return (select(Book.id.label('book_id'), Book.isbn, Book.title, Book.author,
+                   Book.quantity, Book.available)
+            .order_by(Book.id))
+
+
+# name -> (query factory, reservation column the date range applies to)
+REPORTS = {
+    'circulation': (_circulation_query, 'date_reserved'),
+    'fines': (_fines_query, 'due_date'),
+    'catalog': (_catalog_query, None),
+}
+
+
+def month_range(value):
+    """First and last day of a YYYY-MM month, for monthly extracts."""
+    first = datetime.strptime(value, '%Y-%m')
+    next_month = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first, next_month - timedelta(days=1)
+
+
+def report_statement(name, date_from=None, date_to=None, include_archived=False):
+    """Build the SELECT for a report; `date_to` is inclusive."""
+    make_query, date_field = REPORTS[name]
+    entity = reservation_history() if include_archived else Reservation
+    statement = make_query(entity)
+    if date_field is not None:
+        date_column = getattr(entity, date_field)
+        if date_from:
+            statement = statement.where(date_column >= date_from)
+        if date_to:
+            statement = statement.where(date_column < date_to + timedelta(days=1))
+    return statement
+
+
+def iter_report_rows(name, date_from=None, date_to=None, include_archived=False):
+    """Yield report rows from a server-side cursor, EXPORT_YIELD_PER at a time."""
+    statement = report_statement(name, date_from, date_to, include_archived)
+    result = db.session.execute(statement.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER))
+    try:
+        yield list(result.keys())
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(next(rows))
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    columns = next(rows)
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps({column: _json_value(value) for column, value in zip(columns, row)}))
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+WRITERS = {'csv': iter_csv, 'ndjson': iter_ndjson}
+
+
+def iter_report(name, export_format='csv', date_from=None, date_to=None, include_archived=False):
+    """Yield the report as text chunks, ready for a streamed response or a file."""
+    return WRITERS[export_format](iter_report_rows(name, date_from, date_to, include_archived))
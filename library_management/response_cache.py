@@ -0,0 +1,159 @@
+import hashlib
+import json
+from functools import wraps
+from flask import g, request, make_response, current_app
+from .user_cache import LocalCacheBackend, RedisCacheBackend
+
+CATALOG_VERSION_KEY = 'catalog_version'
+# Bumped only when books are added or edited, not when their availability changes
+LISTING_VERSION_KEY = 'listing_version'
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ('X-Next-Cursor', 'Link')
+
+
+class ResponseCache:
+    """Caches rendered catalog responses, keyed on the catalog version.
+
+    Anything that changes books or their availability calls
+    bump_catalog_version(); entries rendered under an older version are never
+    looked up again and age out of the LRU. With the local backend each
+    worker has its own version, so RESPONSE_CACHE_TTL bounds how long another
+    worker's change can go unseen. Set RESPONSE_CACHE_URL to share both.
+
+    Listings cached with cached_listing() hold no availability counts, so
+    they live under a separate version that loans and returns leave alone.
+    """
+
+    def __init__(self):
+        self.backend = LocalCacheBackend()
+        self.enabled = False
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        ttl = app.config.get('RESPONSE_CACHE_TTL', 60)
+        if app.config.get('RESPONSE_CACHE_URL'):
+            self.backend = RedisCacheBackend(app.config['RESPONSE_CACHE_URL'], ttl=ttl,
+                                             prefix='library:response:')
+        else:
+            self.backend = LocalCacheBackend(maxsize=app.config.get('RESPONSE_CACHE_SIZE', 512), ttl=ttl)
+
+    def catalog_version(self):
+        return self.backend.get_counter(CATALOG_VERSION_KEY)
+
+    def listing_version(self):
+        return self.backend.get_counter(LISTING_VERSION_KEY)
+
+    def bump_catalog_version(self, availability_only=False):
+        if not availability_only:
+            self.backend.incr_counter(LISTING_VERSION_KEY)
+        return self.backend.incr_counter(CATALOG_VERSION_KEY)
+
+    def make_key(self, endpoint, params, version=None):
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+        return f"{self.catalog_version() if version is None else version}:{endpoint}:{digest}"
+
+    def cached_listing(self, name, params, load):
+        """Return `load()`, cached until a book is added or edited. The value must be JSON-able."""
+        if not self.enabled:
+            return load()
+        key = self.make_key(f"listing:{name}", params, version=self.listing_version())
+        value = self.get(key)
+        if value is None:
+            value = load()
+            self.backend.set(key, value)
+        return value
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, key, response):
+        body = response.get_data()
+        entry = {
+            'body': body.decode('utf-8'),
+            'mimetype': response.mimetype,
+            'etag': hashlib.sha1(body).hexdigest(),
+            'headers': {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers},
+        }
+        self.backend.set(key, entry)
+        return entry
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'size': len(self.backend),
+            'version': self.catalog_version(),
+        }
+
+
+response_cache = ResponseCache()
+
+
+def bump_catalog_version(availability_only=False):
+    """Pass availability_only=True for loans, returns and holds, which leave the book list alone."""
+    response_cache.bump_catalog_version(availability_only)
+
+
+def normalize_query(value):
+    """Collapse whitespace in a search query; its case is kept for the search itself."""
+    return ' '.join((value or '').split())
+
+
+def skip_response_cache():
+    """Called by a view whose response (an error page, say) must not be cached."""
+    g.skip_response_cache = True
+
+
+def cached_response(make_params, vary_cookie=False):
+    """Serve a GET view from the response cache, with ETag revalidation.
+
+    `make_params()` returns the normalized request parameters the response
+    depends on, or None when this request must not be cached. Views that
+    render differently for logged-in users pass vary_cookie=True.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            params = make_params() if response_cache.enabled else None
+            if params is None:
+                return view(*args, **kwargs)
+
+            key = response_cache.make_key(request.endpoint, params)
+            entry = response_cache.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed or g.pop('skip_response_cache', False):
+                    return response
+                entry = response_cache.store(key, response)
+
+            response = current_app.response_class(entry['body'], mimetype=entry['mimetype'],
+                                                  headers=entry['headers'])
+            response.set_etag(entry['etag'])
+            return conditional_response(response, vary_cookie)
+        return wrapper
+    return decorator
+
+
+def conditional_response(response, vary_cookie=False):
+    """Answer If-None-Match with a 304; the response needs an ETag already."""
+    # Let browsers and proxies keep a copy, but revalidate it every time
+    response.headers['Cache-Control'] = 'no-cache'
+    if vary_cookie:
+        response.vary.add('Cookie')
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        response_cache.not_modified += 1
+    return response
@@ -0,0 +1,132 @@
+import re
+from sqlalchemy import DDL, event, table, column, text, false, select, exists
+from .database import db
+from .models import Book
+
+# SQLite FTS5 index over the catalog. It is an external-content table backed
+# by `book`, so only the inverted index is stored; triggers keep it in sync.
+FTS_TABLE = 'book_fts'
+
+book_fts = table(FTS_TABLE, column('rowid'))
+
+# bm25() column weights for (title, author, isbn)
+RANK_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Columns clients may request through `fields=` on /api/search, sync and async,
+# and the page sizes both serve
+API_BOOK_FIELDS = ('id', 'title', 'author', 'isbn', 'quantity', 'available')
+API_DEFAULT_FIELDS = ('id', 'title', 'author', 'available')
+API_DEFAULT_LIMIT = 50
+API_MAX_LIMIT = 500
+
+SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, author, isbn,
+        content='book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON book BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON book BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+    END""",
+    # Only fire on indexed columns so availability updates never touch the index
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, author, isbn ON book BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn);
+        INSERT INTO {FTS_TABLE}(rowid, title, author, isbn)
+        VALUES (new.id, new.title, new.author, new.isbn);
+    END""",
+]
+
+# Create the index whenever create_all() creates the book table on SQLite.
+# Existing databases get it through the Alembic migration.
+for _statement in SEARCH_INDEX_DDL:
+    event.listen(Book.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_ISBN_RE = re.compile(r'^(\d{9}[\dX]|\d{13})$')
+
+
+def normalize_isbn(value):
+    """Return the bare ISBN-10/13 in `value`, or None if it does not look like one."""
+    candidate = re.sub(r'[\s-]', '', value or '').upper()
+    if _ISBN_RE.match(candidate):
+        return candidate
+    return None
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 MATCH expression with prefix matching on every term."""
+    tokens = _TOKEN_RE.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def rebuild_search_index():
+    """Repopulate the FTS index from the book table."""
+    db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def apply_search(statement, query, dialect_name):
+    """Add the full-text match for `query` to a Book query or select(), ranked by relevance.
+
+    Non-SQLite backends have no FTS5, so they fall back to a LIKE scan.
+    """
+    if dialect_name != 'sqlite':
+        return statement.filter((Book.title.contains(query)) | (Book.author.contains(query)))
+
+    match = build_match_query(query)
+    if not match:
+        return statement.filter(false())
+
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    return (statement
+            .join(book_fts, book_fts.c.rowid == Book.id)
+            .filter(text(f"{FTS_TABLE} MATCH :match").bindparams(match=match))
+            .order_by(text(f"bm25({FTS_TABLE}, {weights})")))
+
+
+def search_cache_key(query):
+    """The form of `query` that cache keys use.
+
+    FTS5 matching ignores case, so "Dune" and "dune" can share cached
+    results. The LIKE fallback on other databases is case-sensitive, so
+    there the case stays in the key.
+    """
+    return query.lower() if db.session.get_bind().dialect.name == 'sqlite' else query
+
+
+def search_books_query(query):
+    """Return a Book query for the full-text match of `query`, ranked by relevance."""
+    return apply_search(Book.query, query, db.session.get_bind().dialect.name)
+
+
+def catalog_query(query):
+    """Return the base Book query for `query` (all books when empty).
+
+    Used by callers that apply their own ordering, pagination or projection.
+    """
+    if not query:
+        return Book.query
+    isbn = normalize_isbn(query)
+    if isbn:
+        isbn_match = Book.query.filter(Book.isbn == isbn)
+        if db.session.query(isbn_match.exists()).scalar():
+            return isbn_match
+    return search_books_query(query)
+
+
+async def catalog_select(session, query, columns):
+    """catalog_query() for an AsyncSession: a select() of `columns` for `query`."""
+    statement = select(*columns)
+    if not query:
+        return statement
+    isbn = normalize_isbn(query)
+    if isbn and await session.scalar(select(exists().where(Book.isbn == isbn))):
+        return statement.where(Book.isbn == isbn)
+    return apply_search(statement, query, session.bind.dialect.name)
@@ -0,0 +1,96 @@
+import time
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, case
+from .database import db
+from .models import Book, Reservation, ArchiveTotal
+
+DEFAULT_STATS_TTL = 30  # seconds
+
+
+def compute_library_stats():
+    """Aggregate catalog and circulation figures in three queries.
+
+    Only the live reservation table is grouped; archived reservations come
+    from the running totals kept by archive_reservations.
+    """
+    books = db.session.query(
+        func.count(Book.id),
+        func.coalesce(func.sum(case((Book.available > 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(Book.quantity), 0),
+        func.coalesce(func.sum(Book.available), 0),
+    ).one()
+
+    by_status = {}
+    fines_by_status = {}
+    for status, count, fines in (db.session.query(Reservation.status,
+                                                  func.count(Reservation.id),
+                                                  func.coalesce(func.sum(Reservation.fine_amount), 0.0))
+                                 .group_by(Reservation.status)):
+        by_status[status] = count
+        fines_by_status[status] = fines
+    # Archived reservations still count towards the totals
+    for status, count, fines in db.session.query(ArchiveTotal.status, ArchiveTotal.reservations,
+                                                 ArchiveTotal.fines_total):
+        by_status[status] = by_status.get(status, 0) + count
+        fines_by_status[status] = fines_by_status.get(status, 0.0) + fines
+
+    return {
+        'total_books': books[0],
+        'available_books': books[1],
+        'total_copies': books[2],
+        'available_copies': books[3],
+        'total_reservations': sum(by_status.values()),
+        'reservations_by_status': by_status,
+        # Fines accrue on open loans and are settled when the book comes back
+        'outstanding_fines': float(fines_by_status.get('approved', 0.0)),
+        'total_fines': float(sum(fines_by_status.values())),
+        'computed_at': datetime.utcnow(),
+    }
+
+
+class StatsCache:
+    """Process-local cache for the dashboard aggregates.
+
+    Loans and returns do not invalidate it: the figures are up to
+    STATS_CACHE_TTL seconds old, so a busy desk does not recompute them on
+    every dashboard load. Catalog edits, imports and the batch jobs still
+    invalidate it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires_at = 0.0
+        self._generation = 0
+
+    def get(self, ttl):
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                return self._value
+            generation = self._generation
+        value = compute_library_stats()
+        with self._lock:
+            # Don't cache a result that an invalidation raced with
+            if generation == self._generation:
+                self._value = value
+                self._expires_at = time.monotonic() + ttl
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._value = None
+            self._expires_at = 0.0
+
+
+stats_cache = StatsCache()
+
+
+def get_library_stats():
+    return stats_cache.get(current_app.config.get('STATS_CACHE_TTL', DEFAULT_STATS_TTL))
+
+
+def invalidate_library_stats():
+    stats_cache.invalidate()
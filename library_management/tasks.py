@@ -0,0 +1,60 @@
+from flask import current_app
+from .fines import recalculate_fines
+from .stats import invalidate_library_stats
+from .holds import expire_holds
+from .jobs import job_registry
+from .availability import prune_availability_changes
+from .archive import archive_reservations
+from .response_cache import bump_catalog_version
+from .notifications import dispatcher as notification_dispatcher, queue_digests
+
+
+def update_fines():
+    result = recalculate_fines()
+    invalidate_library_stats()
+    return result.rows
+
+
+def expire_unclaimed_holds():
+    expired = expire_holds(pickup_days=current_app.config['HOLD_PICKUP_DAYS'])
+    if expired:
+        invalidate_library_stats()
+        bump_catalog_version(availability_only=True)
+    return expired
+
+
+def dispatch_notifications():
+    return notification_dispatcher.dispatch_all().sent
+
+
+def send_due_date_digests():
+    return queue_digests(due_soon_days=current_app.config['NOTIFICATION_DUE_SOON_DAYS'])
+
+
+def prune_job_history():
+    return job_registry.prune_history(current_app.config['JOB_HISTORY_DAYS'])
+
+
+def prune_availability_change_log():
+    return prune_availability_changes(current_app.config['AVAILABILITY_CHANGE_LOG_HOURS'])
+
+
+def archive_closed_reservations():
+    moved = archive_reservations(current_app.config['ARCHIVE_AFTER_DAYS'], current_app.config['ARCHIVE_BATCH_SIZE'])
+    if moved:
+        invalidate_library_stats()
+    return moved
+
+
+def register_jobs(app):
+    """Register the scheduled jobs. They are run by `flask run-jobs`, never inside web workers."""
+    job_registry.init_app(app)
+    job_registry.job('update_fines', 'cron', hour=0)(update_fines)
+    job_registry.job('expire_holds', 'interval', hours=1)(expire_unclaimed_holds)
+    job_registry.job('dispatch_notifications', 'interval', enabled=app.config['NOTIFICATIONS_ENABLED'],
+                     min_gap=0, seconds=app.config['NOTIFICATION_POLL_SECONDS'])(dispatch_notifications)
+    job_registry.job('due_date_digests', 'cron', enabled=app.config['NOTIFICATIONS_ENABLED'],
+                     hour=app.config['NOTIFICATION_DIGEST_HOUR'])(send_due_date_digests)
+    job_registry.job('prune_job_history', 'cron', hour=3)(prune_job_history)
+    job_registry.job('archive_reservations', 'cron', hour=2)(archive_closed_reservations)
+    job_registry.job('prune_availability_changes', 'cron', minute=15)(prune_availability_change_log)
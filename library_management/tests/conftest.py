@@ -0,0 +1,136 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select
+
+# Point the app at a throwaway database before it is imported
+_db_dir = tempfile.mkdtemp(prefix='library-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'library.db')}"
+os.environ['INSTRUMENTATION_ENABLED'] = '1'
+
+from library_management.app import app as flask_app  # noqa: E402
+from library_management.database import db  # noqa: E402
+from library_management.models import User, Book, Reservation, PatronSummary  # noqa: E402
+from library_management.stats import stats_cache  # noqa: E402
+from library_management.user_cache import user_cache  # noqa: E402
+from library_management.response_cache import response_cache  # noqa: E402
+from library_management.log_pipeline import log_pipeline  # noqa: E402
+from library_management.availability import availability  # noqa: E402
+
+
+class QueryCounter:
+    """Records every SQL statement sent to the engine while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @contextmanager
+    def watch(self, engine):
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self._record)
+        try:
+            yield self
+        finally:
+            event.remove(engine, 'before_cursor_execute', self._record)
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        # Row ids are reused after the wipe, so drop anything cached by id
+        user_cache.clear()
+        response_cache.clear()
+        stats_cache.invalidate()
+        availability.clear()
+        # Write queued log records while this test's output is still captured
+        log_pipeline.flush()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    counter = QueryCounter()
+
+    @contextmanager
+    def _count():
+        with counter.watch(db.engine):
+            yield counter
+
+    return _count
+
+
+def make_user(username, is_admin=False):
+    # The password hash is never checked; tests log in through the session
+    user = User(username=username, password='x', is_admin=is_admin)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def login(client, user):
+    # Accepts a User or a bare id, for threads that have no app context
+    user_id = user if isinstance(user, int) else user.id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def add_books(count, title='Book', available=2, quantity=2):
+    """Create `count` books titled "<title> 0", "<title> 1", ..."""
+    offset = Book.query.count()
+    books = [Book(title=f"{title} {i}", author="Someone", isbn=f"{9781000000000 + offset + i}",
+                  quantity=quantity, available=available)
+             for i in range(count)]
+    db.session.add_all(books)
+    db.session.commit()
+    return books
+
+
+def seed_reservations(users, count, status='approved', overdue=False):
+    """Create `count` reservations spread over new books and the given users."""
+    now = datetime.utcnow()
+    offset = Book.query.count()
+    books = [Book(title=f"Book {i}", author=f"Author {i}", isbn=f"{9780000000000 + offset + i}",
+                  quantity=2, available=1)
+             for i in range(count)]
+    db.session.add_all(books)
+    db.session.flush()
+    due_date = now - timedelta(days=3) if overdue else now + timedelta(days=14)
+    reservations = [Reservation(user_id=users[i % len(users)].id, book_id=book.id,
+                                status=status, date_reserved=now - timedelta(days=20),
+                                due_date=due_date,
+                                date_returned=now if status == 'returned' else None)
+                    for i, book in enumerate(books)]
+    db.session.add_all(reservations)
+    db.session.commit()
+    return reservations
+
+
+TOTAL_COLUMNS = (PatronSummary.user_id, PatronSummary.open_loans, PatronSummary.total_loans,
+                 PatronSummary.fines_total)
+
+
+def totals(user):
+    """The patron_summary row for `user` as (user_id, open_loans, total_loans, fines_total)."""
+    return tuple(db.session.execute(select(*TOTAL_COLUMNS).where(PatronSummary.user_id == user.id)).one())
@@ -0,0 +1,52 @@
+from .conftest import make_user, login, seed_reservations
+
+
+def test_admin_reservations_is_paginated(client):
+    admin = make_user('admin-user', is_admin=True)
+    patron = make_user('patron')
+    seed_reservations([patron], 30)
+    login(client, admin)
+
+    response = client.get('/admin_reservations?per_page=10&sort=date_reserved&order=asc')
+    assert response.status_code == 200
+    assert response.data.count(b'Reserved by: patron') == 10
+    assert b'page=2' in response.data
+
+    response = client.get('/admin_reservations?per_page=10&page=3')
+    assert response.data.count(b'Reserved by: patron') == 10
+    assert b'page=4' not in response.data
+
+
+def test_admin_reservations_filters_by_status_and_user(client):
+    admin = make_user('admin-user', is_admin=True)
+    alice = make_user('alice')
+    bob = make_user('bob')
+    seed_reservations([alice], 3, status='pending')
+    seed_reservations([bob], 4, status='approved')
+    login(client, admin)
+
+    response = client.get('/admin_reservations?status=approved')
+    assert response.data.count(b'Reserved by: bob') == 4
+    assert b'Reserved by: alice' not in response.data
+
+    response = client.get('/admin_reservations?username=alice')
+    assert response.data.count(b'Reserved by: alice') == 3
+    assert b'Reserved by: bob' not in response.data
+
+    response = client.get('/admin_reservations?username=nobody')
+    assert b'There are no reservations' in response.data
+
+
+def test_book_circulation_pages_each_list_separately(client):
+    admin = make_user('admin-user', is_admin=True)
+    patron = make_user('patron')
+    seed_reservations([patron], 5, status='approved')
+    seed_reservations([patron], 5, status='returned')
+    login(client, admin)
+
+    response = client.get('/book_circulation?per_page=2&date_from=2000-01-01&date_to=bad')
+    assert response.status_code == 200
+    assert response.data.count(b'Issued to: patron') == 2
+    assert response.data.count(b'Returned by: patron') == 2
+    assert b'issued_page=2' in response.data
+    assert b'returned_page=2' in response.data
@@ -0,0 +1,102 @@
+import re
+from datetime import datetime, timedelta
+
+from flask import g
+
+from library_management.database import db
+from library_management.models import Reservation, ArchivedReservation
+from library_management.archive import archive_reservations
+from library_management.reports import iter_report_rows
+from library_management.stats import compute_library_stats
+
+from .conftest import make_user, login, seed_reservations
+
+
+def seed_history(user):
+    """Two long-closed reservations, one recent return and one open loan."""
+    old = seed_reservations([user], 2, status='returned')
+    old[1].status = 'cancelled'
+    for reservation in old:
+        reservation.date_reserved = reservation.date_returned = datetime.utcnow() - timedelta(days=400)
+    old[0].book.title = 'Long Returned'
+    recent = seed_reservations([user], 1, status='returned')
+    open_loan = seed_reservations([user], 1, status='approved')
+    db.session.commit()
+    return old, recent, open_loan
+
+
+def test_archive_moves_old_closed_reservations_in_batches(app):
+    old, recent, open_loan = seed_history(make_user('patron'))
+    old_ids = {reservation.id for reservation in old}
+    cancelled_id = old[1].id
+    kept_ids = {recent[0].id, open_loan[0].id}
+
+    assert archive_reservations(365, batch_size=1, max_batches=1) == 1
+    assert archive_reservations(365, batch_size=1) == 1
+    assert archive_reservations(365) == 0
+
+    assert {row.id for row in ArchivedReservation.query} == old_ids
+    assert {row.id for row in Reservation.query} == kept_ids
+    archived = db.session.get(ArchivedReservation, cancelled_id)
+    assert archived.status == 'cancelled' and archived.archived_at is not None
+
+
+
+def test_archived_ids_are_never_reused(app):
+    patron = make_user('patron')
+    old = seed_reservations([patron], 1, status='returned')[0]
+    old.date_returned = datetime.utcnow() - timedelta(days=400)
+    db.session.commit()
+    old_id = old.id
+    assert archive_reservations(365) == 1
+
+    # The archived row had the highest id in the table
+    new = seed_reservations([patron], 1, status='returned')[0]
+    new.date_returned = datetime.utcnow() - timedelta(days=400)
+    db.session.commit()
+    assert new.id > old_id
+    assert archive_reservations(365) == 1
+    assert ArchivedReservation.query.count() == 2
+
+def test_totals_and_reports_still_count_archived_rows(app, count_queries):
+    seed_history(make_user('patron'))
+    before = compute_library_stats()
+    archive_reservations(365, batch_size=1)
+    with count_queries() as counter:
+        after = compute_library_stats()
+
+    # Archived rows are counted from reservation_archive_total, never scanned
+    assert not any(re.search(r'\breservation_archive\b', statement) for statement in counter.statements)
+
+    assert after['reservations_by_status'] == before['reservations_by_status']
+    assert after['total_fines'] == before['total_fines']
+    assert len(list(iter_report_rows('circulation'))) == 1 + 2
+    assert len(list(iter_report_rows('circulation', include_archived=True))) == 1 + 4
+
+
+def test_history_views_union_the_archive_only_when_asked(client):
+    patron = make_user('patron')
+    seed_history(patron)
+    archive_reservations(365)
+    archived_title = b'Long Returned'
+
+    login(client, make_user('librarian', is_admin=True))
+    assert archived_title not in client.get('/admin_reservations').data
+    assert archived_title in client.get('/admin_reservations?include_archived=1').data
+    assert archived_title in client.get('/admin_reservations?include_archived=1&status=returned'
+                                        '&sort=date_returned').data
+    assert archived_title in client.get('/book_circulation?include_archived=1').data
+
+    login(client, patron)
+    g.pop('_login_user', None)
+    assert archived_title not in client.get('/my_reservations').data
+    assert archived_title in client.get('/my_reservations?include_archived=1').data
+
+
+def test_archive_command_reports_table_sizes(app):
+    seed_history(make_user('patron'))
+    result = app.test_cli_runner().invoke(args=['archive-reservations', '--older-than-days', '365'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Archived 2 reservations.' in result.output
+    assert 'reservation_archive' in result.output and 'overdue' in result.output
@@ -0,0 +1,121 @@
+import json
+import asyncio
+
+import pytest
+
+from library_management.models import Book
+
+from .conftest import make_user, login, seed_reservations, add_books
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('starlette')
+
+from library_management.async_api import create_async_app  # noqa: E402
+
+
+async def _call(api, method, path, query_string='', body=None, cookie=None):
+    headers = [(b'cookie', f'session={cookie}'.encode())] if cookie else []
+    payload = json.dumps(body).encode() if body is not None else b''
+    scope = {'type': 'http', 'method': method, 'path': path,
+             'query_string': query_string.encode(), 'headers': headers}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await api(scope, receive, send)
+    start, body = messages
+    headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], headers, json.loads(body['body'])
+
+
+def call(api, *requests):
+    """Send each (method, path, query, ...) request to the ASGI app; one event loop for all."""
+    async def run():
+        try:
+            return [await _call(api, *request) for request in requests]
+        finally:
+            await api.state.engine.dispose()
+    return asyncio.run(run())
+
+
+def test_search_pages_with_a_keyset_cursor(app):
+    add_books(5, 'Async Book')
+    (status, headers, first), (_, _, rest) = call(
+        create_async_app(),
+        ('GET', '/api/search', 'query=async&limit=3&fields=id,title'),
+        ('GET', '/api/search', 'query=async&limit=3&fields=id,title&cursor=0'))
+
+    assert status == 200
+    assert len(first) == 3 and set(first[0]) == {'id', 'title'}
+    assert headers['x-next-cursor'] == str(first[-1]['id'])
+    assert 'cursor=' in headers['link']
+    assert first == rest[:3]
+
+
+def test_batch_availability_in_one_call(app):
+    books = add_books(3, 'Async Book', available=1)
+    ids = [books[2].id, books[0].id, 99999]
+    (status, _, by_get), (_, _, by_post), (too_many, _, _) = call(
+        create_async_app({'ASYNC_API_MAX_BATCH': 3}),
+        ('GET', '/api/availability', f"ids={','.join(map(str, ids))}"),
+        ('POST', '/api/availability', '', {'ids': ids}),
+        ('GET', '/api/availability', 'ids=1,2,3,4'))
+
+    assert status == 200
+    assert [book['id'] for book in by_get['books']] == [books[2].id, books[0].id]
+    assert by_get['books'][0] == {'id': books[2].id, 'available': 1, 'quantity': 2}
+    assert by_get['missing'] == [99999]
+    assert by_post == by_get
+    assert too_many == 400
+
+
+def test_single_availability_and_unknown_routes(app):
+    book = add_books(1, 'Async Book')[0]
+    (status, _, found), (missing, _, _), (unknown, _, _), (wrong_method, _, _) = call(
+        create_async_app(),
+        ('GET', f'/api/books/{book.id}/availability'),
+        ('GET', '/api/books/99999/availability'),
+        ('GET', '/api/nothing'),
+        ('DELETE', '/api/availability'))
+
+    assert status == 200 and found['available'] == 2
+    assert (missing, unknown, wrong_method) == (404, 404, 405)
+
+
+def test_reservations_use_the_flask_session_cookie(app, client):
+    patron = make_user('async-patron')
+    other = make_user('someone-else')
+    seed_reservations([patron], 2)
+    seed_reservations([other], 1)
+    login(client, patron)
+    cookie = client.get_cookie('session').value
+
+    (status, _, rows), (anonymous, _, _), (forged, _, _) = call(
+        create_async_app(),
+        ('GET', '/api/reservations', '', None, cookie),
+        ('GET', '/api/reservations'),
+        ('GET', '/api/reservations', '', None, cookie[:-2] + 'xx'))
+
+    assert status == 200
+    assert len(rows) == 2 and {row['title'] for row in rows} <= {b.title for b in Book.query}
+    assert anonymous == 401 and forged == 401
+
+
+def test_reservations_page_newest_first(app, client):
+    patron = make_user('async-patron')
+    ids = [reservation.id for reservation in seed_reservations([patron], 3)]
+    login(client, patron)
+    cookie = client.get_cookie('session').value
+
+    (status, headers, first), = call(create_async_app(), ('GET', '/api/reservations', 'limit=2', None, cookie))
+    (_, rest_headers, rest), = call(create_async_app(),
+                                    ('GET', '/api/reservations', f"limit=2&cursor={headers['x-next-cursor']}",
+                                     None, cookie))
+
+    assert status == 200
+    assert [row['id'] for row in first + rest] == sorted(ids, reverse=True)
+    assert 'cursor=' in headers['link'] and 'x-next-cursor' not in rest_headers
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+from flask import g
+from sqlalchemy import update
+
+from library_management.database import db
+from library_management.models import Book, AvailabilityChange
+from library_management.availability import availability, record_availability_change, prune_availability_changes
+from library_management.response_cache import response_cache
+
+from .conftest import make_user, login, add_books
+
+
+def test_search_overlays_counts_without_querying(client, count_queries):
+    add_books(3, 'Snapshot Book')
+    client.get('/search?query=snapshot')
+    with count_queries() as counter:
+        response = client.get('/search?query=snapshot')
+    assert response.status_code == 200
+    assert response.data.count(b'Available: 2') == 3
+    assert counter.count == 0
+
+
+def test_reservations_update_counts_but_keep_the_cached_listing(client):
+    book = add_books(1, 'Snapshot Book', available=1)[0]
+    client.get('/search?query=snapshot')
+    listing_version = response_cache.listing_version()
+
+    login(client, make_user('reader'))
+    g.pop('_login_user', None)
+    client.post(f'/reserve/{book.id}')
+
+    assert AvailabilityChange.query.filter_by(book_id=book.id).count() == 1
+    assert response_cache.listing_version() == listing_version
+    assert b'Available: 0' in client.get('/search?query=snapshot').data
+
+
+def test_other_workers_changes_arrive_within_the_staleness_bound(app):
+    book = add_books(1, 'Snapshot Book')[0]
+    assert availability.get_many([book.id]) == {book.id: (2, 2)}
+    version, full_loads = availability.version, availability.full_loads
+
+    # Another worker's write: the change log row without this process' expire()
+    db.session.execute(update(Book).where(Book.id == book.id).values(available=1))
+    db.session.add(AvailabilityChange(book_id=book.id))
+    db.session.commit()
+
+    availability.max_staleness = 60
+    try:
+        assert availability.get_many([book.id]) == {book.id: (2, 2)}
+        availability.max_staleness = 0
+        assert availability.get_many([book.id]) == {book.id: (1, 2)}
+    finally:
+        availability.max_staleness = app.config['AVAILABILITY_MAX_STALENESS']
+    assert availability.version > version
+    # Applied from the change log, not by reloading every book
+    assert availability.full_loads == full_loads
+
+
+def test_changes_committed_out_of_id_order_are_applied(app):
+    first, second = add_books(2, 'Snapshot Book')
+    availability.get_many([first.id, second.id])
+    availability.max_staleness = 0
+    try:
+        # Two writers: the one holding the higher id commits first
+        db.session.execute(update(Book).where(Book.id == second.id).values(available=1))
+        db.session.add(AvailabilityChange(id=100, book_id=second.id))
+        db.session.commit()
+        assert availability.get_many([second.id]) == {second.id: (1, 2)}
+
+        db.session.execute(update(Book).where(Book.id == first.id).values(available=0))
+        db.session.add(AvailabilityChange(id=50, book_id=first.id))
+        db.session.commit()
+        assert availability.get_many([first.id]) == {first.id: (0, 2)}
+    finally:
+        availability.max_staleness = app.config['AVAILABILITY_MAX_STALENESS']
+
+
+def test_rolled_back_changes_are_not_cached(app):
+    book = add_books(1, 'Snapshot Book')[0]
+    assert availability.get_many([book.id]) == {book.id: (2, 2)}
+
+    db.session.execute(update(Book).where(Book.id == book.id).values(available=1))
+    record_availability_change(book.id)
+    assert availability.get_many([book.id]) == {book.id: (1, 2)}
+    db.session.rollback()
+
+    assert availability.get_many([book.id]) == {book.id: (2, 2)}
+
+
+def test_batch_availability_api(client):
+    books = add_books(2, 'Snapshot Book')
+    ids = [books[1].id, 99999, books[0].id]
+    by_get = client.get(f"/api/availability?ids={','.join(map(str, ids))}")
+    by_post = client.post('/api/availability', json={'ids': ids})
+
+    assert by_get.status_code == 200
+    assert by_get.get_json() == {'books': [{'id': books[1].id, 'available': 2, 'quantity': 2},
+                                           {'id': books[0].id, 'available': 2, 'quantity': 2}],
+                                 'missing': [99999]}
+    assert by_post.get_json() == by_get.get_json()
+    assert 'X-Availability-Version' in by_get.headers
+    assert client.get('/api/availability?ids=1,x').status_code == 400
+    assert client.get('/api/availability').status_code == 400
+    too_many = ','.join(str(i) for i in range(client.application.config['AVAILABILITY_MAX_BATCH'] + 1))
+    assert client.get(f'/api/availability?ids={too_many}').status_code == 400
+
+
+def test_prune_keeps_recent_changes(app):
+    book = add_books(1, 'Snapshot Book')[0]
+    db.session.add_all([AvailabilityChange(book_id=book.id, changed_at=datetime.utcnow() - timedelta(days=2)),
+                        AvailabilityChange(book_id=book.id)])
+    db.session.commit()
+
+    assert prune_availability_changes(24) == 1
+    assert AvailabilityChange.query.count() == 1
@@ -0,0 +1,126 @@
+from flask import g
+
+from library_management.database import db
+from library_management.models import Book, Reservation, Hold, AvailabilityChange
+from library_management.holds import place_hold
+from library_management.patrons import patron_summary
+from library_management.patron_summary import rebuild_patron_summaries
+
+from .conftest import make_user, login, seed_reservations, totals, add_books
+
+
+def return_cart(client, ids):
+    return client.post('/admin/reservations/batch', json={'ids': ids, 'status': 'returned'})
+
+
+def test_batch_return_reports_each_item(client):
+    patron = make_user('patron')
+    admin = make_user('librarian', is_admin=True)
+    overdue = seed_reservations([patron], 2, overdue=True)
+    pending = seed_reservations([patron], 1, status='pending')[0]
+    waiting = make_user('waiting')
+    place_hold(waiting.id, overdue[1].book_id)
+    db.session.commit()
+    patron_summary(patron.id)
+    ids = [overdue[0].id, overdue[1].id, pending.id, 99999]
+    book_ids = [overdue[0].book_id, overdue[1].book_id]
+
+    login(client, admin)
+    response = return_cart(client, ids)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['updated'] == 2
+    assert [(r['id'], r['ok']) for r in body['results']] == [(ids[0], True), (ids[1], True),
+                                                            (ids[2], False), (ids[3], False)]
+    assert body['results'][0]['fine'] == 3.0
+    assert body['results'][2]['error'] == 'A pending reservation cannot be returned'
+
+    db.session.expire_all()
+    assert [db.session.get(Reservation, i).status for i in ids[:3]] == ['returned', 'returned', 'pending']
+    # One copy back on the shelf, the other set aside for the waiting patron
+    assert [db.session.get(Book, i).available for i in book_ids] == [2, 1]
+    assert Hold.query.filter_by(user_id=waiting.id).one().status == 'ready'
+    assert AvailabilityChange.query.filter_by(book_id=book_ids[0]).count() == 1
+    assert totals(patron)[1:] == (1, 3, 6.0)
+    rebuild_patron_summaries([patron.id])
+    assert totals(patron)[1:] == (1, 3, 6.0)
+
+    # A second submit of the same cart changes nothing
+    assert return_cart(client, ids).get_json()['updated'] == 0
+
+
+def test_batch_cost_does_not_grow_with_the_cart(client, count_queries):
+    patrons = [make_user(f'patron{i}') for i in range(3)]
+    login(client, make_user('librarian', is_admin=True))
+    warm_up = [r.id for r in seed_reservations(patrons, 3, overdue=True)]
+    small = [r.id for r in seed_reservations(patrons, 3, overdue=True)]
+    large = [r.id for r in seed_reservations(patrons, 30, overdue=True)]
+
+    return_cart(client, warm_up)
+    g.pop('_login_user', None)
+    with count_queries() as small_counter:
+        return_cart(client, small)
+    g.pop('_login_user', None)
+    with count_queries() as large_counter:
+        response = return_cart(client, large)
+
+    assert response.get_json()['updated'] == 30
+    assert large_counter.count == small_counter.count
+
+
+def test_batch_form_cancels_ticked_and_pasted_ids(client):
+    patron = make_user('patron')
+    reservations = seed_reservations([patron], 3, status='pending')
+    login(client, make_user('librarian', is_admin=True))
+
+    response = client.post('/admin/reservations/batch', follow_redirects=True, data={
+        'reservation_ids': [reservations[0].id], 'ids': f'{reservations[1].id}, {reservations[2].id}\n',
+        'status': 'cancelled'})
+
+    assert b'3 of 3 reservations updated to cancelled.' in response.data
+    db.session.expire_all()
+    assert {r.status for r in Reservation.query} == {'cancelled'}
+    assert {b.available for b in Book.query} == {2}
+
+
+def test_batch_rejects_bad_requests(client):
+    patron = make_user('patron')
+    login(client, patron)
+    assert return_cart(client, [1]).status_code == 403
+
+    g.pop('_login_user', None)
+    login(client, make_user('librarian', is_admin=True))
+    post = client.post
+    assert post('/admin/reservations/batch', json={'ids': [1], 'status': 'pending'}).status_code == 400
+    assert post('/admin/reservations/batch', json={'ids': ['x'], 'status': 'returned'}).status_code == 400
+    assert post('/admin/reservations/batch', json={'ids': [], 'status': 'returned'}).status_code == 400
+    too_many = list(range(client.application.config['BATCH_MAX_RESERVATIONS'] + 1))
+    assert return_cart(client, too_many).status_code == 400
+
+
+def test_single_update_follows_the_batch_transitions(client):
+    book = add_books(1, available=1, quantity=1)[0]
+    book_id = book.id
+    patron, waiting = make_user('patron'), make_user('waiting')
+    login(client, patron)
+    client.post(f'/reserve/{book_id}')
+    g.pop('_login_user', None)
+    login(client, waiting)
+    client.post(f'/reserve/{book_id}')
+    reservation_id = Reservation.query.filter_by(user_id=patron.id).one().id
+
+    g.pop('_login_user', None)
+    login(client, make_user('librarian', is_admin=True))
+    cancel = client.post('/admin/reservations/batch', json={'ids': [reservation_id], 'status': 'cancelled'})
+    assert cancel.get_json()['updated'] == 1
+    response = client.post(f'/update_reservation/{reservation_id}', data={'status': 'returned'},
+                           follow_redirects=True)
+
+    assert b'A cancelled reservation cannot be returned' in response.data
+    db.session.expire_all()
+    assert db.session.get(Reservation, reservation_id).status == 'cancelled'
+    assert db.session.get(Book, book_id).available == 0
+    assert Hold.query.filter_by(user_id=waiting.id).one().status == 'ready'
+    assert b'Invalid status.' in client.post(f'/update_reservation/{reservation_id}', data={'status': 'pending'},
+                                             follow_redirects=True).data
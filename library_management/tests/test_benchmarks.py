@@ -0,0 +1,90 @@
+import pytest
+
+from library_management.benchmarks.runner import run_benchmarks, compare, parse_scale
+from library_management.benchmarks.startup import run_startup_benchmark
+from library_management.stats import stats_cache
+from library_management.user_cache import user_cache
+
+from .conftest import flask_app
+
+
+def test_parse_scale():
+    assert parse_scale('100') == {'books': 100, 'users': 10, 'reservations': 200}
+    assert parse_scale('10:2:5') == {'books': 10, 'users': 2, 'reservations': 5}
+
+
+def test_benchmarks_run_every_scenario_without_errors():
+    # No `app` fixture: its app context would be shared by every request.
+    # The runner creates the tables and removes its data itself.
+    try:
+        results = run_benchmarks(flask_app, ['20'], iterations=3, warmup=1, log=lambda *args: None)
+    finally:
+        user_cache.clear()
+        stats_cache.invalidate()
+
+    scenarios = results['results']['20']
+    assert scenarios
+    for name, result in scenarios.items():
+        assert result['errors'] == 0, name
+        assert result['queries_per_op'] > 0, name
+
+
+def test_compare_flags_latency_and_query_regressions():
+    baseline = {'results': {'20': {'search': {'p95_ms': 10.0, 'queries_per_op': 1.0}}}}
+    current = {'results': {'20': {'search': {'p95_ms': 12.0, 'queries_per_op': 1.0}}}}
+    assert compare(current, baseline) == []
+
+    current['results']['20']['search'] = {'p95_ms': 20.0, 'queries_per_op': 2.0}
+    assert len(compare(current, baseline)) == 2
+
+
+def test_startup_benchmark_times_every_phase(tmp_path):
+    results = run_startup_benchmark(runs=1, database_url=f"sqlite:///{tmp_path / 'startup.db'}",
+                                    log=lambda *args: None)
+
+    assert set(results['results']) == {'boot', 'import', 'create_app', 'first_request'}
+    assert results['results']['boot']['p50_ms'] >= results['results']['import']['p50_ms'] > 0
+    assert results['slowest_imports']
+    # Booting the app must not create the database
+    assert not (tmp_path / 'startup.db').exists()
+
+
+def test_concurrency_benchmark_drives_both_tiers():
+    pytest.importorskip('aiosqlite')
+    from library_management.async_api import create_async_app
+    from library_management.benchmarks.concurrency import run_concurrency_benchmark
+
+    try:
+        results = run_concurrency_benchmark(flask_app, create_async_app(), '20', [1, 4], requests=8,
+                                            threads=2, log=lambda *args: None)
+    finally:
+        user_cache.clear()
+        stats_cache.invalidate()
+
+    for tiers in results['results'].values():
+        assert set(tiers) == {'sync', 'async'} and set(tiers['sync']) == {'1', '4'}
+    for name, tiers in results['results'].items():
+        for tier, levels in tiers.items():
+            for clients, result in levels.items():
+                assert result['errors'] == 0, (name, tier, clients)
+                assert result['ops'] == 8
+
+
+def test_logging_benchmark_runs_every_mode(tmp_path):
+    from library_management.benchmarks.logging_overhead import run_logging_benchmark, MODES
+
+    try:
+        results = run_logging_benchmark(flask_app, '20', [1, 4], requests=8, threads=2,
+                                        log_dir=str(tmp_path), log=lambda *args: None)
+    finally:
+        user_cache.clear()
+        stats_cache.invalidate()
+
+    assert set(results['results']) == set(MODES)
+    for mode, levels in results['results'].items():
+        for clients, result in levels.items():
+            assert result['errors'] == 0 and result['ops'] == 8, (mode, clients)
+    assert results['results']['sync']['1']['log_bytes'] > 0
+    assert results['results']['queued']['1']['log_bytes'] > 0
+    # Sampling may legitimately keep nothing from so few requests, but never more than queued
+    assert results['results']['sampled']['1']['log_bytes'] <= results['results']['queued']['1']['log_bytes']
@@ -0,0 +1,50 @@
+import io
+import json
+
+from library_management.catalog_import import import_books, isbn_checksum_ok
+from library_management.database import db
+from library_management.models import Book
+
+
+def test_isbn_checksums():
+    assert isbn_checksum_ok('9780061120084')
+    assert isbn_checksum_ok('043942089X')
+    assert not isbn_checksum_ok('9780061120085')
+
+
+def test_csv_import_upserts_in_batches(app):
+    db.session.add(Book(title='Old title', author='Harper Lee', isbn='9780061120084', quantity=5, available=2))
+    db.session.commit()
+    stream = io.StringIO(
+        "isbn,title,author,quantity\n"
+        "978-0-06-112008-4,To Kill a Mockingbird,Harper Lee,6\n"
+        "9780451524935,1984,George Orwell,3\n"
+        "9780451524936,Bad checksum,Nobody,1\n"
+        "9780141439518,Pride and Prejudice,Jane Austen,\n"
+    )
+    batches = []
+
+    result = import_books(stream, 'csv', batch_size=2,
+                          progress=lambda number, rows, seconds, _: batches.append(rows))
+
+    assert (result.rows_read, result.rows_written, result.rows_rejected) == (4, 3, 1)
+    assert batches == [2, 1]
+    db.session.expire_all()
+    mockingbird = Book.query.filter_by(isbn='9780061120084').one()
+    # Three copies were on loan before the import; they still are
+    assert (mockingbird.title, mockingbird.quantity, mockingbird.available) == ('To Kill a Mockingbird', 6, 3)
+    assert Book.query.filter_by(isbn='9780141439518').one().quantity == 1
+
+
+def test_jsonl_import_rejects_bad_lines(app):
+    lines = [
+        json.dumps({'isbn': '9780451524935', 'title': '1984', 'author': 'George Orwell', 'quantity': 0}),
+        '{not json',
+        json.dumps({'isbn': '9780451524935', 'title': 'Nineteen Eighty-Four', 'author': 'George Orwell'}),
+    ]
+
+    result = import_books(io.StringIO('\n'.join(lines)), 'jsonl')
+
+    assert (result.rows_written, result.rows_rejected) == (1, 1)
+    assert [book.title for book in Book.query.all()] == ['Nineteen Eighty-Four']
+    assert result.errors[0].startswith('record 2:')
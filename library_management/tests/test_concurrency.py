@@ -0,0 +1,74 @@
+import time
+import threading
+
+from library_management.database import db
+from library_management.models import Book, Reservation
+
+from .conftest import make_user, login
+
+THREADS = 16
+ATTEMPTS_PER_THREAD = 10
+COPIES = 5
+
+
+def _hammer(app, user_id, url, attempts, barrier, errors):
+    try:
+        client = app.test_client()
+        login(client, user_id)
+        barrier.wait()
+        for _ in range(attempts):
+            response = client.post(url)
+            if response.status_code != 302:
+                errors.append(response.status_code)
+    except Exception as e:
+        errors.append(e)
+
+
+def run_concurrently(app, users, url, attempts=ATTEMPTS_PER_THREAD):
+    barrier = threading.Barrier(len(users))
+    errors = []
+    threads = [threading.Thread(target=_hammer, args=(app, user.id, url, attempts, barrier, errors))
+               for user in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, errors
+
+
+def test_concurrent_reservations_never_oversell(app):
+    book = Book(title='Popular', author='Someone', isbn='9780000000001', quantity=COPIES, available=COPIES)
+    db.session.add(book)
+    db.session.commit()
+    book_id = book.id
+    users = [make_user(f'patron{i}') for i in range(THREADS)]
+
+    elapsed, errors = run_concurrently(app, users, f'/reserve/{book_id}')
+
+    requests = THREADS * ATTEMPTS_PER_THREAD
+    assert not errors, f"{requests} reservation attempts in {elapsed:.2f}s"
+    db.session.expire_all()
+    assert Reservation.query.filter_by(book_id=book_id).count() == COPIES
+    assert db.session.get(Book, book_id).available == 0
+
+
+def test_concurrent_returns_release_each_copy_once(app):
+    book = Book(title='Popular', author='Someone', isbn='9780000000001', quantity=1, available=0)
+    db.session.add(book)
+    db.session.commit()
+    patron = make_user('patron')
+    reservation = Reservation(user_id=patron.id, book_id=book.id, status='approved')
+    db.session.add(reservation)
+    db.session.commit()
+    admins = [make_user(f'admin{i}', is_admin=True) for i in range(THREADS)]
+    # Make room above `available` so a double release would be visible
+    book.quantity = 2
+    db.session.commit()
+
+    _, errors = run_concurrently(app, admins, f'/return_book/{reservation.id}', attempts=1)
+
+    assert not errors
+    db.session.expire_all()
+    assert db.session.get(Book, book.id).available == 1
+    assert db.session.get(Reservation, reservation.id).status == 'returned'
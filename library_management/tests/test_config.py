@@ -0,0 +1,69 @@
+from flask import Flask, g
+from sqlalchemy import text
+
+from library_management.config import configure_app, register_engine_events, async_database_url
+from library_management.database import db, READ_BIND_KEY
+from library_management.models import Book
+
+
+def test_sqlite_connections_get_pragmas(app):
+    with db.engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+
+
+def test_environment_overrides_and_server_pool_options(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://library@db/library')
+    monkeypatch.setenv('DATABASE_POOL_SIZE', '3')
+    monkeypatch.setenv('DATABASE_POOL_PRE_PING', 'false')
+    (tmp_path / 'config.py').write_text("DATABASE_POOL_RECYCLE = 60\nDATABASE_POOL_SIZE = 99\n")
+
+    app = Flask(__name__)
+    configure_app(app, str(tmp_path))
+
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == 'postgresql://library@db/library'
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {
+        'pool_size': 3, 'max_overflow': 20, 'pool_recycle': 60, 'pool_pre_ping': False,
+    }
+
+
+def test_create_app_overrides_come_last(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOLD_PICKUP_DAYS', '5')
+    app = Flask(__name__)
+    configure_app(app, str(tmp_path), {'HOLD_PICKUP_DAYS': 7, 'DATABASE_URL': 'postgres://library@db/library'})
+
+    assert app.config['HOLD_PICKUP_DAYS'] == 7
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == 'postgresql://library@db/library'
+
+
+def test_read_engine_serves_selects_in_marked_views(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv('DATABASE_READ_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    app = Flask(__name__)
+    configure_app(app, str(tmp_path))
+    db.init_app(app)
+    register_engine_events(app)
+
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines[READ_BIND_KEY])
+        with db.engines[READ_BIND_KEY].begin() as connection:
+            connection.execute(Book.__table__.insert().values(
+                title='Replica only', author='A', isbn='1', quantity=1, available=1))
+
+    try:
+        with app.test_request_context('/search'):
+            assert Book.query.all() == []
+            g.use_read_engine = True
+            assert [book.title for book in Book.query.all()] == ['Replica only']
+            db.session.remove()
+    finally:
+        # init_app() registered an (empty) metadata for the bind on the shared extension
+        db.metadatas.pop(READ_BIND_KEY, None)
+
+
+def test_async_database_url_swaps_in_an_async_driver():
+    assert async_database_url('sqlite:////tmp/library.db') == 'sqlite+aiosqlite:////tmp/library.db'
+    assert async_database_url('postgres://u:p@db/library') == 'postgresql+asyncpg://u:p@db/library'
+    assert async_database_url('postgresql+asyncpg://db/library') == 'postgresql+asyncpg://db/library'
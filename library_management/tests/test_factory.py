@@ -0,0 +1,42 @@
+from flask import url_for
+from sqlalchemy import text
+
+from library_management.database import db
+from library_management.models import User, Book
+from library_management.search import FTS_TABLE
+
+
+def test_blueprints_keep_the_old_urls(app):
+    with app.test_request_context():
+        assert url_for('books.search') == '/search'
+        assert url_for('auth.login') == '/login'
+        assert url_for('admin.admin_reservations') == '/admin_reservations'
+
+
+def test_create_db_and_seed_commands(app):
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['create-db']).exit_code == 0
+
+    result = runner.invoke(args=['seed', '--admin-password', 'secret', '--sample-books'])
+    assert result.exit_code == 0, result.output
+    assert User.query.filter_by(username='admin', is_admin=True).count() == 1
+    assert Book.query.count() == 3
+
+    # Running it again adds nothing
+    result = runner.invoke(args=['seed', '--sample-books'])
+    assert 'already exists' in result.output
+    assert User.query.count() == 1
+    assert Book.query.count() == 3
+
+
+def test_rebuild_search_index_command(client):
+    runner = client.application.test_cli_runner()
+    runner.invoke(args=['seed', '--sample-books'])
+    db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+    db.session.commit()
+    assert b'Orwell' not in client.get('/search?query=orwell').data
+
+    result = runner.invoke(args=['rebuild-search-index'])
+
+    assert result.exit_code == 0 and 'rebuilt' in result.output
+    assert b'Orwell' in client.get('/search?query=orwell').data
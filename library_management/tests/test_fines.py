@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from library_management.database import db
+from library_management.fines import calculate_fine, recalculate_fines
+from library_management.models import Reservation
+
+from .conftest import make_user, login, seed_reservations
+
+
+def test_recalculate_fines_matches_calculate_fine(app):
+    patron = make_user('patron')
+    reservations = seed_reservations([patron], 12)
+    now = datetime(2026, 3, 1, 12, 0, 0)
+    offsets = [timedelta(days=d, hours=h) for d in (0, 1, 3, 10) for h in (-1, 0, 5)]
+    for reservation, offset in zip(reservations, offsets):
+        reservation.due_date = now - offset
+    reservations[0].status = 'returned'
+    db.session.commit()
+
+    result = recalculate_fines(now=now, batch_size=4)
+
+    expected = {r.id: calculate_fine(r, now) for r in Reservation.query.all() if r.status == 'approved'}
+    db.session.expire_all()
+    for reservation in Reservation.query.filter(Reservation.status == 'approved', Reservation.due_date < now):
+        assert reservation.fine_amount == expected[reservation.id]
+    assert result.rows == Reservation.query.filter(Reservation.status == 'approved',
+                                                   Reservation.due_date < now).count()
+    assert result.batches >= 2
+    assert db.session.get(Reservation, reservations[0].id).fine_amount == 0.0
+
+
+
+def test_recalculate_fines_batches_skip_id_gaps(app):
+    patron = make_user('patron')
+    first, last = seed_reservations([patron], 2, overdue=True)
+    last.id = first.id + 1000
+    db.session.commit()
+
+    result = recalculate_fines(batch_size=10)
+
+    assert (result.rows, result.batches) == (2, 1)
+
+def test_overdue_books_does_not_write(client, count_queries):
+    admin = make_user('admin-user', is_admin=True)
+    patron = make_user('patron')
+    seed_reservations([patron], 5, overdue=True)
+    login(client, admin)
+
+    with count_queries() as counter:
+        response = client.get('/overdue_books')
+
+    assert response.status_code == 200
+    assert b'$3.00' in response.data
+    assert not [s for s in counter.statements if s.lstrip().upper().startswith('UPDATE')]
+    assert all(r.fine_amount == 0.0 for r in Reservation.query.all())
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+from library_management import holds
+from library_management.database import db
+from library_management.holds import (place_hold, queue_position, hand_on_copy, claim_hold,
+                                      cancel_hold, expire_holds)
+from library_management.models import Book, Hold, Reservation
+
+from .conftest import make_user, login
+
+
+def make_book(available=0, quantity=1):
+    book = Book(title='Popular', author='Someone', isbn='9780000000001',
+                quantity=quantity, available=available)
+    db.session.add(book)
+    db.session.commit()
+    return book
+
+
+def status_of(hold_id):
+    return db.session.get(Hold, hold_id).status
+
+
+def test_racing_requests_place_one_hold(app, monkeypatch):
+    book = make_book()
+    patron = make_user('patron')
+    existing, _ = place_hold(patron.id, book.id)
+    db.session.commit()
+
+    # The second request checked for a hold before the first one's insert committed
+    real_active_hold = holds.active_hold
+    checks = iter([None])
+    monkeypatch.setattr(holds, 'active_hold', lambda *args: next(checks, None) or real_active_hold(*args))
+    assert place_hold(patron.id, book.id) == (existing, False)
+    db.session.commit()
+    assert Hold.query.filter_by(user_id=patron.id).count() == 1
+
+
+def test_holds_are_served_by_priority_then_arrival(app):
+    book = make_book()
+    first, second, staff = (make_user(name) for name in ('first', 'second', 'staff'))
+    hold_first, _ = place_hold(first.id, book.id)
+    hold_second, _ = place_hold(second.id, book.id)
+    hold_staff, _ = place_hold(staff.id, book.id, priority=-1)
+    db.session.commit()
+
+    assert [queue_position(h) for h in (hold_staff, hold_first, hold_second)] == [1, 2, 3]
+    assert place_hold(first.id, book.id) == (hold_first, False)
+
+    assert hand_on_copy(book.id) == hold_staff.id
+    assert hand_on_copy(book.id) == hold_first.id
+    db.session.commit()
+    db.session.expire_all()
+    assert status_of(hold_second.id) == 'waiting'
+    assert queue_position(hold_second) == 1
+    # Copies set aside for holds never reach the shelf
+    assert db.session.get(Book, book.id).available == 0
+
+
+def test_copy_goes_back_on_the_shelf_when_nobody_waits(app):
+    book = make_book()
+    assert hand_on_copy(book.id) is None
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Book, book.id).available == 1
+
+
+def test_claiming_a_ready_hold_creates_the_reservation(app):
+    book = make_book()
+    patron, other = make_user('patron'), make_user('other')
+    hold, _ = place_hold(patron.id, book.id)
+    hand_on_copy(book.id)
+    db.session.commit()
+
+    assert claim_hold(hold.id, other.id) is None
+    reservation = claim_hold(hold.id, patron.id)
+    db.session.commit()
+    assert reservation.book_id == book.id and reservation.user_id == patron.id
+    assert status_of(hold.id) == 'fulfilled'
+    assert claim_hold(hold.id, patron.id) is None
+
+
+def test_cancelling_a_ready_hold_passes_the_copy_on(app):
+    book = make_book()
+    first, second = make_user('first'), make_user('second')
+    hold_first, _ = place_hold(first.id, book.id)
+    hold_second, _ = place_hold(second.id, book.id)
+    hand_on_copy(book.id)
+    db.session.commit()
+
+    assert not cancel_hold(hold_first.id, second.id)
+    assert cancel_hold(hold_first.id, first.id)
+    db.session.commit()
+    db.session.expire_all()
+    assert status_of(hold_first.id) == 'cancelled'
+    assert status_of(hold_second.id) == 'ready'
+
+
+def test_unclaimed_holds_expire_and_promote_the_next_patron(app):
+    book = make_book()
+    patrons = [make_user(f'patron{i}') for i in range(3)]
+    holds = [place_hold(p.id, book.id)[0] for p in patrons]
+    placed = datetime.utcnow() - timedelta(days=10)
+    hand_on_copy(book.id, now=placed, pickup_days=3)
+    db.session.commit()
+
+    assert expire_holds(pickup_days=3, batch_size=1) == 1
+    db.session.expire_all()
+    assert [status_of(h.id) for h in holds] == ['expired', 'ready', 'waiting']
+    assert expire_holds(pickup_days=3) == 0
+
+
+def test_reserving_an_unavailable_book_joins_the_waitlist(client):
+    book = make_book(available=0)
+    ahead = make_user('ahead')
+    place_hold(ahead.id, book.id)
+    patron = make_user('patron')
+    db.session.commit()
+    login(client, patron)
+    assert b'Join waitlist' in client.get(f'/search?query={book.title}').data
+
+    response = client.post(f'/reserve/{book.id}', follow_redirects=True)
+    hold = Hold.query.filter_by(user_id=patron.id).one()
+
+    assert response.request.path == '/my_reservations'
+    assert b'waitlist at position 2' in response.data
+    assert b'Position 2 in the queue' in response.data
+
+    cancel_hold(Hold.query.filter_by(user_id=ahead.id).one().id)
+    hand_on_copy(book.id)
+    db.session.commit()
+    response = client.post(f'/holds/{hold.id}/checkout')
+    assert response.status_code == 302
+    assert Reservation.query.filter_by(user_id=patron.id, book_id=book.id).count() == 1
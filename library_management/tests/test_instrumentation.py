@@ -0,0 +1,40 @@
+import logging
+
+from library_management.instrumentation import instrumentation
+
+from .conftest import make_user, login
+
+
+def test_responses_carry_server_timing(client):
+    response = client.get('/api/search?query=anything')
+    timings = response.headers.getlist('Server-Timing')
+    assert timings[0].startswith('app;dur=')
+    assert timings[1].startswith('db;dur=')
+    assert 'queries' in timings[1]
+
+
+def test_metrics_exports_route_histograms(client):
+    instrumentation.reset()
+    client.get('/api/search')
+    client.get('/api/search')
+    login(client, make_user('admin-user', is_admin=True))
+
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert '# TYPE library_request_duration_seconds histogram' in body
+    assert 'library_request_duration_seconds_count{route="books.api_search",method="GET"} 2' in body
+    assert 'library_request_duration_seconds_bucket{route="books.api_search",method="GET",le="+Inf"} 2' in body
+    assert 'library_sql_queries_total{route="books.api_search",method="GET"}' in body
+    assert 'library_user_cache_lookups_total{result="hit"}' in body
+
+
+def test_metrics_is_admin_only(client):
+    login(client, make_user('patron'))
+    assert client.get('/metrics').status_code == 403
+
+
+def test_slow_queries_are_logged(client, caplog, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'slow_query_threshold', 0.0)
+    with caplog.at_level(logging.WARNING, logger='library_management.slow_query'):
+        client.get('/api/search')
+    assert any('Slow query' in record.getMessage() for record in caplog.records)
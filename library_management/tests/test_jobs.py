@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from library_management import app as app_module
+from library_management.database import db
+from library_management.jobs import JobRegistry, job_registry
+from library_management.models import JobLease, JobRun
+
+from .conftest import flask_app
+
+
+@pytest.fixture
+def registry(app):
+    registry = JobRegistry()
+    registry.init_app(app)
+    return registry
+
+
+def test_web_app_does_not_start_a_scheduler():
+    assert not hasattr(app_module, 'scheduler')
+    assert {'update_fines', 'expire_holds'} <= set(job_registry.jobs)
+
+
+def test_runs_are_recorded_with_duration_and_rows(registry):
+    registry.job('count_things', 'interval', min_gap=0, minutes=5)(lambda: 42)
+
+    run = registry.run('count_things')
+    assert run.status == 'success'
+    assert run.rows_processed == 42
+    assert run.duration >= 0
+    assert registry.recent_runs('count_things')[0].id == run.id
+    assert 'library_job_last_rows_processed{job="count_things"} 42' in registry.metrics()
+
+
+def test_failures_are_recorded_and_release_the_lease(registry):
+    def broken():
+        raise RuntimeError("boom")
+    registry.job('broken', 'interval', min_gap=0, minutes=5)(broken)
+
+    run = registry.run('broken')
+    assert run.status == 'failed'
+    assert run.error == 'boom'
+    assert registry.run('broken') is not None
+
+
+def test_a_firing_runs_once_across_runners(app):
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_job():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 1
+
+    # Two runners (different lease owners) fire the same job at the same time
+    runners = []
+    for owner in ('runner-a', 'runner-b'):
+        registry = JobRegistry()
+        registry.init_app(flask_app)
+        registry.owner = owner
+        registry.job('nightly', 'cron', hour=0)(slow_job)
+        runners.append(registry)
+
+    results = {}
+    first = threading.Thread(target=lambda: results.setdefault('a', runners[0].run('nightly')))
+    first.start()
+    started.wait(5)
+    results['b'] = runners[1].run('nightly')
+    release.set()
+    first.join()
+
+    assert results['b'] is None
+    assert len(calls) == 1
+    # The lease outlives the run, so a late duplicate of the same firing also skips
+    assert runners[1].run('nightly') is None
+    assert len(calls) == 1
+    assert JobRun.query.filter_by(job_name='nightly').count() == 1
+    assert db.session.get(JobLease, 'nightly').owner == 'runner-a'
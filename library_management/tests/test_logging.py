@@ -0,0 +1,85 @@
+import json
+import queue
+import logging
+
+import pytest
+
+from library_management.log_pipeline import log_pipeline, LazyQueueHandler, parse_sample_rates
+
+
+@pytest.fixture
+def log_to_file(app, tmp_path):
+    """Reconfigure the pipeline to write to a file; returns a reader for its JSON lines."""
+    log_file = tmp_path / 'app.log'
+
+    def configure(**settings):
+        config = dict(app.config, LOG_STDERR=False, LOG_FILE=str(log_file), LOG_FORMAT='json',
+                      LOG_SAMPLE_RATES='')
+        config.update(settings)
+        log_pipeline.configure(config)
+
+    def records():
+        log_pipeline.flush()
+        return [json.loads(line) for line in log_file.read_text().splitlines()]
+
+    configure.records = records
+    configure.path = log_file
+    yield configure
+    log_pipeline.configure(app.config)
+
+
+def test_request_id_is_echoed_or_generated(client):
+    assert client.get('/', headers={'X-Request-ID': 'abc-123'}).headers['X-Request-ID'] == 'abc-123'
+    generated = client.get('/').headers['X-Request-ID']
+    assert len(generated) == 32
+
+
+def test_json_records_carry_request_id_and_latency(client, log_to_file):
+    log_to_file()
+    client.get('/search?query=dune', headers={'X-Request-ID': 'req-1'})
+
+    records = [r for r in log_to_file.records() if r['request_id'] == 'req-1']
+    assert {r['endpoint'] for r in records} == {'books.search'}
+    assert 'Search query: dune' in [r['message'] for r in records]
+    access = next(r for r in records if r['logger'] == 'library_management.access')
+    assert access['status'] == 200 and access['path'] == '/search'
+    assert access['latency_ms'] >= 0
+
+
+def test_sampled_routes_drop_info_records(client, log_to_file):
+    log_to_file(LOG_SAMPLE_RATES='books.home=0')
+    client.get('/')
+    client.get('/search')
+    client.get('/no-such-page')
+
+    endpoints = {r['endpoint'] for r in log_to_file.records()}
+    assert 'books.home' not in endpoints
+    assert 'books.search' in endpoints
+    assert parse_sample_rates('books.home=0.5, books.search=2') == {'books.home': 0.5, 'books.search': 1.0}
+
+
+def test_size_based_rotation(log_to_file):
+    log_to_file(LOG_MAX_BYTES=500, LOG_BACKUP_COUNT=2)
+    for i in range(50):
+        logging.getLogger('library_management.tests').info("filler record %s", i)
+    log_pipeline.flush()
+
+    rotated = sorted(p.name for p in log_to_file.path.parent.iterdir())
+    assert rotated == ['app.log', 'app.log.1', 'app.log.2']
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    handler = LazyQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger('library_management.tests.lazy')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("first %s", 1)
+        logger.warning("second %s", 2)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    record = handler.queue.get_nowait()
+    assert (record.msg, record.args) == ("first %s", (1,))
+    assert handler.dropped == 1
@@ -0,0 +1,153 @@
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from library_management.database import db
+from library_management.models import Book, OutboxMessage
+from library_management.notifications import dispatcher, enqueue, queue_digests
+
+from .conftest import make_user, login, seed_reservations
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept mail from smtplib."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost stand-in')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().rstrip('\r\n')
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                if server.fail_next:
+                    server.fail_next -= 1
+                    self.reply('451 Try again later')
+                    continue
+                recipients.append(line.split(':', 1)[1].strip(' <>'))
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    data_line = self.rfile.readline().decode().rstrip('\r\n')
+                    if data_line == '.':
+                        break
+                    data.append(data_line)
+                server.messages.append((recipients, '\n'.join(data)))
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+@pytest.fixture
+def smtp_server(app):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads = True
+    server.messages, server.connections, server.fail_next = [], 0, 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    saved = {key: app.config.get(key) for key in ('MAIL_SERVER', 'MAIL_PORT', 'MAIL_SUPPRESS_SEND',
+                                                  'NOTIFICATIONS_ENABLED')}
+    # Flask-Mail suppresses sending when TESTING is on unless told otherwise
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=server.server_address[1], MAIL_SUPPRESS_SEND=False,
+                      NOTIFICATIONS_ENABLED=True)
+    dispatcher.init_app(app)
+    yield server
+    dispatcher.close()
+    app.config.update(saved)
+    dispatcher.init_app(app)
+    server.shutdown()
+    server.server_close()
+
+
+def test_messages_are_sent_in_batches_over_one_connection(smtp_server):
+    dispatcher.batch_size = 3
+    for i in range(7):
+        enqueue(f'reader{i}@example.org', 'test', f'Subject {i}', 'Body')
+    db.session.commit()
+
+    result = dispatcher.dispatch_all()
+    assert (result.claimed, result.sent) == (7, 7)
+    assert sorted(r[0] for r, _ in smtp_server.messages) == sorted(f'reader{i}@example.org' for i in range(7))
+    assert smtp_server.connections == 1
+    assert OutboxMessage.query.filter_by(status='sent').count() == 7
+    assert dispatcher.dispatch().claimed == 0
+
+
+def test_failed_messages_are_retried_with_backoff(smtp_server):
+    dispatcher.max_attempts = 2
+    message = enqueue('reader@example.org', 'test', 'Subject', 'Body')
+    db.session.commit()
+    smtp_server.fail_next = 1
+    now = datetime.utcnow()
+
+    result = dispatcher.dispatch(now)
+    assert result.retried == 1
+    db.session.refresh(message)
+    assert message.status == 'pending' and message.attempts == 1
+    assert message.next_attempt_at == now + timedelta(seconds=dispatcher.retry_backoff)
+    # Not due again until the backoff has passed
+    assert dispatcher.dispatch(now).claimed == 0
+
+    result = dispatcher.dispatch(message.next_attempt_at)
+    assert result.sent == 1
+    db.session.refresh(message)
+    assert message.status == 'sent'
+
+
+def test_outbox_rows_follow_the_reservation_transaction(smtp_server, client):
+    patron = make_user('patron')
+    patron.email = 'patron@example.org'
+    book = Book(title='Dune', author='Frank Herbert', isbn='9780441172719', quantity=1, available=1)
+    db.session.add(book)
+    db.session.commit()
+    login(client, patron)
+
+    client.post(f'/reserve/{book.id}')
+    message = OutboxMessage.query.one()
+    assert message.recipient == 'patron@example.org'
+    assert message.subject == 'Reserved: Dune'
+
+    enqueue('someone@example.org', 'test', 'Subject', 'Body')
+    db.session.rollback()
+    assert OutboxMessage.query.count() == 1
+
+
+def test_digests_are_set_based_and_queued_once_a_day(smtp_server, count_queries):
+    readers = [make_user(f'reader{i}') for i in range(3)]
+    for reader in readers[:2]:
+        reader.email = f'{reader.username}@example.org'
+    db.session.commit()
+    seed_reservations(readers, 6, overdue=True)
+    due_soon = seed_reservations(readers, 3)
+    for reservation in due_soon:
+        reservation.due_date = datetime.utcnow() + timedelta(days=1)
+    db.session.commit()
+
+    with count_queries() as counter:
+        assert queue_digests() == 4  # overdue and due-soon, for the two readers with an email
+    assert counter.count <= 4, counter.statements
+    assert queue_digests() == 0
+
+    digest = OutboxMessage.query.filter_by(kind='overdue', recipient='reader0@example.org').one()
+    assert digest.body.count('  - Book') == 2
+    assert dispatcher.dispatch_all().sent == 4
+    # Each day has its own keys
+    assert queue_digests(now=datetime.utcnow() + timedelta(days=1)) > 0
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from library_management.auth import username_limiter, ip_limiter
+from library_management.database import db
+from library_management.factory import trust_proxies
+from library_management.models import User
+from library_management.passwords import PasswordHasher, HasherBusy, password_hasher
+from library_management.rate_limit import TokenBucketLimiter
+
+
+@pytest.fixture(autouse=True)
+def reset_limiters():
+    username_limiter.clear()
+    ip_limiter.clear()
+    yield
+    username_limiter.clear()
+    ip_limiter.clear()
+
+
+def make_patron(username, password, method='scrypt'):
+    user = User(username=username, password=generate_password_hash(password, method))
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    limiter = TokenBucketLimiter(burst=2, per_minute=6, clock=lambda: now[0])
+
+    assert limiter.allow('alice')[0]
+    assert limiter.allow('alice')[0]
+    allowed, retry_after = limiter.allow('alice')
+    assert not allowed
+    assert retry_after == pytest.approx(10.0)
+    assert limiter.allow('bob')[0]
+
+    now[0] = 10.0
+    assert limiter.allow('alice')[0]
+    assert limiter.limited == 1
+
+
+def test_hasher_rejects_work_beyond_queue_limit():
+    hasher = PasswordHasher()
+    hasher.workers, hasher.queue_limit = 1, 0
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return True
+
+    worker = threading.Thread(target=hasher._run, args=(slow,))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(HasherBusy):
+            hasher.verify('x', 'y')
+        assert hasher.stats()['rejected'] == 1
+    finally:
+        release.set()
+        worker.join()
+        hasher.shutdown()
+    assert hasher.stats()['in_flight'] == 0
+
+
+def test_login_checks_password_off_the_request_thread(client):
+    make_patron('reader', 'secret')
+    before = password_hasher.stats()['count']
+
+    response = client.post('/login', data={'username': 'reader', 'password': 'secret'})
+    assert response.status_code == 302
+    assert password_hasher.stats()['count'] == before + 1
+
+    response = client.post('/login', data={'username': 'reader', 'password': 'wrong'})
+    assert response.status_code == 200
+    assert b'Invalid username or password' in response.data
+
+
+def test_login_upgrades_outdated_hash(client):
+    user = make_patron('legacy', 'secret', method='pbkdf2:sha256:1000')
+    user_id = user.id
+
+    response = client.post('/login', data={'username': 'legacy', 'password': 'secret'})
+    assert response.status_code == 302
+
+    stored = db.session.get(User, user_id).password
+    assert stored.startswith('scrypt:')
+    assert check_password_hash(stored, 'secret')
+
+
+def test_login_rate_limit_rejects_before_any_query(client, count_queries):
+    make_patron('target', 'secret')
+    for _ in range(5):
+        client.post('/login', data={'username': 'target', 'password': 'guess'})
+
+    with count_queries() as counter:
+        response = client.post('/login', data={'username': 'target', 'password': 'guess'})
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+    assert counter.count == 0, counter.statements
+
+
+def test_ip_limit_counts_each_forwarded_client(client, monkeypatch):
+    app = client.application
+    monkeypatch.setitem(app.config, 'PROXY_FIX_X_FOR', 1)
+    monkeypatch.setattr(app, 'wsgi_app', app.wsgi_app)
+    monkeypatch.setattr(ip_limiter, 'burst', 2)
+    trust_proxies(app)
+
+    def attempt(client_ip, username):
+        return client.post('/login', data={'username': username, 'password': 'guess'},
+                           headers={'X-Forwarded-For': client_ip}).status_code
+
+    # Every request comes from the proxy's address; only the forwarded one tells clients apart
+    assert [attempt('203.0.113.1', f'user{i}') for i in range(3)] == [200, 200, 429]
+    assert attempt('203.0.113.2', 'user9') == 200
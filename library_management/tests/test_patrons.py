@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from flask import g
+
+from library_management.database import db
+from library_management.archive import archive_reservations
+from library_management.fines import recalculate_fines
+from library_management.holds import place_hold
+from library_management.patrons import patron_summary
+from library_management.patron_summary import rebuild_patron_summaries
+
+from .conftest import make_user, login, seed_reservations, totals
+
+
+def rebuilt_totals(user):
+    rebuild_patron_summaries([user.id])
+    return totals(user)
+
+
+def seed_account(patron):
+    """A long loan history, part of it archived, plus one overdue loan, one due soon and a hold."""
+    history = seed_reservations([patron], 40, status='returned')
+    for reservation in history[:30]:
+        reservation.date_returned = datetime.utcnow() - timedelta(days=400)
+    history[0].fine_amount = 4.0
+    overdue = seed_reservations([patron], 1, overdue=True)[0]
+    due_soon = seed_reservations([patron], 1)[0]
+    due_soon.due_date = datetime.utcnow() + timedelta(days=1)
+    waiting = seed_reservations([make_user('other')], 1)[0].book_id
+    place_hold(patron.id, waiting)
+    db.session.commit()
+    archive_reservations(365)
+    return overdue, due_soon
+
+
+def test_summary_reads_totals_not_history(app, count_queries):
+    patron = make_user('patron')
+    overdue, due_soon = seed_account(patron)
+
+    patron_id = patron.id
+    patron_summary(patron_id)
+    with count_queries() as counter:
+        summary = patron_summary(patron_id)
+
+    # Totals row, open loans, holds and one queue position, however long the history
+    assert counter.count == 4
+    assert (summary['open_loans'], summary['total_loans']) == (2, 42)
+    assert [loan['id'] for loan in summary['overdue']] == [overdue.id]
+    assert [loan['id'] for loan in summary['due_soon']] == [due_soon.id]
+    assert summary['holds'][0]['position'] == 1
+    # Three days on the overdue loan; the archived fine is history
+    assert summary['outstanding_fines'] == 3.0
+    assert summary['lifetime_fines'] == 4.0 + 3.0
+
+
+def test_checkout_return_and_fine_updates_keep_totals_in_step(client):
+    patron = make_user('patron')
+    admin = make_user('librarian', is_admin=True)
+    loans = seed_reservations([patron], 2, overdue=True)
+    patron_summary(patron.id)
+
+    login(client, patron)
+    g.pop('_login_user', None)
+    client.post(f'/reserve/{loans[0].book_id}')
+    assert totals(patron)[1:3] == (3, 3)
+
+    recalculate_fines()
+    assert totals(patron)[3] == 6.0
+
+    login(client, admin)
+    g.pop('_login_user', None)
+    client.post(f'/return_book/{loans[0].id}')
+    client.post(f'/update_reservation/{loans[1].id}', data={'status': 'cancelled'})
+    after = totals(patron)
+
+    assert after[1:] == (1, 3, 6.0)
+    assert after == rebuilt_totals(patron)
+
+
+def test_account_pages(client):
+    patron = make_user('patron')
+    seed_account(patron)
+
+    assert client.get('/api/account/summary').status_code == 401
+    login(client, patron)
+    g.pop('_login_user', None)
+    body = client.get('/api/account/summary').get_json()
+    assert body['user_id'] == patron.id and body['open_loans'] == 2
+    datetime.fromisoformat(body['active_loans'][0]['due_date'])
+    assert b'Fines owed' in client.get('/account').data
@@ -0,0 +1,67 @@
+import pytest
+
+from library_management.database import db
+from library_management.holds import place_hold
+from library_management.patrons import patron_summary
+
+from .conftest import make_user, login, seed_reservations
+
+# Upper bound on statements per page, independent of how many rows are listed
+MAX_STATEMENTS = 4
+
+ROWS = 25
+
+
+@pytest.mark.parametrize('route', [
+    '/admin_reservations',
+    '/book_circulation',
+    '/overdue_books',
+])
+def test_admin_listing_query_count_is_bounded(client, count_queries, route):
+    admin = make_user('admin-user', is_admin=True)
+    patrons = [make_user(f'patron{i}') for i in range(5)]
+    seed_reservations(patrons, ROWS, status='approved', overdue=True)
+    seed_reservations(patrons, ROWS, status='returned')
+    login(client, admin)
+
+    with count_queries() as counter:
+        response = client.get(route)
+
+    assert response.status_code == 200
+    assert counter.count <= MAX_STATEMENTS, counter.statements
+
+
+def seed_queued_patron():
+    """A patron with ROWS loans and ROWS waiting holds, each second in its queue."""
+    patron = make_user('patron')
+    seed_reservations([patron], ROWS)
+    ahead = make_user('ahead')
+    for reservation in seed_reservations([make_user('borrower')], ROWS):
+        place_hold(ahead.id, reservation.book_id)
+        place_hold(patron.id, reservation.book_id)
+    db.session.commit()
+    return patron
+
+
+def test_my_reservations_query_count_is_bounded(client, count_queries):
+    patron = seed_queued_patron()
+    login(client, patron)
+
+    with count_queries() as counter:
+        response = client.get('/my_reservations')
+
+    assert response.status_code == 200
+    assert b'Book 0' in response.data
+    assert response.data.count(b'Position 2 in the queue') == ROWS
+    assert counter.count <= MAX_STATEMENTS, counter.statements
+
+
+def test_account_summary_query_count_is_bounded(app, count_queries):
+    patron_id = seed_queued_patron().id
+    patron_summary(patron_id)
+
+    with count_queries() as counter:
+        summary = patron_summary(patron_id)
+
+    assert [hold['position'] for hold in summary['holds']] == [2] * ROWS
+    assert counter.count <= MAX_STATEMENTS, counter.statements
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+from library_management import reports
+from library_management.database import db
+
+from .conftest import make_user, login, seed_reservations
+
+
+def test_circulation_csv_export_streams_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(reports, 'EXPORT_CHUNK_ROWS', 2)
+    admin = make_user('admin-user', is_admin=True)
+    patron = make_user('patron')
+    seed_reservations([patron], 5)
+    login(client, admin)
+
+    response = client.get('/admin/export/circulation?format=csv')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'attachment' in response.headers['Content-Disposition']
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert rows[0]['username'] == 'patron'
+    assert rows[0]['title'] == 'Book 0'
+
+
+def test_fines_ndjson_export_and_date_filter(client):
+    admin = make_user('admin-user', is_admin=True)
+    patron = make_user('patron')
+    fined = seed_reservations([patron], 3, overdue=True)
+    fined[0].fine_amount = 4.0
+    db.session.commit()
+    login(client, admin)
+
+    lines = client.get('/admin/export/fines?format=ndjson').get_data(as_text=True).splitlines()
+    assert [json.loads(line)['fine_amount'] for line in lines] == [4.0]
+
+    lines = client.get('/admin/export/fines?format=ndjson&date_to=2000-01-01').get_data(as_text=True)
+    assert lines == ''
+    assert client.get('/admin/export/fines?date_from=nope').status_code == 400
+    assert client.get('/admin/export/unknown').status_code == 404
+
+
+def test_export_requires_admin(client):
+    login(client, make_user('patron'))
+    assert client.get('/admin/export/catalog').status_code == 302
+
+
+def test_month_range():
+    first, last = reports.month_range('2024-02')
+    assert (first.day, last.month, last.day) == (1, 2, 29)
+
+
+def test_export_command_rejects_a_bad_month(app):
+    result = app.test_cli_runner().invoke(args=['export-report', 'circulation', '--month', '2024-13'])
+    assert result.exit_code == 2
+    assert "expected YYYY-MM" in result.output
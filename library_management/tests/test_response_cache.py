@@ -0,0 +1,78 @@
+from flask import g
+
+from library_management.response_cache import response_cache
+
+from .conftest import make_user, login, add_books
+
+
+def test_repeated_api_search_is_served_from_cache(client, count_queries):
+    add_books(3, 'Cached Title')
+    first = client.get('/api/search?query=cached')
+    assert first.status_code == 200
+    assert len(first.get_json()) == 3
+
+    with count_queries() as counter:
+        second = client.get('/api/search?query=%20cached%20')
+    assert counter.count == 0, counter.statements
+    assert second.get_data() == first.get_data()
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_conditional_get_returns_304_without_a_body(client):
+    add_books(2, 'Cached Title')
+    etag = client.get('/api/search?query=cached').headers['ETag']
+
+    response = client.get('/api/search?query=cached', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response_cache.stats()['not_modified'] == 1
+
+
+def test_reservations_bump_the_catalog_version(client):
+    book = add_books(1, 'Cached Title', available=1)[0]
+    patron = make_user('patron')
+    login(client, patron)
+    before = client.get('/api/search?query=cached&fields=id,available')
+    assert before.get_json()[0]['available'] == 1
+
+    client.post(f'/reserve/{book.id}')
+
+    after = client.get('/api/search?query=cached&fields=id,available',
+                       headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.get_json()[0]['available'] == 0
+
+
+def test_search_page_is_cached_per_login_state(client):
+    add_books(1, 'Cached Title')
+    anonymous = client.get('/search?query=cached')
+    assert b'Sign Up' in anonymous.data
+    assert 'Cookie' in anonymous.headers['Vary']
+
+    login(client, make_user('reader'))
+    # Requests share the fixture's app context, where Flask-Login caches the user
+    g.pop('_login_user', None)
+    logged_in = client.get('/search?query=cached')
+    assert b'Sign Up' not in logged_in.data
+    assert b'Logout' in logged_in.data
+
+
+def test_streamed_results_bypass_the_cache(client, count_queries):
+    add_books(2, 'Cached Title')
+    client.get('/api/search?query=cached&format=ndjson').get_data()
+    with count_queries() as counter:
+        client.get('/api/search?query=cached&format=ndjson').get_data()
+    assert counter.count > 0
+    assert response_cache.stats()['size'] == 0
+
+
+def test_search_keeps_the_query_case_and_shares_the_listing(client, count_queries):
+    add_books(2, 'Cached Title')
+    client.get('/search?query=cached')
+
+    with count_queries() as counter:
+        response = client.get('/search?query=CACHED')
+    # Same listing as "cached", rendered with the patron's own spelling
+    assert counter.count == 0, counter.statements
+    assert b'value="CACHED"' in response.data
+    assert response.data.count(b'Cached Title') == 2
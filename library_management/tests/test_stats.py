@@ -0,0 +1,30 @@
+from library_management.stats import stats_cache
+
+from .conftest import make_user, login, seed_reservations
+
+
+def test_dashboard_stats_are_cached_for_the_ttl(client, count_queries):
+    admin = make_user('admin-user', is_admin=True)
+    patron = make_user('patron')
+    overdue = seed_reservations([patron], 3, overdue=True)
+    seed_reservations([patron], 2, status='returned')
+    stats_cache.invalidate()
+    login(client, admin)
+
+    response = client.get('/admin_dashboard')
+    assert response.status_code == 200
+    assert b'5 titles, 5 available' in response.data
+    assert b'Approved: 3' in response.data
+
+    with count_queries() as counter:
+        client.get('/admin_dashboard')
+    # At most the user loader runs; the aggregates come from the cache
+    assert counter.count <= 1, counter.statements
+
+    # Loans and returns leave the cached figures alone until the TTL runs out
+    client.post(f'/update_reservation/{overdue[0].id}', data={'status': 'cancelled'})
+    assert b'Approved: 3' in client.get('/admin_dashboard').data
+    stats_cache.invalidate()
+    response = client.get('/admin_dashboard')
+    assert b'Approved: 2' in response.data
+    assert b'Cancelled: 1' in response.data
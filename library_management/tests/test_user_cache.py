@@ -0,0 +1,52 @@
+from library_management.database import db
+from library_management.models import User
+from library_management.user_cache import LocalCacheBackend, user_cache
+
+from .conftest import make_user
+
+
+def test_load_user_is_served_from_cache(app, count_queries):
+    user_cache.clear()
+    user_id = make_user('patron').id
+    db.session.expunge_all()
+
+    with count_queries() as counter:
+        first = user_cache.load(user_id)
+    assert counter.count == 1
+
+    db.session.expunge_all()
+    hits = user_cache.hits
+    with count_queries() as counter:
+        cached = user_cache.load(user_id)
+    assert counter.count == 0
+    assert user_cache.hits == hits + 1
+    assert (cached.id, cached.username, cached.is_admin) == (first.id, 'patron', False)
+    assert cached.is_authenticated
+
+
+def test_privilege_change_invalidates_cached_user(app):
+    user_cache.clear()
+    user_id = make_user('patron').id
+    user_cache.load(user_id)
+
+    user = db.session.get(User, user_id)
+    user.is_admin = True
+    db.session.commit()
+    db.session.expunge_all()
+
+    assert user_cache.load(user_id).is_admin is True
+
+
+def test_local_backend_is_bounded_and_expires():
+    backend = LocalCacheBackend(maxsize=2, ttl=60)
+    backend.set(1, 'a')
+    backend.set(2, 'b')
+    backend.get(1)
+    backend.set(3, 'c')
+    assert backend.get(2) is None
+    assert backend.get(1) == 'a'
+    assert backend.evictions == 1
+
+    expired = LocalCacheBackend(maxsize=2, ttl=0)
+    expired.set(1, 'a')
+    assert expired.get(1) is None
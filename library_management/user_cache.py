@@ -0,0 +1,185 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from .database import db, RoutingSession
+from .models import User
+
+# Columns kept in the cache. The password hash is left out on purpose: it is
+# only needed at login, which queries the user directly.
+CACHED_COLUMNS = ('id', 'username', 'is_admin')
+
+# Changes to these columns must be visible on the next request
+INVALIDATING_COLUMNS = ('username', 'password', 'is_admin')
+
+
+class LocalCacheBackend:
+    """Bounded LRU with per-entry TTL, private to this process."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    # Counters never expire or get evicted, unlike cached entries
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr_counter(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    """Cache shared by every worker, so invalidations reach all of them."""
+
+    def __init__(self, url, ttl=300, prefix='library:user:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("USER_CACHE_URL is set but the 'redis' package is not installed.")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.client.get(f"{self.prefix}{key}")
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.setex(f"{self.prefix}{key}", self.ttl, json.dumps(value))
+
+    def delete(self, key):
+        self.client.delete(f"{self.prefix}{key}")
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+    def get_counter(self, key):
+        value = self.client.get(f"{self.prefix}counter:{key}")
+        return int(value) if value is not None else 0
+
+    def incr_counter(self, key):
+        return self.client.incr(f"{self.prefix}counter:{key}")
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(f"{self.prefix}*"))
+
+
+class UserCache:
+    """Caches the columns Flask-Login needs so load_user() skips the database."""
+
+    def __init__(self):
+        self.backend = LocalCacheBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        ttl = app.config.get('USER_CACHE_TTL', 300)
+        if app.config.get('USER_CACHE_URL'):
+            self.backend = RedisCacheBackend(app.config['USER_CACHE_URL'], ttl=ttl)
+        else:
+            self.backend = LocalCacheBackend(maxsize=app.config.get('USER_CACHE_SIZE', 1024), ttl=ttl)
+
+    def load(self, user_id):
+        data = self.backend.get(user_id)
+        if data is not None:
+            self.hits += 1
+            user = User(**data)
+            make_transient_to_detached(user)
+            # Attach to this request's session without a SELECT
+            return db.session.merge(user, load=False)
+
+        self.misses += 1
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self.backend.set(user_id, {column: getattr(user, column) for column in CACHED_COLUMNS})
+        return user
+
+    def invalidate(self, user_id):
+        self.backend.delete(user_id)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self.backend),
+            'evictions': self.backend.evictions,
+        }
+
+
+user_cache = UserCache()
+
+
+def invalidate_user(user_id):
+    user_cache.invalidate(user_id)
+
+
+# Changes made through the ORM are dropped from the cache once they commit
+@event.listens_for(User, 'after_update')
+def _remember_changed_user(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[column].history.has_changes() for column in INVALIDATING_COLUMNS):
+        state.session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(User, 'after_delete')
+def _remember_deleted_user(mapper, connection, target):
+    inspect(target).session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_user_ids', None)
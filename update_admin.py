@@ -5,6 +5,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from library_management.app import app, db, User
+from library_management.user_cache import invalidate_user
 from werkzeug.security import generate_password_hash
 
 with app.app_context():
@@ -19,3 +20,5 @@ with app.app_context():
         print("Admin privileges updated.")
 
     db.session.commit()
+    # Workers sharing a USER_CACHE_URL cache pick up the new privileges immediately
+    invalidate_user(admin.id)